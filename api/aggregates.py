@@ -0,0 +1,9 @@
+from django.db.models import BigIntegerField, DecimalField, ExpressionWrapper
+from django.db.models.functions import Cast, Round
+
+
+def cents(expression):
+    """Сумма в копейках целым числом: строки переносятся в numpy без Decimal"""
+    return Cast(Round(ExpressionWrapper(
+        expression * 100, output_field=DecimalField(max_digits=16, decimal_places=0)
+    )), BigIntegerField())
@@ -0,0 +1,222 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from api.aggregates import cents
+from expenses.models import DailyCategoryRollup, SpendingAnomaly, Transaction, UserDataVersion
+from expenses.periods import MonthIndex, month_index, month_shift
+
+# Пользователей в одной пачке ночной проверки: запросов на пачку фиксированное число,
+# объем строк в памяти - около BASELINE_DAYS дней расходов пачки
+ANOMALY_CHUNK_SIZE = getattr(settings, 'ANOMALY_CHUNK_SIZE', 500)
+
+# Транзакции последних RECENT_DAYS дней проверяются каждую ночь (с запасом на пропуски)
+RECENT_DAYS = 7
+# Типичная сумма категории считается по расходам за BASELINE_DAYS дней
+BASELINE_DAYS = 180
+MIN_TRANSACTIONS = 5
+# Порог робастной оценки (отклонение от медианы в масштабах MAD) и кратности медиане
+ANOMALY_SCORE = 3.5
+TRANSACTION_RATIO = 2.0
+# Месяц категории сравнивается с медианой ненулевых месяцев из MONTH_WINDOW предыдущих
+MONTH_WINDOW = 6
+MIN_MONTHS = 3
+MONTH_RATIO = 3.0
+
+# MAD нормального распределения в единицах стандартного отклонения
+MAD_SCALE = 1.4826
+
+
+def _money(cents):
+    return Decimal(int(round(cents))).scaleb(-2)
+
+
+def group_medians(codes, values, groups):
+    """
+    Медианы values по группам codes (0..groups-1, каждая группа непуста)
+    одной сортировкой без цикла по группам. Возвращает (медианы, размеры групп).
+    """
+    ordered = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    return (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2, counts
+
+
+def transaction_outliers(codes, amounts, recent):
+    """
+    Транзакции намного выше типичной суммы своей категории.
+
+    codes - номер категории каждой транзакции, amounts - суммы, recent - маска
+    проверяемых транзакций (остальные только формируют базу). Возвращает
+    (маска выбросов, медиана категории, оценка) для каждой транзакции.
+    """
+    groups = int(codes.max()) + 1 if codes.size else 0
+    medians, counts = group_medians(codes, amounts, groups)
+    deviations, _ = group_medians(codes, np.abs(amounts - medians[codes]), groups)
+
+    # MAD равен нулю, когда большинство сумм совпадают; масштаб не меньше 10% медианы
+    scale = np.maximum(MAD_SCALE * deviations, np.maximum(0.1 * medians, 1))
+    baseline = medians[codes]
+    scores = (amounts - baseline) / scale[codes]
+
+    flagged = (
+        recent
+        & (counts[codes] >= MIN_TRANSACTIONS)
+        & (scores > ANOMALY_SCORE)
+        & (amounts > TRANSACTION_RATIO * baseline)
+    )
+    return flagged, baseline, scores
+
+
+def month_outliers(matrix, column):
+    """
+    Месяцы категорий намного выше скользящей медианы.
+
+    Столбец column матрицы (категории x месяцы) сравнивается с медианой и MAD
+    ненулевых месяцев из MONTH_WINDOW предыдущих столбцов. Возвращает (маска выбросов,
+    медиана, отношение к медиане) для каждой строки.
+    """
+    history = matrix[:, column - MONTH_WINDOW:column].astype(float)
+    active = (history > 0).sum(axis=1)
+    history[history <= 0] = np.nan
+
+    enough = active >= MIN_MONTHS
+    medians = np.zeros(len(matrix))
+    deviations = np.zeros(len(matrix))
+    if enough.any():
+        medians[enough] = np.nanmedian(history[enough], axis=1)
+        deviations[enough] = np.nanmedian(np.abs(history[enough] - medians[enough, None]), axis=1)
+
+    # Редкие покупки дают большой разброс месяцев: кратности медиане недостаточно,
+    # превышение должно быть большим и в масштабах MAD
+    values = matrix[:, column]
+    scale = np.maximum(MAD_SCALE * deviations, 0.1 * medians)
+    ratios = np.divide(values, medians, out=np.zeros(len(matrix)), where=medians > 0)
+    flagged = enough & (ratios > MONTH_RATIO) & (values - medians > ANOMALY_SCORE * scale)
+    return flagged, medians, ratios
+
+
+def find_transaction_anomalies(user_ids, today):
+    """Выбросы среди транзакций последних RECENT_DAYS дней (1-2 запроса на пачку)"""
+    recent_start = today - datetime.timedelta(days=RECENT_DAYS)
+    rows = np.array(list(Transaction.objects.filter(
+        user_id__in=user_ids,
+        transaction_type='expense',
+        date__gte=today - datetime.timedelta(days=BASELINE_DAYS),
+        date__lte=today
+    ).values_list(
+        'id', 'user_id', 'category_id',
+        Case(When(date__gte=recent_start, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        cents(F('amount'))
+    ).order_by()), dtype=np.int64).reshape(-1, 5)
+    ids, users, categories, recent, amounts = rows.T
+
+    # Категории принадлежат одному пользователю, поэтому группа - категория
+    _, codes = np.unique(categories, return_inverse=True)
+    flagged, baseline, scores = transaction_outliers(codes.reshape(-1), amounts, recent.astype(bool))
+
+    indexes = np.flatnonzero(flagged)
+    if not indexes.size:
+        return []
+    dates = dict(Transaction.objects.filter(id__in=ids[indexes].tolist()).values_list('id', 'date'))
+
+    return [
+        SpendingAnomaly(
+            user_id=int(users[index]),
+            kind='transaction',
+            category_id=int(categories[index]),
+            transaction_id=int(ids[index]),
+            period=dates[int(ids[index])],
+            amount=_money(amounts[index]),
+            baseline=_money(baseline[index]),
+            score=round(float(scores[index]), 4)
+        )
+        for index in indexes
+    ]
+
+
+def find_month_anomalies(user_ids, today):
+    """Выбросы среди сумм категорий за прошлый и текущий месяц (один запрос к агрегатам)"""
+    current = today.replace(day=1)
+    first_month = month_shift(current, -MONTH_WINDOW - 1)
+
+    cells = np.array(list(DailyCategoryRollup.objects.filter(
+        user_id__in=user_ids,
+        transaction_type='expense',
+        day__gte=first_month,
+        day__lte=today
+    ).values_list(
+        'user_id', 'category_id', MonthIndex('day')
+    ).annotate(cents=cents(Sum('total'))).order_by()), dtype=np.int64).reshape(-1, 4)
+    users, categories, months, totals = cells.T
+
+    keys, first_rows, codes = np.unique(categories, return_index=True, return_inverse=True)
+    matrix = np.zeros((len(keys), MONTH_WINDOW + 2), dtype=np.int64)
+    np.add.at(matrix, (codes.reshape(-1), months - month_index(first_month)), totals)
+    owners = users[first_rows]
+
+    anomalies = []
+    # Прошлый месяц целиком и текущий месяц на сегодняшний день
+    for column in (MONTH_WINDOW, MONTH_WINDOW + 1):
+        flagged, medians, ratios = month_outliers(matrix, column)
+        period = month_shift(first_month, column)
+        for index in np.flatnonzero(flagged):
+            anomalies.append(SpendingAnomaly(
+                user_id=int(owners[index]),
+                kind='category_month',
+                category_id=int(keys[index]),
+                period=period,
+                amount=_money(matrix[index, column]),
+                baseline=_money(medians[index]),
+                score=round(float(ratios[index]), 4)
+            ))
+    return anomalies
+
+
+def _anomaly_key(kind, category_id, transaction_id, period, amount, baseline):
+    return kind, category_id, transaction_id, period, Decimal(amount), Decimal(baseline)
+
+
+def detect_anomalies(user_ids, today=None):
+    """
+    Проверяет расходы пользователей user_ids и заменяет их флаги за проверяемый
+    период: транзакции последних RECENT_DAYS дней, прошлый и текущий месяц.
+    Число запросов на пачку не зависит от числа пользователей и транзакций.
+    Версия данных увеличивается только у пользователей, чьи флаги изменились.
+    Возвращает количество сохраненных флагов.
+    """
+    today = today or timezone.now().date()
+    anomalies = find_transaction_anomalies(user_ids, today) + find_month_anomalies(user_ids, today)
+
+    found = defaultdict(set)
+    for anomaly in anomalies:
+        found[anomaly.user_id].add(_anomaly_key(
+            anomaly.kind, anomaly.category_id, anomaly.transaction_id,
+            anomaly.period, anomaly.amount, anomaly.baseline
+        ))
+
+    with transaction.atomic():
+        stale = SpendingAnomaly.objects.filter(user_id__in=user_ids).filter(
+            Q(kind='transaction', period__gte=today - datetime.timedelta(days=RECENT_DAYS)) |
+            Q(kind='category_month', period__gte=month_shift(today.replace(day=1), -1))
+        )
+        existing = defaultdict(set)
+        for user_id, *key in stale.values_list(
+            'user_id', 'kind', 'category_id', 'transaction_id', 'period', 'amount', 'baseline'
+        ):
+            existing[user_id].add(_anomaly_key(*key))
+
+        stale.delete()
+        SpendingAnomaly.objects.bulk_create(anomalies, batch_size=1000, ignore_conflicts=True)
+
+        changed = [user_id for user_id in set(found) | set(existing) if found[user_id] != existing[user_id]]
+        if changed:
+            UserDataVersion.objects.filter(user_id__in=changed).update(version=F('version') + 1)
+
+    return len(anomalies)
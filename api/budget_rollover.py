@@ -0,0 +1,96 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from expenses.models import Budget, UserDataVersion
+from expenses.periods import month_shift
+
+# copy - те же суммы, carry_over - сумма плюс неизрасходованный остаток прошлого месяца
+ROLLOVER_MODES = ('copy', 'carry_over')
+
+# Пользователей в одной порции ночного переноса
+ROLLOVER_CHUNK_SIZE = 1000
+# Строк в одном INSERT
+ROLLOVER_BATCH_SIZE = 1000
+
+
+def rollover_budgets(user_ids, year, month, mode='copy'):
+    """
+    Переносит бюджеты пользователей user_ids из предыдущего месяца в (year, month).
+
+    Бюджеты, которые в новом месяце уже есть (созданы вручную или прошлым запуском),
+    не трогаются: они исключаются заранее, а параллельные вставки отсекаются
+    уникальным ограничением (user, category, month, year).
+    На порцию - фиксированное число запросов. Возвращает количество новых бюджетов.
+    """
+    if mode not in ROLLOVER_MODES:
+        raise ValueError(f'Неизвестный режим переноса: {mode}')
+
+    previous = month_shift(datetime.date(year, month, 1), -1)
+    budgets = Budget.objects.filter(user_id__in=user_ids, year=previous.year, month=previous.month)
+    fields = ['user_id', 'category_id', 'name', 'amount']
+    if mode == 'carry_over':
+        budgets = budgets.annotate(spent_amount=Budget.spent_subquery())
+        fields.append('spent_amount')
+
+    with transaction.atomic():
+        existing = set(Budget.objects.filter(
+            user_id__in=user_ids, year=year, month=month
+        ).values_list('user_id', 'category_id').order_by())
+
+        budgets_to_create = []
+        for user_id, category_id, name, amount, *spent in budgets.values_list(*fields).order_by().iterator():
+            if (user_id, category_id) in existing:
+                continue
+            if spent:
+                # Перерасход не уменьшает бюджет нового месяца
+                amount += max(amount - (spent[0] or 0), 0)
+            budgets_to_create.append(Budget(
+                user_id=user_id, category_id=category_id, name=name, amount=amount, year=year, month=month
+            ))
+
+        if not budgets_to_create:
+            return 0
+
+        try:
+            with transaction.atomic():
+                Budget.objects.bulk_create(budgets_to_create, batch_size=ROLLOVER_BATCH_SIZE)
+            created = len(budgets_to_create)
+        except IntegrityError:
+            # Часть бюджетов параллельно создал другой запрос: вставляем по одному,
+            # пропуская их, чтобы вернуть число действительно созданных бюджетов
+            created = 0
+            for budget in budgets_to_create:
+                try:
+                    with transaction.atomic():
+                        budget.save(force_insert=True)
+                    created += 1
+                except IntegrityError:
+                    continue
+
+        if created:
+            # bulk_create не отправляет сигналы: версии данных для ETag увеличиваются явно
+            UserDataVersion.objects.filter(
+                user_id__in={budget.user_id for budget in budgets_to_create}
+            ).update(version=F('version') + 1)
+
+    return created
+
+
+def rollover_all_budgets(year, month, mode='copy', chunk_size=ROLLOVER_CHUNK_SIZE):
+    """
+    Переносит бюджеты всех пользователей, у которых они были в предыдущем месяце,
+    порциями по chunk_size пользователей. Возвращает количество новых бюджетов.
+    """
+    previous = month_shift(datetime.date(year, month, 1), -1)
+    # Список id читается целиком до вставок: курсор по той же таблице не держится открытым
+    user_ids = list(Budget.objects.filter(
+        year=previous.year, month=previous.month
+    ).order_by('user_id').values_list('user_id', flat=True).distinct())
+
+    created = 0
+    for index in range(0, len(user_ids), chunk_size):
+        created += rollover_budgets(user_ids[index:index + chunk_size], year, month, mode)
+
+    return created
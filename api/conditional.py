@@ -0,0 +1,42 @@
+import hashlib
+from functools import wraps
+
+from django.utils import timezone
+from django.utils.cache import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from expenses.models import UserDataVersion
+
+
+def data_version_etag(request, version):
+    """
+    ETag строится из версии данных пользователя, пути с параметрами и текущей даты:
+    отчеты "за текущий месяц" меняются при смене дня даже без записей.
+    """
+    raw = f'{request.user.pk}:{version}:{timezone.now().date()}:{request.get_full_path()}'
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def etag_by_data_version(view_method):
+    """
+    Декоратор для читающих действий DRF: отдает ETag по версии данных пользователя
+    и отвечает 304 на совпадающий If-None-Match до выполнения агрегирующих запросов.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version = UserDataVersion.current(request.user.pk)
+        etag = data_version_etag(request, version)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            if '*' in etags or etag in etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    return wrapper
@@ -0,0 +1,156 @@
+from itertools import islice
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Aggregate, BigIntegerField, Case, Count, ExpressionWrapper, F, FloatField, IntegerField, Max, Min, Sum, Value, When
+from django.db.models.functions import Least
+
+from api.aggregates import cents
+
+# Квантили распределения сумм по категориям
+QUANTILES = {'median': 0.5, 'p90': 0.9}
+
+# Строк в одной порции потоковой обработки: память не зависит от объема истории
+STREAM_CHUNK_SIZE = 5000
+
+
+class Percentile(Aggregate):
+    """PERCENTILE_CONT(fraction) WITHIN GROUP (ORDER BY выражение) - только PostgreSQL"""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    output_field = FloatField()
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def category_distributions(transactions, bins):
+    """
+    Распределение сумм транзакций по категориям: количество, сумма, среднее,
+    минимум, максимум, квантили QUANTILES и гистограмма из bins равных интервалов
+    между минимумом и максимумом категории.
+
+    Количество, суммы и границы всегда считаются агрегатным запросом. В PostgreSQL
+    квантили и гистограмма тоже считаются в БД (PERCENTILE_CONT и GROUP BY по номеру
+    интервала), на остальных СУБД - потоковым проходом по отсортированным суммам
+    порциями STREAM_CHUNK_SIZE строк, без загрузки всей истории в память.
+
+    Возвращает словарь {id категории: статистика}, суммы в копейках.
+    """
+    transactions = transactions.order_by()
+    # Потоковый проход опирается на количества из агрегатного запроса:
+    # оба запроса должны видеть один снимок данных
+    with transaction.atomic(using=transactions.db):
+        return _category_distributions(transactions, bins)
+
+
+def _category_distributions(transactions, bins):
+    postgresql = connections[transactions.db].vendor == 'postgresql'
+
+    aggregates = {
+        'count': Count('id'),
+        'total': cents(Sum('amount')),
+        'low': cents(Min('amount')),
+        'high': cents(Max('amount')),
+    }
+    if postgresql:
+        aggregates.update({
+            name: Percentile(F('amount') * 100, fraction) for name, fraction in QUANTILES.items()
+        })
+
+    stats = {
+        row['category_id']: row
+        for row in transactions.values('category_id').annotate(**aggregates).order_by('category_id')
+    }
+    for row in stats.values():
+        row['mean'] = row['total'] / row['count']
+        row['histogram'] = np.zeros(bins, dtype=np.int64)
+
+    if not stats:
+        return stats
+    if postgresql:
+        _database_histograms(transactions, stats, bins)
+    else:
+        _stream_quantiles_and_histograms(transactions, stats, bins)
+    return stats
+
+
+def _database_histograms(transactions, stats, bins):
+    """Гистограммы одним запросом GROUP BY (категория, номер интервала)"""
+    def per_category(field):
+        return Case(
+            *[When(category_id=category_id, then=Value(row[field])) for category_id, row in stats.items()],
+            output_field=BigIntegerField()
+        )
+
+    for row in stats.values():
+        row['span'] = max(row['high'] - row['low'], 1)
+
+    # Сумма не меньше минимума категории, поэтому целочисленное деление округляет вниз
+    bucket = Least(
+        ExpressionWrapper(
+            (cents(F('amount')) - per_category('low')) * bins / per_category('span'),
+            output_field=BigIntegerField()
+        ),
+        Value(bins - 1),
+        output_field=IntegerField()
+    )
+    for category_id, index, count in transactions.annotate(bucket=bucket).values_list(
+        'category_id', 'bucket'
+    ).annotate(count=Count('id')).order_by():
+        stats[category_id]['histogram'][index] = count
+
+
+def _stream_quantiles_and_histograms(transactions, stats, bins):
+    """
+    Квантили и гистограммы одним проходом по суммам, отсортированным по категории и сумме.
+
+    Количество строк каждой категории известно заранее, поэтому номера строк,
+    нужные для квантилей (с линейной интерполяцией, как PERCENTILE_CONT и numpy),
+    вычисляются до прохода; в памяти держится только текущая порция.
+    """
+    categories = np.array(list(stats), dtype=np.int64)
+    counts = np.array([stats[category_id]['count'] for category_id in categories.tolist()], dtype=np.int64)
+    lows = np.array([stats[category_id]['low'] for category_id in categories.tolist()], dtype=np.int64)
+    spans = np.maximum(
+        np.array([stats[category_id]['high'] for category_id in categories.tolist()], dtype=np.int64) - lows, 1
+    )
+    starts = np.cumsum(counts) - counts
+    histograms = np.zeros((len(categories), bins), dtype=np.int64)
+
+    # Позиции квантилей в общей нумерации строк: нижняя и верхняя соседние строки
+    positions = {name: starts + fraction * (counts - 1) for name, fraction in QUANTILES.items()}
+    wanted = np.unique(np.concatenate([
+        np.concatenate([np.floor(position), np.ceil(position)]) for position in positions.values()
+    ]).astype(np.int64))
+    found = {}
+
+    rows = transactions.values_list('category_id', cents(F('amount'))).order_by('category_id', 'amount')
+    iterator = rows.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    offset = 0
+    while True:
+        chunk = np.array(list(islice(iterator, STREAM_CHUNK_SIZE)), dtype=np.int64).reshape(-1, 2)
+        if not len(chunk):
+            break
+        codes = np.searchsorted(categories, chunk[:, 0])
+        amounts = chunk[:, 1]
+
+        buckets = np.minimum((amounts - lows[codes]) * bins // spans[codes], bins - 1)
+        np.add.at(histograms, (codes, buckets), 1)
+
+        inside = wanted[(wanted >= offset) & (wanted < offset + len(chunk))]
+        found.update(zip(inside.tolist(), amounts[inside - offset].tolist()))
+        offset += len(chunk)
+
+    for name, position in positions.items():
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        lower_values = np.array([found[index] for index in lower.tolist()], dtype=float)
+        upper_values = np.array([found[index] for index in upper.tolist()], dtype=float)
+        values = lower_values + (upper_values - lower_values) * (position - lower)
+        for category_id, value in zip(categories.tolist(), values.tolist()):
+            stats[category_id][name] = value
+
+    for category_id, histogram in zip(categories.tolist(), histograms):
+        stats[category_id]['histogram'] = histogram
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from openpyxl import Workbook
+
+from expenses.models import Transaction
+from expenses.periods import period_filter
+
+# Размер пачки строк, которую курсор БД отдает за одно обращение
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_HEADER = ['Дата', 'Тип', 'Категория', 'Описание', 'Сумма']
+
+XLSX_SHEET_TITLE = 'Транзакции'
+
+# Префикс файлов экспорта в хранилище: exports/<user_id>/<имя>
+EXPORT_LOCATION = 'exports'
+
+EXPORT_FIELDS = ('id', 'date', 'transaction_type', 'category_id', 'category__name', 'description', 'amount')
+
+TRANSACTION_TYPE_DISPLAY = dict(Transaction.TRANSACTION_TYPE)
+
+
+def export_queryset(user, year=None, month=None):
+    """
+    Транзакции пользователя для экспорта: категория присоединяется в том же запросе,
+    строки читаются кортежами без создания моделей.
+    """
+    queryset = Transaction.objects.filter(user=user)
+
+    if year:
+        queryset = queryset.filter(**period_filter(year, month or None))
+    elif month:
+        queryset = queryset.filter(date__month=month)
+
+    return queryset.order_by('-date', '-id').values_list(*EXPORT_FIELDS)
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Итерирует строки через серверный курсор (.iterator), поэтому память
+    не зависит от количества транзакций пользователя.
+    """
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def csv_row(row):
+    _, date, transaction_type, _, category_name, description, amount = row
+    return [
+        date.strftime('%Y-%m-%d'),
+        TRANSACTION_TYPE_DISPLAY.get(transaction_type, transaction_type),
+        category_name,
+        description,
+        amount
+    ]
+
+
+def xlsx_row(row):
+    """Строка листа: дата и сумма записываются значениями, а не текстом"""
+    _, date, transaction_type, _, category_name, description, amount = row
+    return [
+        date,
+        TRANSACTION_TYPE_DISPLAY.get(transaction_type, transaction_type),
+        category_name,
+        description,
+        amount
+    ]
+
+
+def ndjson_line(row):
+    transaction_id, date, transaction_type, category_id, category_name, description, amount = row
+    return json.dumps({
+        'id': transaction_id,
+        'date': date.isoformat(),
+        'transaction_type': transaction_type,
+        'category': category_id,
+        'category_name': category_name,
+        'description': description,
+        'amount': str(amount)
+    }, ensure_ascii=False) + '\n'
+
+
+class EchoBuffer:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку вместо накопления"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(csv_row(row))
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield ndjson_line(row)
+
+
+def write_xlsx(rows, file):
+    """
+    Записывает строки экспорта в XLSX (file - путь или файловый объект).
+    Книга в режиме write_only сразу сбрасывает каждую строку во временный файл
+    на диске, поэтому память не зависит от количества строк.
+    Возвращает количество записанных транзакций.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(XLSX_SHEET_TITLE)
+    sheet.append(CSV_HEADER)
+
+    count = 0
+    for row in rows:
+        sheet.append(xlsx_row(row))
+        count += 1
+
+    workbook.save(file)
+    return count
+
+
+def export_storage():
+    """
+    Хранилище файлов экспорта. В S3 файлы лежат вне публичного префикса медиафайлов
+    и отдаются только по подписанной ссылке, которая действует EXPORT_URL_EXPIRE секунд.
+    """
+    if not getattr(settings, 'USE_S3', False):
+        return default_storage
+
+    from storages.backends.s3boto3 import S3Boto3Storage
+
+    # Для custom_domain django-storages строит неподписанные ссылки, поэтому он отключен
+    return S3Boto3Storage(
+        location='',
+        custom_domain=None,
+        default_acl='private',
+        querystring_auth=True,
+        querystring_expire=settings.EXPORT_URL_EXPIRE
+    )
+
+
+def delete_expired_exports(storage, expire_before):
+    """
+    Удаляет файлы экспорта, измененные раньше expire_before.
+    Возвращает количество удаленных файлов.
+    """
+    try:
+        user_dirs, _ = storage.listdir(EXPORT_LOCATION)
+    except FileNotFoundError:
+        return 0
+
+    deleted = 0
+    for user_dir in user_dirs:
+        path = os.path.join(EXPORT_LOCATION, user_dir)
+        for name in storage.listdir(path)[1]:
+            name = os.path.join(path, name)
+            if storage.get_modified_time(name) < expire_before:
+                storage.delete(name)
+                deleted += 1
+
+    return deleted
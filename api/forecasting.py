@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def forecast_spending(history, first_month, horizon, window=3):
+    """
+    Прогноз расходов по категориям на horizon месяцев вперед.
+
+    history - матрица (категории x месяцы) без пропусков месяцев, первый столбец
+    соответствует first_month, прогноз начинается со следующего за последним столбцом
+    месяца. Все категории считаются одним проходом numpy:
+
+    - скользящее среднее за последние window месяцев;
+    - сезонная база: среднее по тем же календарным месяцам прошлых лет
+      (суммы по месяцам года получаются умножением на one-hot матрицу месяцев);
+    - если история покрывает хотя бы год, прогноз - среднее двух баз,
+      иначе только скользящее среднее.
+
+    Возвращает матрицу (категории x horizon) того же масштаба, что history.
+    """
+    categories, months = history.shape
+    if months == 0:
+        return np.zeros((categories, horizon))
+
+    window = min(window, months)
+    moving = history[:, -window:].mean(axis=1)
+
+    offset = first_month.month - 1
+    month_of_year = (offset + np.arange(months)) % 12
+    one_hot = np.zeros((months, 12))
+    one_hot[np.arange(months), month_of_year] = 1
+
+    seasonal_sum = history @ one_hot
+    seasonal_count = one_hot.sum(axis=0)
+
+    future = (offset + months + np.arange(horizon)) % 12
+    seasonal = seasonal_sum[:, future] / np.maximum(seasonal_count[future], 1)
+    has_season = (seasonal_count[future] > 0) & (months >= 12)
+
+    return np.where(has_season, (moving[:, None] + seasonal) / 2, moving[:, None])
@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class RollbackBenchmark(Exception):
+    """Откат тестовых данных после замера"""
+
+
+@contextmanager
+def rollback_after():
+    """
+    Выполняет блок в транзакции БД, которая откатывается после выхода из блока:
+    данные замера не остаются в базе ни при успехе, ни при ошибке.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise RollbackBenchmark
+    except RollbackBenchmark:
+        pass
+
+
+def benchmark_prefix():
+    """Уникальный префикс имен пользователей тестовых данных"""
+    return f'bench-{time.time_ns()}'
+
+
+def best_time(repeat, func):
+    """Лучшее время из repeat вызовов func в секундах"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,83 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.anomalies import ANOMALY_CHUNK_SIZE, BASELINE_DAYS, detect_anomalies
+from api.management.benchmarking import benchmark_prefix, rollback_after
+from expenses.models import Category, Transaction
+from expenses.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер ночной проверки необычных расходов: пропускная способность в пользователях '
+        'в секунду и оценка времени для 100 тыс. пользователей на один воркер. '
+        'Данные создаются во временной транзакции БД и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Количество пользователей')
+        parser.add_argument('--categories', type=int, default=8, help='Категорий на пользователя')
+        parser.add_argument('--transactions', type=int, default=100,
+                            help=f'Расходов на пользователя за {BASELINE_DAYS} дней')
+        parser.add_argument('--chunk-size', type=int, default=ANOMALY_CHUNK_SIZE,
+                            help='Пользователей в пачке (как ANOMALY_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        with rollback_after():
+            user_ids = self._create_fixture(options['users'], options['categories'], options['transactions'])
+            started = time.perf_counter()
+            flagged = 0
+            for index in range(0, len(user_ids), chunk_size):
+                flagged += detect_anomalies(user_ids[index:index + chunk_size])
+            elapsed = time.perf_counter() - started
+
+        rate = len(user_ids) / elapsed
+        self.stdout.write(
+            f'Проверка: {len(user_ids)} пользователей за {elapsed:.2f} s пачками по {chunk_size} '
+            f'({rate:.0f} польз./s, {flagged} флагов); '
+            f'100 тыс. пользователей на один воркер: ~{100000 / rate / 60:.1f} мин'
+        )
+
+    def _create_fixture(self, users, categories, transactions):
+        # bulk_create не отправляет сигналов: категории по умолчанию не создаются,
+        # дневные агрегаты пересчитываются одним rebuild_rollups
+        prefix = benchmark_prefix()
+        User.objects.bulk_create(
+            [User(username=f'{prefix}-{index}') for index in range(users)], batch_size=1000
+        )
+        user_ids = list(User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', flat=True))
+
+        Category.objects.bulk_create([
+            Category(name=f'Benchmark {index}', user_id=user_id)
+            for user_id in user_ids for index in range(categories)
+        ], batch_size=5000)
+        category_ids = {}
+        for category_id, user_id in Category.objects.filter(user_id__in=user_ids).values_list('id', 'user_id'):
+            category_ids.setdefault(user_id, []).append(category_id)
+
+        rng = random.Random(0)
+        today = timezone.now().date()
+        rows = []
+        for user_id in user_ids:
+            for _ in range(transactions):
+                # Около 1% расходов в 10 раз дороже обычного
+                amount = rng.uniform(10, 100) * (10 if rng.random() < 0.01 else 1)
+                rows.append(Transaction(
+                    user_id=user_id,
+                    category_id=rng.choice(category_ids[user_id]),
+                    transaction_type='expense',
+                    description='Benchmark',
+                    amount=Decimal(f'{amount:.2f}'),
+                    date=today - datetime.timedelta(days=rng.randrange(BASELINE_DAYS))
+                ))
+        Transaction.objects.bulk_create(rows, batch_size=5000)
+        rebuild_rollups(user_ids)
+        return user_ids
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.management.benchmarking import benchmark_prefix, best_time, rollback_after
+from api.views.report_views import forecast_data
+from expenses.models import Category, DailyCategoryRollup
+from expenses.periods import month_shift
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер /reports/forecast/ для пользователя с длинной историей: запрос к дневным '
+        'агрегатам и прогноз numpy. Данные создаются во временной транзакции БД и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=10, help='Глубина истории в годах')
+        parser.add_argument('--categories', type=int, default=100, help='Количество категорий')
+        parser.add_argument('--days', type=int, default=4, help='Дней с расходами в месяце на категорию')
+        parser.add_argument('--history', type=int, default=36,
+                            help='Глубина истории прогноза в месяцах (как ?history=)')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+
+    def handle(self, *args, **options):
+        history = options['history']
+
+        with rollback_after():
+            user = self._create_fixture(options['years'] * 12, options['categories'], options['days'])
+            best = best_time(options['repeat'], lambda: forecast_data(user, horizon=6, history=history, window=3))
+
+        self.stdout.write(
+            f'Прогноз: {best * 1000:.1f} ms для {options["categories"]} категорий, '
+            f'{options["years"]} лет данных и {history} месяцев истории прогноза (цель: < 50 ms)'
+        )
+
+    def _create_fixture(self, history, categories, days):
+        user = User.objects.create(username=benchmark_prefix())
+        category_ids = [
+            Category.objects.create(name=f'Benchmark {index}', user=user).id
+            for index in range(categories)
+        ]
+        current = timezone.now().date().replace(day=1)
+
+        rows = []
+        for shift in range(history, 0, -1):
+            month = month_shift(current, -shift)
+            for index, category_id in enumerate(category_ids):
+                for day in range(days):
+                    rows.append(DailyCategoryRollup(
+                        user=user,
+                        category_id=category_id,
+                        transaction_type='expense',
+                        day=month.replace(day=1 + day * 7),
+                        total=Decimal(10 + (index + shift + day) % 90),
+                        count=1
+                    ))
+        DailyCategoryRollup.objects.bulk_create(rows, batch_size=5000)
+        return user
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.management.benchmarking import benchmark_prefix, best_time, rollback_after
+from api.serializers.transaction_serializers import TransactionSerializer, TransactionValuesSerializer
+from expenses.models import Category, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Микробенчмарк сериализации списка транзакций: TransactionSerializer по моделям '
+        'против TransactionValuesSerializer по .values(). Данные создаются во временной '
+        'транзакции БД и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Количество транзакций')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        # Лучшее время из нескольких повторов: запрос к БД + сериализация
+        with rollback_after():
+            queryset = self._create_fixture(rows)
+            model_path = best_time(repeat, lambda: TransactionSerializer(
+                queryset.select_related('category'), many=True
+            ).data)
+            values_path = best_time(repeat, lambda: TransactionValuesSerializer(
+                queryset.values(*TransactionValuesSerializer.values_fields())
+            ).data)
+
+        for label, seconds in (('ModelSerializer', model_path), ('values()', values_path)):
+            self.stdout.write(
+                f'{label:>16}: {seconds * 1000:8.1f} ms на {rows} строк, '
+                f'{seconds / rows * 1e6:6.2f} мкс/строка'
+            )
+        self.stdout.write(f'Ускорение: {model_path / values_path:.1f}x')
+
+    def _create_fixture(self, rows):
+        user = User.objects.create(username=benchmark_prefix())
+        category = Category.objects.create(name='Benchmark', user=user)
+        start = date(2020, 1, 1)
+        Transaction.objects.bulk_create(
+            Transaction(
+                amount=Decimal(index % 1000) + Decimal('0.99'),
+                description=f'Benchmark {index}',
+                date=start + timedelta(days=index % 1500),
+                category=category,
+                user=user,
+                transaction_type='expense' if index % 5 else 'income'
+            )
+            for index in range(rows)
+        )
+        return Transaction.objects.filter(user=user)
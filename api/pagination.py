@@ -1,6 +1,263 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class EstimatedCountPagination(StandardResultsSetPagination):
+    """
+    Постраничная пагинация без COUNT(*).
+
+    Наличие следующей страницы определяется выборкой page_size + 1 строк,
+    а count берется из оценки планировщика (PostgreSQL) или равен None.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound('Недопустимый номер страницы')
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+
+        self.has_next = len(rows) > page_size
+        self.count = estimate_count(queryset)
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_estimate': True,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация.
+
+    Вместо OFFSET следующая страница выбирается условием по последней строке
+    предыдущей: для порядка ('-date', '-id') это
+    date <= d AND (date < d OR (date = d AND id < i)),
+    что превращается в один поиск по индексу (user, date) на любой глубине.
+    Порядок задается представлением (keyset_ordering); другой ?ordering= дает 400.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-date', '-id')
+    invalid_cursor_message = 'Недопустимый курсор'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if view is not None and hasattr(view, 'get_keyset_ordering'):
+            self.ordering = tuple(view.get_keyset_ordering())
+
+        # Порядок keyset задан представлением: другой ?ordering= нельзя молча игнорировать
+        ordering_param = request.query_params.get(api_settings.ORDERING_PARAM)
+        if ordering_param and tuple(part.strip() for part in ordering_param.split(',')) != self.ordering:
+            raise ValidationError({
+                api_settings.ORDERING_PARAM: f'В режиме cursor порядок фиксирован: {",".join(self.ordering)}'
+            })
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def _seek_filter(self, ordering, position):
+        """Лексикографическое условие "строго после позиции" для порядка ordering"""
+        names = [field.lstrip('-') for field in ordering]
+        operators = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        seek = Q()
+        for index, (name, operator) in enumerate(zip(names, operators)):
+            condition = Q(**{f'{name}__{operator}': position[index]})
+            for prev_name, prev_value in zip(names[:index], position[:index]):
+                condition &= Q(**{prev_name: prev_value})
+            seek |= condition
+
+        # Дополнительная граница по первому полю дает планировщику диапазон по индексу
+        first_bound = Q(**{f'{names[0]}__{operators[0]}e': position[0]})
+        return first_bound & seek
+
+    def _position(self, row):
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            values = [row[name] for name in names]
+        else:
+            values = [getattr(row, name) for name in names]
+        return [str(value) for value in values]
+
+    def decode_cursor(self, request, model):
+        """
+        Позиция и направление из ?cursor=. Значения позиции приводятся полями модели,
+        как при фильтрации: курсор с подмененными значениями дает 404, а не ошибку запроса.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+            position = [field.get_prep_value(field.to_python(value)) for field, value in zip(fields, position)]
+            if None in position:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+
+class PaginationModeMixin:
+    """
+    Позволяет клиенту выбрать режим пагинации параметром ?pagination=:
+    cursor (keyset по keyset_ordering) или estimated (без COUNT(*)).
+    Режимы включаются только для действий из keyset_actions.
+    """
+    pagination_query_param = 'pagination'
+    pagination_modes = {
+        'cursor': KeysetPagination,
+        'estimated': EstimatedCountPagination,
+    }
+    keyset_actions = ()
+    keyset_ordering = KeysetPagination.ordering
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if getattr(self, 'action', None) in self.keyset_actions:
+                mode = self.request.query_params.get(self.pagination_query_param)
+                if mode is None and KeysetPagination.cursor_query_param in self.request.query_params:
+                    mode = 'cursor'
+                pagination_class = self.pagination_modes.get(mode, pagination_class)
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
+
+
+def _invert(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по плану запроса.
+    Поддерживается только PostgreSQL, для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    try:
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
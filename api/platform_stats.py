@@ -0,0 +1,116 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from expenses.models import DailyCategoryRollup, MonthlyBudgetSummary, PlatformStatsSnapshot, Transaction
+from expenses.periods import MonthIndex, month_index, month_shift
+from expenses.rollups import months_after, months_before
+
+# Пользователей в одной порции: каждый запрос читает только строки порции по индексам (user, ...)
+PLATFORM_STATS_CHUNK_SIZE = 2000
+# Месяцев в снимке: год и еще один месяц для роста первого из них
+PLATFORM_STATS_MONTHS = 13
+# Сколько категорий каждого типа хранится в снимке месяца
+TOP_CATEGORIES = 50
+
+GROWTH_FIELDS = ('active_users', 'total_income', 'total_expenses')
+
+
+def _growth(current, previous):
+    """Изменение в процентах; None, если в прошлом месяце нечего сравнивать"""
+    if not previous:
+        return None
+    return round(float((current - previous) / previous * 100), 2)
+
+
+def _iter_user_chunks(chunk_size):
+    chunk = []
+    for user_id in User.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def compute_platform_stats(months=PLATFORM_STATS_MONTHS, chunk_size=PLATFORM_STATS_CHUNK_SIZE, today=None):
+    """
+    Пересчитывает снимки PlatformStatsSnapshot за последние months месяцев.
+
+    Пользователи обходятся порциями по chunk_size: на порцию два агрегатных
+    запроса - к итогам месяцев (активные пользователи, доходы, расходы,
+    количество транзакций) и к дневным агрегатам категорий (объем по названию
+    категории). Суммы порций складываются в памяти, таблицы целиком
+    не сканируются одним запросом. Возвращает сохраненные снимки.
+    """
+    current = (today or timezone.now().date()).replace(day=1)
+    first_month = month_shift(current, -(months - 1))
+    first_index = month_index(first_month)
+
+    totals = defaultdict(lambda: {'active_users': 0, 'transaction_count': 0,
+                                  'total_income': Decimal(0), 'total_expenses': Decimal(0)})
+    categories = defaultdict(lambda: [Decimal(0), 0])
+
+    for user_ids in _iter_user_chunks(chunk_size):
+        for year, month, users, count, income, expenses in MonthlyBudgetSummary.objects.filter(
+            user_id__in=user_ids
+        ).exclude(
+            months_before(first_month.year, first_month.month) | months_after(current.year, current.month)
+        ).values_list('year', 'month').annotate(
+            users=Count('id'),
+            count=Sum('transaction_count'),
+            income=Sum('total_income'),
+            expenses=Sum('total_expenses')
+        ).order_by():
+            row = totals[year * 12 + month - 1]
+            row['active_users'] += users
+            row['transaction_count'] += count
+            row['total_income'] += income
+            row['total_expenses'] += expenses
+
+        for name, transaction_type, index, total, count in DailyCategoryRollup.objects.filter(
+            user_id__in=user_ids,
+            day__gte=first_month,
+            day__lt=month_shift(current, 1)
+        ).values_list('category__name', 'transaction_type', MonthIndex('day')).annotate(
+            total=Sum('total'),
+            count=Sum('count')
+        ).order_by():
+            cell = categories[(index, name, transaction_type)]
+            cell[0] += total
+            cell[1] += count
+
+    by_month = defaultdict(list)
+    for (index, name, transaction_type), (total, count) in categories.items():
+        by_month[index].append({'name': name, 'type': transaction_type, 'total': float(total), 'count': count})
+
+    snapshots = []
+    previous = None
+    for offset in range(months):
+        index = first_index + offset
+        row = totals[index]
+
+        top = []
+        for transaction_type, _ in Transaction.TRANSACTION_TYPE:
+            cells = [cell for cell in by_month[index] if cell['type'] == transaction_type]
+            top += sorted(cells, key=lambda cell: (-cell['total'], cell['name']))[:TOP_CATEGORIES]
+
+        snapshot, _ = PlatformStatsSnapshot.objects.update_or_create(
+            period=month_shift(first_month, offset),
+            defaults={
+                **row,
+                'categories': top,
+                'growth': {
+                    field: _growth(row[field], previous[field]) if previous else None
+                    for field in GROWTH_FIELDS
+                }
+            }
+        )
+        snapshots.append(snapshot)
+        previous = row
+
+    return snapshots
@@ -0,0 +1,78 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from expenses.report_cache import record_event, report_generation
+
+# Сколько секунд результат считается свежим; после этого он еще отдается
+# (stale-while-revalidate), пока один из запросов пересчитывает его
+REPORT_CACHE_FRESH_SECONDS = getattr(settings, 'REPORT_CACHE_FRESH_SECONDS', 300)
+# Сколько секунд результат хранится в кэше вообще
+REPORT_CACHE_TIMEOUT = getattr(settings, 'REPORT_CACHE_TIMEOUT', 24 * 60 * 60)
+# Время жизни блокировки пересчета на случай падения пересчитывающего запроса
+REPORT_CACHE_LOCK_SECONDS = 30
+
+
+def report_cache_key(request, endpoint):
+    """
+    Ключ результата: пользователь, отчет и период (путь с параметрами).
+    Текущая дата входит в ключ, так как периоды по умолчанию отсчитываются от нее.
+    """
+    raw = f'{timezone.now().date()}:{request.get_full_path()}'
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'report:{request.user.pk}:{endpoint}:{digest}'
+
+
+def cached_report(periods=None):
+    """
+    Декоратор для действий ReportViewSet: кэширует response.data в общем кэше.
+
+    periods(view, request, **kwargs) возвращает список (year, month), от которых
+    зависит отчет; без periods отчет зависит от всех транзакций пользователя.
+    Запись транзакций меняет поколения затронутых месяцев (expenses.report_cache),
+    и результат с другим поколением никогда не отдается. Устаревший по времени
+    результат отдается, пока его пересчитывает один запрос, получивший блокировку.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            months = periods(self, request, **kwargs) if periods else None
+            generation = report_generation(request.user.pk, months)
+            key = report_cache_key(request, view_method.__name__)
+            lock_key = f'{key}:lock'
+
+            locked = False
+            entry = cache.get(key)
+            if entry is not None and entry['generation'] == generation:
+                if time.time() - entry['created'] < REPORT_CACHE_FRESH_SECONDS:
+                    record_event('hits')
+                    return Response(entry['data'])
+                locked = cache.add(lock_key, 1, REPORT_CACHE_LOCK_SECONDS)
+                if not locked:
+                    # Результат уже пересчитывает другой запрос
+                    record_event('stale_hits')
+                    return Response(entry['data'])
+            record_event('misses')
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(key, {
+                        'data': response.data,
+                        'generation': generation,
+                        'created': time.time()
+                    }, REPORT_CACHE_TIMEOUT)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from expenses.models import Category
+from api.serializers.mixins import SparseFieldsetMixin
+from api.serializers.transaction_serializers import CategorySerializer
 
-class BudgetSerializer(serializers.Serializer):
+class BudgetSerializer(SparseFieldsetMixin, serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     name = serializers.CharField(max_length=100)
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -10,4 +12,14 @@ class BudgetSerializer(serializers.Serializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
     spent = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     remaining = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    progress = serializers.FloatField(read_only=True)
\ No newline at end of file
+    progress = serializers.FloatField(read_only=True)
+
+    # Вычисляемые поля читают сумму расходов по категории и периоду бюджета
+    field_sources = {
+        'spent': ('user', 'category', 'month', 'year'),
+        'remaining': ('amount', 'user', 'category', 'month', 'year'),
+        'progress': ('amount', 'user', 'category', 'month', 'year'),
+    }
+    expandable_fields = {
+        'category': (CategorySerializer, 'category', ('category__name',)),
+    }
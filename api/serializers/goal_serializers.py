@@ -1,10 +1,51 @@
+from decimal import Decimal
 from rest_framework import serializers
+from expenses.models import Goal
+from api.serializers.mixins import SparseFieldsetMixin
 
-class GoalSerializer(serializers.Serializer):
+class GoalSerializer(SparseFieldsetMixin, serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     name = serializers.CharField(max_length=100)
     target_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     current_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     deadline = serializers.DateField(allow_null=True, required=False)
     is_completed = serializers.BooleanField(read_only=True)
-    progress = serializers.FloatField(read_only=True)
\ No newline at end of file
+    progress = serializers.FloatField(read_only=True)
+
+    field_sources = {
+        'is_completed': ('current_amount', 'target_amount'),
+        'progress': ('current_amount', 'target_amount'),
+    }
+
+
+class GoalContributionItemSerializer(serializers.Serializer):
+    goal = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    date = serializers.DateField(required=False)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+
+class GoalContributionBatchSerializer(serializers.Serializer):
+    """
+    Пакет взносов в несколько целей. Принадлежность целей пользователю
+    проверяется одним запросом на весь пакет.
+    """
+    MAX_ITEMS = 500
+
+    contributions = GoalContributionItemSerializer(many=True)
+
+    def validate_contributions(self, items):
+        if not items:
+            raise serializers.ValidationError('Пакет не содержит взносов.')
+        if len(items) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f'Пакет не может содержать больше {self.MAX_ITEMS} взносов.')
+
+        user = self.context['request'].user
+        goal_ids = set(Goal.objects.filter(
+            user=user, id__in={item['goal'] for item in items}
+        ).values_list('id', flat=True))
+
+        errors = [{} if item['goal'] in goal_ids else {'goal': ['Цель не найдена.']} for item in items]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
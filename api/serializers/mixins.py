@@ -0,0 +1,83 @@
+from rest_framework import permissions
+
+
+def parse_fieldset(request):
+    """
+    Разбирает ?fields=id,amount и ?expand=category.
+    Возвращает (набор полей или None, набор раскрываемых связей).
+    Ограничение полей действует только для безопасных (читающих) запросов.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None, set()
+
+    def split(value):
+        return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+    fields = split(request.query_params.get('fields'))
+    expand = split(request.query_params.get('expand'))
+    return fields or None, expand
+
+
+class SparseFieldsetMixin:
+    """
+    Поддержка разреженных наборов полей для сериализаторов.
+
+    field_sources: поле сериализатора -> столбцы модели, нужные для его значения
+    (по умолчанию столбец с тем же именем), related_sources: поле -> связи
+    для select_related. expandable_fields: связь -> (класс сериализатора,
+    путь связи, столбцы связанной модели). По запрошенным полям
+    shape_queryset сужает выборку через .only() и добавляет select_related
+    только тогда, когда поле действительно читает связанную модель.
+    """
+    field_sources = {}
+    related_sources = {}
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = parse_fieldset(self.context.get('request'))
+
+        for name in expand & set(self.expandable_fields):
+            serializer_class, source, _ = self.expandable_fields[name]
+            extra = {'source': source} if source != name else {}
+            self.fields[name] = serializer_class(read_only=True, **extra)
+
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+    @classmethod
+    def all_field_names(cls):
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and getattr(meta, 'fields', None):
+            return list(meta.fields)
+        return list(cls._declared_fields)
+
+    @classmethod
+    def shape_queryset(cls, queryset, request):
+        """Сужает queryset под поля, которые вернет сериализатор"""
+        fields, expand = parse_fieldset(request)
+        names = cls.all_field_names()
+        if fields is not None:
+            names = [name for name in names if name in fields]
+        expand = expand & set(cls.expandable_fields) & set(names)
+
+        columns = {'pk'}
+        related = set()
+        for name in names:
+            if name in expand:
+                continue
+            columns.update(cls.field_sources.get(name, (name,)))
+            related.update(cls.related_sources.get(name, ()))
+
+        for name in expand:
+            _, source, related_columns = cls.expandable_fields[name]
+            columns.add(source)
+            columns.update(related_columns)
+            related.add(source)
+
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        else:
+            queryset = queryset.select_related(None)
+        return queryset.only(*sorted(columns))
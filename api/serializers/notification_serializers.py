@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from expenses.models import Notification
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'budget', 'payload', 'created_at']
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from expenses.models import PlatformStatsSnapshot, SpendingAnomaly
 
 class MonthlySummarySerializer(serializers.Serializer):
     month = serializers.CharField()
@@ -12,3 +13,17 @@ class CategoryBreakdownSerializer(serializers.Serializer):
     category_name = serializers.CharField()
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+class SpendingAnomalySerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = SpendingAnomaly
+        fields = ['id', 'kind', 'category', 'category_name', 'transaction', 'period',
+                  'amount', 'baseline', 'score', 'detected_at']
+
+class PlatformStatsSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlatformStatsSnapshot
+        fields = ['period', 'active_users', 'transaction_count', 'total_income', 'total_expenses',
+                  'categories', 'growth', 'computed_at']
@@ -1,5 +1,7 @@
+from decimal import Decimal, ROUND_HALF_UP
 from rest_framework import serializers
 from expenses.models import Transaction, Category
+from api.serializers.mixins import SparseFieldsetMixin
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,10 +9,181 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source='category.name')
+
+    field_sources = {
+        'category_name': ('category', 'category__name'),
+    }
+    related_sources = {
+        'category_name': ('category',),
+    }
+    expandable_fields = {
+        'category': (CategorySerializer, 'category', ('category__name',)),
+    }
     
     class Meta:
         model = Transaction
         fields = ['id', 'amount', 'description', 'date', 'category', 'category_name', 'transaction_type']
         read_only_fields = ['id', 'user']
+
+
+class TransactionBulkCreateItemSerializer(serializers.Serializer):
+    """Элемент пакетного создания: категория проверяется одним запросом в TransactionBulkSerializer"""
+    client_id = serializers.CharField(max_length=64, required=False)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    description = serializers.CharField(max_length=255)
+    date = serializers.DateField()
+    category = serializers.IntegerField()
+    transaction_type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPE)
+
+
+class TransactionBulkUpdateItemSerializer(TransactionBulkCreateItemSerializer):
+    """Элемент пакетного обновления: обязателен только id, остальные поля - частично"""
+    id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    description = serializers.CharField(max_length=255, required=False)
+    date = serializers.DateField(required=False)
+    category = serializers.IntegerField(required=False)
+    transaction_type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPE, required=False)
+
+
+class TransactionBulkSerializer(serializers.Serializer):
+    """
+    Пакет операций над транзакциями: create, update и delete.
+
+    Принадлежность категорий и транзакций пользователю проверяется
+    двумя запросами на весь пакет, а не отдельным запросом на элемент.
+    """
+    MAX_ITEMS = 500
+
+    create = TransactionBulkCreateItemSerializer(many=True, required=False)
+    update = TransactionBulkUpdateItemSerializer(many=True, required=False)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        creates = attrs.setdefault('create', [])
+        updates = attrs.setdefault('update', [])
+        deletes = attrs.setdefault('delete', [])
+
+        total = len(creates) + len(updates) + len(deletes)
+        if total == 0:
+            raise serializers.ValidationError('Пакет не содержит операций.')
+        if total > self.MAX_ITEMS:
+            raise serializers.ValidationError(f'Пакет не может содержать больше {self.MAX_ITEMS} операций.')
+
+        category_ids = {item['category'] for item in creates + updates if 'category' in item}
+        categories = Category.objects.filter(user=user, id__in=category_ids).in_bulk()
+
+        target_ids = [item['id'] for item in updates] + list(deletes)
+        # Только проверка принадлежности: изменяемые строки представление перечитывает под блокировкой
+        transactions = set(Transaction.objects.filter(
+            user=user, id__in=target_ids
+        ).values_list('id', flat=True))
+
+        errors = {}
+        create_errors = [
+            self._category_error(item, categories) for item in creates
+        ]
+        if any(create_errors):
+            errors['create'] = create_errors
+
+        seen = set()
+        update_errors = []
+        for item in updates:
+            item_errors = self._category_error(item, categories)
+            if item['id'] not in transactions:
+                item_errors['id'] = ['Транзакция не найдена.']
+            elif item['id'] in seen:
+                item_errors['id'] = ['Транзакция указана в пакете несколько раз.']
+            seen.add(item['id'])
+            update_errors.append(item_errors)
+        if any(update_errors):
+            errors['update'] = update_errors
+
+        delete_errors = {}
+        for index, transaction_id in enumerate(deletes):
+            if transaction_id not in transactions:
+                delete_errors[index] = ['Транзакция не найдена.']
+            elif transaction_id in seen:
+                delete_errors[index] = ['Транзакция указана в пакете несколько раз.']
+            seen.add(transaction_id)
+        if delete_errors:
+            errors['delete'] = delete_errors
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        attrs['categories'] = categories
+        return attrs
+
+    @staticmethod
+    def _category_error(item, categories):
+        if 'category' in item and item['category'] not in categories:
+            return {'category': ['Категория не найдена.']}
+        return {}
+
+
+class TransactionValuesSerializer:
+    """
+    Легковесный сериализатор только для чтения списков транзакций.
+
+    Работает со словарями из .values() без создания моделей и без полей DRF
+    и отдает JSON той же формы, что и TransactionSerializer, включая ?fields= и ?expand=.
+    """
+    # Поле ответа -> (поля .values(), преобразование строки)
+    representations = {
+        'id': (('id',), lambda row: row['id']),
+        'amount': (('amount',), lambda row: _format_amount(row['amount'])),
+        'description': (('description',), lambda row: row['description']),
+        'date': (('date',), lambda row: None if row['date'] is None else row['date'].isoformat()),
+        'category': (('category_id',), lambda row: row['category_id']),
+        'category_name': (('category__name',), lambda row: row['category__name']),
+        'transaction_type': (('transaction_type',), lambda row: row['transaction_type']),
+    }
+    expanded_representations = {
+        'category': (
+            ('category_id', 'category__name'),
+            lambda row: {'id': row['category_id'], 'name': row['category__name']}
+        ),
+    }
+
+    def __init__(self, rows, many=True, fields=None, expand=()):
+        self.rows = rows
+        self.many = many
+        self.plan = self.build_plan(fields, expand)
+
+    @classmethod
+    def build_plan(cls, fields=None, expand=()):
+        plan = []
+        for name, representation in cls.representations.items():
+            if fields is not None and name not in fields:
+                continue
+            if name in expand and name in cls.expanded_representations:
+                representation = cls.expanded_representations[name]
+            plan.append((name, representation))
+        return plan
+
+    @classmethod
+    def values_fields(cls, fields=None, expand=()):
+        columns = []
+        for _, (sources, _) in cls.build_plan(fields, expand):
+            columns.extend(source for source in sources if source not in columns)
+        return tuple(columns)
+
+    def to_representation(self, row):
+        return {name: convert(row) for name, (_, convert) in self.plan}
+
+    @property
+    def data(self):
+        if not self.many:
+            return self.to_representation(self.rows)
+        return [self.to_representation(row) for row in self.rows]
+
+
+def _format_amount(amount):
+    """Как DecimalField DRF: квантование до 2 знаков и строковое представление"""
+    if amount is None:
+        return None
+    return '{:f}'.format(amount.quantize(Decimal('0.01'), ROUND_HALF_UP))
@@ -1,6 +1,7 @@
 from celery import shared_task
 from django.utils import timezone
 from expenses.models import Transaction
+from expenses.periods import period_filter
 import csv
 import os
 from datetime import datetime, timedelta
@@ -14,6 +15,7 @@ def generate_monthly_report(user_id):
     """
     from django.contrib.auth.models import User
     from expenses.models import Transaction, MonthlyBudgetSummary
+    from expenses.rollups import rebuild_rollups
     from django.db.models import Sum
     
     try:
@@ -27,8 +29,7 @@ def generate_monthly_report(user_id):
         # Получить транзакции за предыдущий месяц
         transactions = Transaction.objects.filter(
             user=user,
-            date__year=last_month.year,
-            date__month=last_month.month
+            **period_filter(last_month.year, last_month.month)
         )
         
         # Суммарные показатели
@@ -36,19 +37,17 @@ def generate_monthly_report(user_id):
         income = transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
         expenses = transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
         balance = income - expenses
+        count = transactions.count()
         
-        # Сохраняем итоги месяца в БД
+        # Итоги месяца поддерживаются при каждой записи транзакции, здесь они
+        # только сверяются. От месяца зависят балансы на конец всех следующих
+        # месяцев, поэтому при расхождении агрегаты пользователя пересчитываются целиком
 
-        summary, created = MonthlyBudgetSummary.objects.update_or_create(
-            user=user,
-            month=last_month.month,
-            year=last_month.year,
-            defaults={
-                'total_income': income,
-                'total_expenses': expenses,
-                'balance': balance
-            }
-        )
+        stored = MonthlyBudgetSummary.objects.filter(
+            user=user, month=last_month.month, year=last_month.year
+        ).values_list('total_income', 'total_expenses', 'balance', 'transaction_count').first()
+        if stored != ((income, expenses, balance, count) if count else None):
+            rebuild_rollups([user.id])
         
         return f"Отчет успешно создан для пользователя {user.username} за {last_month.strftime('%B %Y')}"
     
@@ -65,24 +64,16 @@ def generate_csv_export(user_id, year=None, month=None):
     Генерирует экспорт транзакций в CSV для указанного пользователя
     """
     from django.contrib.auth.models import User
-    from expenses.models import Transaction
+    from api.exports import CSV_HEADER, csv_row, export_queryset, iter_export_rows
     import csv
     import io
     
     try:
         user = User.objects.get(id=user_id)
         
-        # Получаем транзакции
-
-        transactions = Transaction.objects.filter(user=user)
-        
-        if year:
-            transactions = transactions.filter(date__year=year)
+        # Получаем транзакции вместе с названием категории одним запросом
 
-        if month:
-            transactions = transactions.filter(date__month=month)
-        
-        transactions = transactions.order_by('-date')
+        transactions = export_queryset(user, year, month)
         
         # Создаем CSV в памяти
 
@@ -91,18 +82,12 @@ def generate_csv_export(user_id, year=None, month=None):
         
         # Записываем заголовки
 
-        writer.writerow(['Дата', 'Тип', 'Категория', 'Описание', 'Сумма'])
+        writer.writerow(CSV_HEADER)
         
         # Записываем транзакции
 
-        for transaction in transactions:
-            writer.writerow([
-                transaction.date.strftime('%Y-%m-%d'),
-                transaction.get_transaction_type_display(),
-                transaction.category.name,
-                transaction.description,
-                transaction.amount
-            ])
+        for row in iter_export_rows(transactions):
+            writer.writerow(csv_row(row))
         
         # Получаем строковое представление CSV
 
@@ -118,6 +103,62 @@ def generate_csv_export(user_id, year=None, month=None):
     except Exception as e:
         return f"Ошибка при генерации CSV: {str(e)}"
 
+@shared_task
+def generate_xlsx_export(user_id, year=None, month=None):
+
+    """
+    Генерирует экспорт транзакций в XLSX и сохраняет файл в хранилище файлов
+    """
+    from django.contrib.auth.models import User
+    from django.core.files import File
+    from api.exports import EXPORT_LOCATION, export_queryset, export_storage, iter_export_rows, write_xlsx
+    import tempfile
+    import uuid
+    
+    try:
+        user = User.objects.get(id=user_id)
+        
+        # Строки читаются серверным курсором и пишутся во временный файл на диске,
+        # в память не попадает ни весь результат запроса, ни вся книга
+
+        with tempfile.TemporaryFile(suffix='.xlsx') as temp_file:
+            rows = write_xlsx(iter_export_rows(export_queryset(user, year, month)), temp_file)
+            temp_file.seek(0)
+            
+            # Случайное имя, подписанная ссылка с коротким сроком действия и очистка
+            # старых файлов задачей cleanup_expired_exports
+
+            storage = export_storage()
+            name = storage.save(
+                f'{EXPORT_LOCATION}/{user.id}/transactions-{uuid.uuid4().hex}.xlsx', File(temp_file)
+            )
+        
+        return {
+            'file': name,
+            'url': storage.url(name),
+            'rows': rows
+        }
+        
+    except User.DoesNotExist:
+        return f"Пользователь с ID {user_id} не найден"
+    except Exception as e:
+        return f"Ошибка при генерации XLSX: {str(e)}"
+
+@shared_task
+def cleanup_expired_exports():
+
+    """
+    Удаляет файлы экспорта старше EXPORT_RETENTION_HOURS (ежечасно)
+    """
+    from django.conf import settings
+    from api.exports import delete_expired_exports, export_storage
+
+    expire_before = timezone.now() - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+
+    return {
+        'deleted': delete_expired_exports(export_storage(), expire_before)
+    }
+
 @shared_task
 def process_csv_import(user_id, file_path):
 
@@ -204,3 +245,93 @@ def process_csv_import(user_id, file_path):
             'success': False,
             'error': f"Ошибка при импорте: {str(e)}"
         }
+
+@shared_task
+def detect_spending_anomalies():
+
+    """
+    Ночная проверка необычных расходов всех активных пользователей.
+    Пользователи делятся на пачки по ANOMALY_CHUNK_SIZE, каждая пачка проверяется
+    отдельной задачей, поэтому пачки обрабатываются параллельно всеми воркерами
+    """
+    from django.contrib.auth.models import User
+    from api.anomalies import ANOMALY_CHUNK_SIZE
+
+    # Одна дата на весь запуск, даже если пачки обрабатываются после полуночи
+    today = timezone.now().date().isoformat()
+
+    chunks = 0
+    chunk = []
+    user_ids = User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+    for user_id in user_ids.iterator(chunk_size=ANOMALY_CHUNK_SIZE):
+        chunk.append(user_id)
+        if len(chunk) == ANOMALY_CHUNK_SIZE:
+            detect_anomalies_chunk.delay(chunk, today)
+            chunks += 1
+            chunk = []
+    if chunk:
+        detect_anomalies_chunk.delay(chunk, today)
+        chunks += 1
+
+    return chunks
+
+@shared_task
+def detect_anomalies_chunk(user_ids, today=None):
+
+    """
+    Проверяет расходы пачки пользователей и возвращает объем и время работы
+    """
+    from api.anomalies import detect_anomalies
+    import time
+
+    started = time.perf_counter()
+    flagged = detect_anomalies(user_ids, datetime.strptime(today, '%Y-%m-%d').date() if today else None)
+
+    return {
+        'users': len(user_ids),
+        'anomalies': flagged,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+@shared_task
+def compute_platform_stats():
+
+    """
+    Ночной пересчет итогов по всем пользователям для панели персонала
+    """
+    from api.platform_stats import compute_platform_stats as compute
+    import time
+
+    started = time.perf_counter()
+    snapshots = compute()
+
+    return {
+        'months': len(snapshots),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+@shared_task
+def rollover_monthly_budgets(year=None, month=None, mode=None):
+
+    """
+    Перенос бюджетов прошлого месяца в текущий для всех пользователей (1-го числа)
+    """
+    from django.conf import settings
+    from api.budget_rollover import rollover_all_budgets
+    import time
+
+    today = timezone.now().date()
+    year = year or today.year
+    month = month or today.month
+    mode = mode or getattr(settings, 'BUDGET_ROLLOVER_MODE', 'copy')
+
+    started = time.perf_counter()
+    created = rollover_all_budgets(year, month, mode)
+
+    return {
+        'year': year,
+        'month': month,
+        'mode': mode,
+        'created': created,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
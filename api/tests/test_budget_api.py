@@ -0,0 +1,215 @@
+from django.urls import reverse
+from django.db import connection
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from expenses.models import Budget, Category, Transaction
+from api.budget_rollover import rollover_all_budgets
+from decimal import Decimal
+from datetime import date
+
+class BudgetAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.categories = [
+            Category.objects.create(name=f'Budget Category {index}', user=self.user)
+            for index in range(3)
+        ]
+        self.budgets = [
+            Budget.objects.create(
+                name=f'Budget {index}', amount=Decimal('100.00'), month=3, year=2024,
+                category=category, user=self.user
+            )
+            for index, category in enumerate(self.categories)
+        ]
+        Transaction.objects.create(
+            amount=Decimal('40.00'), description='Spent', date=date(2024, 3, 10),
+            category=self.categories[0], user=self.user, transaction_type='expense'
+        )
+
+        self.list_url = reverse('budget-list')
+
+    def test_list_sparse_fields_skip_spent_queries(self):
+        """Тест: без вычисляемых полей список не считает расходы"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, {'fields': 'id,name,amount'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'amount'})
+
+    def test_list_expand_category(self):
+        """Тест: ?expand=category разворачивает категорию бюджета"""
+        response = self.client.get(self.list_url, {'fields': 'id,category', 'expand': 'category'})
+        names = {row['category']['name'] for row in response.data['results']}
+        self.assertEqual(names, {category.name for category in self.categories})
+
+    def test_list_spent_query_count_is_constant(self):
+        """Тест: потраченные суммы списка считаются одним запросом при любом числе бюджетов"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        spent = {row['name']: (row['spent'], row['remaining'], row['progress']) for row in response.data['results']}
+        self.assertEqual(spent['Budget 0'], ('40.00', '60.00', 40.0))
+        self.assertEqual(spent['Budget 1'], ('0.00', '100.00', 0.0))
+
+        # Расходы другого месяца в бюджет не входят
+        Transaction.objects.create(
+            amount=Decimal('25.00'), description='April', date=date(2024, 4, 1),
+            category=self.categories[0], user=self.user, transaction_type='expense'
+        )
+        for index in range(3, 20):
+            category = Category.objects.create(name=f'Budget Category {index}', user=self.user)
+            Budget.objects.create(
+                name=f'Budget {index}', amount=Decimal('100.00'), month=3, year=2024,
+                category=category, user=self.user
+            )
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIn(('Budget 0', '40.00'), [(row['name'], row['spent']) for row in response.data['results']])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Формат плана запроса зависит от СУБД')
+    def test_spent_subquery_uses_day_range(self):
+        """Тест: подзапрос расходов ищет дни месяца бюджета по индексу, а не сканирует историю категории"""
+        plan = Budget.objects.filter(user=self.user).annotate(spent_amount=Budget.spent_subquery()).explain()
+        self.assertIn('day>', plan)
+        self.assertIn('day<', plan)
+
+        # Декабрь граничит с январем следующего года
+        Budget.objects.create(
+            name='December', amount=Decimal('10.00'), month=12, year=2023, category=self.categories[0], user=self.user
+        )
+        for day in (date(2023, 12, 31), date(2024, 1, 1)):
+            Transaction.objects.create(
+                amount=Decimal('3.00'), description='Edge', date=day,
+                category=self.categories[0], user=self.user, transaction_type='expense'
+            )
+        budget = Budget.objects.annotate(spent_amount=Budget.spent_subquery()).get(name='December')
+        self.assertEqual(budget.spent, Decimal('3.00'))
+
+    def test_retrieve_matches_property(self):
+        """Тест: аннотация в карточке бюджета совпадает со свойством модели"""
+        budget = self.budgets[0]
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('budget-detail', kwargs={'pk': budget.pk}))
+        self.assertEqual(Decimal(response.data['spent']), budget.spent)
+        self.assertEqual(Decimal(response.data['remaining']), budget.remaining)
+
+    def test_rollover_copy_and_carry_over(self):
+        """Тест: перенос бюджетов в следующий месяц копирует суммы или добавляет остаток"""
+        url = reverse('budget-rollover')
+        response = self.client.post(url, {'year': 2024, 'month': 4, 'mode': 'carry_over'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+
+        amounts = dict(Budget.objects.filter(month=4, year=2024).values_list('name', 'amount'))
+        self.assertEqual(amounts, {'Budget 0': Decimal('160.00'), 'Budget 1': Decimal('200.00'), 'Budget 2': Decimal('200.00')})
+
+        # Повторный перенос не дублирует и не меняет бюджеты
+        response = self.client.post(url, {'year': 2024, 'month': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(Budget.objects.filter(month=4, year=2024).count(), 3)
+
+    def test_rollover_all_users_in_chunks(self):
+        """Тест: ночной перенос обходит пользователей порциями и не трогает существующие бюджеты"""
+        other = User.objects.create_user(username='otheruser', password='testpassword123')
+        category = Category.objects.create(name='Other category', user=other)
+        Budget.objects.create(name='Other', amount=Decimal('70.00'), month=3, year=2024, category=category, user=other)
+        Budget.objects.create(
+            name='Manual', amount=Decimal('5.00'), month=4, year=2024, category=self.categories[1], user=self.user
+        )
+
+        # Список пользователей и фиксированное число запросов на каждую порцию
+        with self.assertNumQueries(17):
+            self.assertEqual(rollover_all_budgets(2024, 4, chunk_size=1), 3)
+
+        budgets = dict(Budget.objects.filter(month=4, year=2024).values_list('name', 'amount'))
+        self.assertEqual(budgets, {
+            'Budget 0': Decimal('100.00'), 'Manual': Decimal('5.00'),
+            'Budget 2': Decimal('100.00'), 'Other': Decimal('70.00')
+        })
+
+    def test_rollover_invalid_params(self):
+        """Тест: неизвестный режим или год вне диапазона datetime дают 400"""
+        url = reverse('budget-rollover')
+        for data in ({'mode': 'move'}, {'year': 0, 'month': 5}, {'year': 1, 'month': 1}, {'year': 9999, 'month': 1}):
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
+    def test_rollover_counts_only_inserted_rows(self):
+        """Тест: бюджет, параллельно созданный другим запросом, не считается созданным переносом"""
+        inserted = []
+
+        def concurrent_insert(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            # Другой запрос вставляет бюджет сразу после того, как перенос прочитал существующие
+            if not inserted and sql.startswith('SELECT "expenses_budget"."user_id", "expenses_budget"."category_id" FROM'):
+                inserted.append(Budget.objects.create(
+                    name='Concurrent', amount=Decimal('1.00'), month=4, year=2024,
+                    category=self.categories[0], user=self.user
+                ))
+            return result
+
+        with connection.execute_wrapper(concurrent_insert):
+            response = self.client.post(reverse('budget-rollover'), {'year': 2024, 'month': 4})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Budget.objects.filter(month=4, year=2024).count(), 3)
+
+    def test_history_matrix(self):
+        """Тест: история бюджетов за несколько месяцев считается фиксированным числом запросов"""
+        Budget.objects.create(
+            name='April', amount=Decimal('50.00'), month=4, year=2024, category=self.categories[0], user=self.user
+        )
+        Transaction.objects.create(
+            amount=Decimal('70.00'), description='April', date=date(2024, 4, 2),
+            category=self.categories[0], user=self.user, transaction_type='expense'
+        )
+        Transaction.objects.create(
+            amount=Decimal('15.50'), description='March', date=date(2024, 3, 31),
+            category=self.categories[1], user=self.user, transaction_type='expense'
+        )
+
+        url = reverse('budget-history')
+        params = {'start': '2024-02-15', 'end': '2024-04-30'}
+        # Первый запрос создает запись версии данных
+        self.client.get(url, params)
+        # Версия данных, бюджеты периода и агрегат расходов
+        with self.assertNumQueries(3):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data['periods'], [date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)])
+        self.assertEqual([row['name'] for row in response.data['categories']],
+                         ['Budget Category 0', 'Budget Category 1', 'Budget Category 2'])
+        self.assertEqual(response.data['budgeted'][0], [None, 100.0, 50.0])
+        self.assertEqual(response.data['spent'][0], [0.0, 40.0, 70.0])
+        self.assertEqual(response.data['overspent'][0], [None, 0.0, 20.0])
+        self.assertEqual(response.data['spent'][1], [0.0, 15.5, 0.0])
+        self.assertEqual(response.data['totals'], {
+            'budgeted': [0.0, 300.0, 50.0],
+            'spent': [0.0, 55.5, 70.0],
+            'overspent': [0.0, 0.0, 20.0]
+        })
+
+    def test_history_invalid_range(self):
+        """Тест: история длиннее предела, с неверными датами или с концом в 9999 году дает 400"""
+        url = reverse('budget-history')
+        for params in (
+            {'start': '2000-01-01', 'end': '2024-01-01'}, {'start': '2024-13-01'},
+            {'start': '9999-11-01', 'end': '9999-12-31'}, {'start': '0001-01-01', 'end': '9998-12-31'}
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -2,7 +2,12 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework.test import APITestCase
-from expenses.models import Category
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from expenses.models import Budget, Category, DeletedRecord, MonthlyBudgetSummary, Transaction
+from expenses.rollups import find_rollup_mismatches
+from decimal import Decimal
+from datetime import date
 
 class CategoryAPITests(APITestCase):
     def setUp(self):
@@ -99,6 +104,29 @@ class CategoryAPITests(APITestCase):
 
         self.assertEqual(Category.objects.count(), initial_count - 1)
     
+    def test_delete_category_cascade_query_count_does_not_grow(self):
+        """Тест: каскад удаления категории обрабатывается пакетно, а не по строке на транзакцию"""
+        def delete_category(size):
+            category = Category.objects.create(name=f'Cascade {size}', user=self.user)
+            for _ in range(size):
+                Transaction.objects.create(
+                    amount=Decimal('1.00'), description='Cascade', date=date(2024, 3, 1),
+                    category=category, user=self.user, transaction_type='expense'
+                )
+            Budget.objects.create(name='Cascade', amount=Decimal('10.00'), month=3, year=2024, category=category, user=self.user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(reverse('category-detail', kwargs={'pk': category.pk}))
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            return len(queries)
+
+        self.assertEqual(delete_category(3), delete_category(30))
+
+        self.assertEqual(DeletedRecord.objects.filter(user=self.user, model_name='transaction').count(), 33)
+        self.assertEqual(DeletedRecord.objects.filter(user=self.user, model_name='budget').count(), 2)
+        self.assertEqual(DeletedRecord.objects.filter(user=self.user, model_name='category').count(), 2)
+        self.assertEqual(find_rollup_mismatches([self.user.id]), [])
+        self.assertFalse(MonthlyBudgetSummary.objects.filter(user=self.user, year=2024, month=3).exists())
+    
     def test_unauthorized_access(self):
         """Тест: доступ без авторизации должен быть запрещен"""
 
@@ -0,0 +1,88 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from expenses.models import Transaction, Category, Budget, Goal
+from decimal import Decimal
+from datetime import date
+
+class DashboardAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.food = Category.objects.create(name='Food', user=self.user)
+        self.salary = Category.objects.create(name='Salary', user=self.user)
+        self.url = reverse('dashboard')
+        self.params = {'year': 2024, 'month': 3}
+        self.budgets = 0
+        self.add_data(3)
+
+        # Первый запрос создает строку версии данных для ETag
+        self.client.get(self.url, self.params)
+
+    def add_data(self, count):
+        for index in range(count):
+            Transaction.objects.create(
+                amount=Decimal('10.00'), description=f'Food {index}', date=date(2024, 3, 1 + index),
+                category=self.food, user=self.user, transaction_type='expense'
+            )
+            category = Category.objects.create(name=f'Budget category {self.budgets}', user=self.user)
+            Budget.objects.create(
+                name=f'Budget {self.budgets}', amount=Decimal('100.00'), category=category,
+                month=3, year=2024, user=self.user
+            )
+            self.budgets += 1
+            Goal.objects.create(name=f'Goal {index}', target_amount=Decimal('100.00'), user=self.user)
+        Transaction.objects.create(
+            amount=Decimal('500.00'), description='Salary', date=date(2024, 3, 10),
+            category=self.salary, user=self.user, transaction_type='income'
+        )
+
+    def test_dashboard_matches_endpoints(self):
+        """Тест: дашборд отдает те же данные, что отдельные эндпоинты"""
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        summary = self.client.get(reverse('report-monthly-summary', kwargs={'year': '2024', 'month': '3'}))
+        breakdown = self.client.get(reverse('report-category-breakdown', kwargs={'year': '2024', 'month': '3'}))
+        budgets = self.client.get(reverse('budget-status'), self.params)
+        goals = self.client.get(reverse('goal-progress'))
+
+        self.assertEqual(response.data['summary'], summary.data)
+        self.assertEqual(response.data['category_breakdown'], breakdown.data)
+        self.assertEqual(response.data['budgets'], budgets.data)
+        self.assertEqual(response.data['goals'], goals.data)
+        self.assertEqual(len(response.data['transactions']['results']), 4)
+        self.assertEqual(response.data['transactions']['results'][0]['description'], 'Salary')
+
+    def test_fixed_query_count(self):
+        """Тест: число запросов не зависит от объема данных"""
+        with self.assertNumQueries(6):
+            self.client.get(self.url, self.params)
+
+        self.add_data(10)
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, {**self.params, 'transactions_limit': 5})
+        self.assertEqual(len(response.data['transactions']['results']), 5)
+        self.assertTrue(response.data['transactions']['has_more'])
+
+    def test_invalid_month(self):
+        """Тест: неверный месяц дает 400"""
+        response = self.client.get(self.url, {'year': 2024, 'month': 13})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_year(self):
+        """Тест: год вне диапазона datetime дает 400"""
+        for year in (0, 9999, 10000):
+            response = self.client.get(self.url, {'year': year, 'month': 1})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
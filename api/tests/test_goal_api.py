@@ -0,0 +1,136 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from expenses.models import Goal, GoalContribution
+from decimal import Decimal
+from datetime import date
+
+class GoalAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        # Создаем тестовую цель
+
+        self.goal = Goal.objects.create(
+            name='Vacation',
+            target_amount=Decimal('1000.00'),
+            user=self.user
+        )
+
+        self.contributions_url = reverse('goal-contributions', args=[self.goal.id])
+
+    def test_contributions_are_paginated(self):
+        """Тест: взносы цели отдаются постранично"""
+        for day in range(1, 4):
+            GoalContribution.objects.create(goal=self.goal, amount=Decimal('10.00'), date=date(2024, 1, day))
+
+        response = self.client.get(self.contributions_url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_contributions_cursor_pagination(self):
+        """Тест: курсорная пагинация взносов по (date, id)"""
+        for day in range(1, 6):
+            GoalContribution.objects.create(goal=self.goal, amount=Decimal('10.00'), date=date(2024, 1, day))
+
+        response = self.client.get(self.contributions_url, {'pagination': 'cursor', 'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['date'], date(2024, 1, 5))
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['date'] for item in response.data['results']], [date(2024, 1, 2), date(2024, 1, 1)])
+        self.assertIsNone(response.data['next'])
+
+    def test_list_sparse_fields(self):
+        """Тест: ?fields= для целей"""
+        response = self.client.get(reverse('goal-list'), {'fields': 'id,progress'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': self.goal.id, 'progress': 0.0}])
+
+    def test_contributions_update_goal_incrementally(self):
+        """Тест: взнос, изменение и удаление взноса меняют сумму цели на разницу"""
+        url = reverse('goal-add-contribution', args=[self.goal.id])
+        response = self.client.post(url, {'amount': '150.25', 'date': '2024-01-10'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['goal_current_amount'], Decimal('150.25'))
+
+        other_goal = Goal.objects.create(name='Car', target_amount=Decimal('500.00'), user=self.user)
+        contribution = GoalContribution.objects.get(id=response.data['id'])
+        contribution.amount = Decimal('100.00')
+        contribution.save()
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('100.00'))
+
+        # Перенос взноса в другую цель
+        contribution.goal = other_goal
+        contribution.save()
+        self.goal.refresh_from_db()
+        other_goal.refresh_from_db()
+        self.assertEqual((self.goal.current_amount, other_goal.current_amount), (Decimal('0.00'), Decimal('100.00')))
+
+        GoalContribution.objects.filter(goal=other_goal).delete()
+        other_goal.refresh_from_db()
+        self.assertEqual(other_goal.current_amount, Decimal('0.00'))
+
+    def test_batch_contributions(self):
+        """Тест: пакет взносов в несколько целей записывается одной транзакцией"""
+        other_goal = Goal.objects.create(name='Car', target_amount=Decimal('50.00'), user=self.user)
+        url = reverse('goal-batch-contributions')
+        response = self.client.post(url, {'contributions': [
+            {'goal': self.goal.id, 'amount': '10.00', 'date': '2024-01-01'},
+            {'goal': other_goal.id, 'amount': '30.00'},
+            {'goal': self.goal.id, 'amount': '5.50', 'description': 'Tip'},
+            {'goal': other_goal.id, 'amount': '20.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['contributions']), 4)
+        self.assertTrue(all(item['id'] for item in response.data['contributions']))
+        self.assertEqual(
+            {goal['id']: (goal['current_amount'], goal['is_completed']) for goal in response.data['goals']},
+            {self.goal.id: (Decimal('15.50'), False), other_goal.id: (Decimal('50.00'), True)}
+        )
+        self.assertEqual(
+            dict(Goal.objects.values_list('id', 'current_amount')),
+            {self.goal.id: Decimal('15.50'), other_goal.id: Decimal('50.00')}
+        )
+
+    def test_batch_contributions_rejects_foreign_goal(self):
+        """Тест: пакет с чужой целью отклоняется целиком"""
+        stranger = User.objects.create_user(username='stranger', password='testpassword123')
+        foreign_goal = Goal.objects.create(name='Foreign', target_amount=Decimal('10.00'), user=stranger)
+        response = self.client.post(reverse('goal-batch-contributions'), {'contributions': [
+            {'goal': self.goal.id, 'amount': '10.00'},
+            {'goal': foreign_goal.id, 'amount': '10.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['contributions'][1]['goal'], ['Цель не найдена.'])
+        self.assertFalse(GoalContribution.objects.exists())
+
+    def test_goal_delete_skips_contribution_updates(self):
+        """Тест: удаление цели не изменяет ее сумму по каждому каскадно удаляемому взносу"""
+        def delete_goal(contributions):
+            goal = Goal.objects.create(name='Temp', target_amount=Decimal('10.00'), user=self.user)
+            for _ in range(contributions):
+                GoalContribution.objects.create(goal=goal, amount=Decimal('1.00'))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(reverse('goal-detail', args=[goal.id]))
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            return len(queries)
+
+        self.assertEqual(delete_goal(2), delete_goal(20))
+        self.assertFalse(GoalContribution.objects.exists())
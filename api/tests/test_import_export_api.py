@@ -0,0 +1,162 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from expenses.models import Transaction, Category
+from api.exports import export_storage
+from api.tasks import cleanup_expired_exports, generate_xlsx_export
+from openpyxl import load_workbook
+from unittest.mock import Mock, patch
+from decimal import Decimal
+from datetime import date
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+class ExportTestCase(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Export Category', user=self.user)
+        for day in range(1, 6):
+            Transaction.objects.create(
+                amount=Decimal('10.50'),
+                description=f'Row {day}',
+                date=date(2024, 3, day),
+                category=self.category,
+                user=self.user,
+                transaction_type='expense'
+            )
+        Transaction.objects.create(
+            amount=Decimal('500.00'),
+            description='Salary',
+            date=date(2024, 4, 1),
+            category=self.category,
+            user=self.user,
+            transaction_type='income'
+        )
+
+
+class ExportStreamAPITests(ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('export-stream')
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_export(self):
+        """Тест: потоковый экспорт в NDJSON"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['description'], 'Salary')
+        self.assertEqual(rows[0]['category_name'], 'Export Category')
+        self.assertEqual(rows[1]['amount'], '10.50')
+
+    def test_csv_export_by_month(self):
+        """Тест: потоковый экспорт в CSV за месяц"""
+        response = self.client.get(self.url, {'output': 'csv', 'year': 2024, 'month': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        rows = list(csv.reader(io.StringIO(self._content(response))))
+        self.assertEqual(rows[0], ['Дата', 'Тип', 'Категория', 'Описание', 'Сумма'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1], ['2024-03-05', 'Expense', 'Export Category', 'Row 5', '10.50'])
+
+    def test_export_query_count_is_constant(self):
+        """Тест: категория присоединяется в том же запросе, без N+1"""
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self._content(response)
+
+    def test_invalid_output(self):
+        """Тест: неизвестный формат отклоняется"""
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_period(self):
+        """Тест: год вне диапазона datetime или неверный месяц дают 400"""
+        for url in (self.url, reverse('export-xlsx')):
+            for params in ({'year': 0}, {'year': 9999}, {'year': 2024, 'month': 13}):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (url, params))
+
+
+class ExportXLSXTests(ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_xlsx_export_task(self):
+        """Тест: задача пишет XLSX в хранилище файлов"""
+        with override_settings(MEDIA_ROOT=self.media_root):
+            result = generate_xlsx_export(self.user.id, '2024', '3')
+            self.assertEqual(result['rows'], 5)
+            self.assertTrue(result['file'].startswith(f'exports/{self.user.id}/'))
+
+            with default_storage.open(result['file']) as file:
+                workbook = load_workbook(file, read_only=True)
+                rows = list(workbook['Транзакции'].values)
+
+        self.assertEqual(list(rows[0]), ['Дата', 'Тип', 'Категория', 'Описание', 'Сумма'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][1:], ('Expense', 'Export Category', 'Row 5', 10.5))
+        self.assertEqual(rows[1][0].date(), date(2024, 3, 5))
+
+    @override_settings(
+        USE_S3=True, AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_CUSTOM_DOMAIN='bucket.s3.amazonaws.com',
+        AWS_LOCATION='media', AWS_QUERYSTRING_AUTH=False, AWS_ACCESS_KEY_ID='key',
+        AWS_SECRET_ACCESS_KEY='secret', AWS_S3_REGION_NAME='us-east-1', EXPORT_URL_EXPIRE=600
+    )
+    def test_s3_export_url_is_signed(self):
+        """Тест: в S3 ссылка на экспорт подписана, истекает и не попадает в публичный префикс медиафайлов"""
+        url = export_storage().url(f'exports/{self.user.id}/transactions.xlsx')
+        self.assertIn(f'/exports/{self.user.id}/transactions.xlsx?', url)
+        self.assertNotIn('/media/', url)
+        self.assertIn('Signature=', url)
+        self.assertIn('Expires=', url)
+
+    def test_cleanup_expired_exports(self):
+        """Тест: очистка удаляет только файлы экспорта старше срока хранения"""
+        with override_settings(MEDIA_ROOT=self.media_root, EXPORT_RETENTION_HOURS=24):
+            old = default_storage.save(f'exports/{self.user.id}/old.xlsx', ContentFile(b'old'))
+            fresh = default_storage.save(f'exports/{self.user.id}/fresh.xlsx', ContentFile(b'fresh'))
+            expired = time.time() - 25 * 3600
+            os.utime(default_storage.path(old), (expired, expired))
+
+            self.assertEqual(cleanup_expired_exports(), {'deleted': 1})
+            self.assertFalse(default_storage.exists(old))
+            self.assertTrue(default_storage.exists(fresh))
+
+    def test_xlsx_export_view_starts_task(self):
+        """Тест: эндпоинт ставит задачу экспорта в XLSX"""
+        with patch.object(generate_xlsx_export, 'delay', return_value=Mock(id='task-id')) as delay:
+            response = self.client.get(reverse('export-xlsx'), {'year': 2024})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['task_id'], 'task-id')
+        self.assertIn('XLSX', response.data['message'])
+        delay.assert_called_once_with(self.user.id, 2024, None)
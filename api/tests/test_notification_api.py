@@ -0,0 +1,91 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from expenses.models import Transaction, Category, Budget, Notification
+from decimal import Decimal
+from datetime import date
+
+class NotificationAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Food', user=self.user)
+        self.budget = Budget.objects.create(
+            name='Food budget', amount=Decimal('100.00'), category=self.category,
+            month=3, year=2024, user=self.user
+        )
+        self.url = reverse('notifications')
+
+    def expense(self, amount, day=date(2024, 3, 10), category=None):
+        return Transaction.objects.create(
+            amount=Decimal(amount), description='Expense', date=day,
+            category=category or self.category, user=self.user, transaction_type='expense'
+        )
+
+    def thresholds(self):
+        return [notification.payload['threshold'] for notification in Notification.objects.all()]
+
+    def test_thresholds_recorded_once_per_crossing(self):
+        """Тест: уведомление создается при пересечении порога, а не при каждой записи"""
+        self.expense('50.00')
+        self.assertEqual(self.thresholds(), [])
+
+        self.expense('35.00')
+        self.assertEqual(self.thresholds(), [80])
+        self.expense('5.00')
+        self.assertEqual(self.thresholds(), [80])
+
+        # Изменение суммы пересекает оставшийся порог
+        transaction = self.expense('1.00')
+        transaction.amount = Decimal('20.00')
+        transaction.save()
+        self.assertEqual(self.thresholds(), [80, 100])
+
+        notification = Notification.objects.last()
+        self.assertEqual(notification.budget, self.budget)
+        self.assertEqual(notification.payload['spent'], '110.00')
+
+    def test_other_months_and_categories_ignored(self):
+        """Тест: расходы других месяцев, категорий и доходы не проверяют бюджет"""
+        other = Category.objects.create(name='Other', user=self.user)
+        self.expense('500.00', day=date(2024, 4, 1))
+        self.expense('500.00', category=other)
+        Transaction.objects.create(
+            amount=Decimal('500.00'), description='Salary', date=date(2024, 3, 1),
+            category=self.category, user=self.user, transaction_type='income'
+        )
+        self.assertFalse(Notification.objects.exists())
+
+    def test_cursor_reads_only_new_notifications(self):
+        """Тест: клиент получает только уведомления новее курсора"""
+        self.expense('85.00')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['payload']['threshold'] for row in response.data['results']], [80])
+        cursor = response.data['cursor']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'after': cursor})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['cursor'], cursor)
+
+        self.expense('20.00')
+        response = self.client.get(self.url, {'after': cursor})
+        self.assertEqual([row['payload']['threshold'] for row in response.data['results']], [100])
+        self.assertFalse(response.data['has_more'])
+
+    def test_invalid_cursor(self):
+        """Тест: отрицательный курсор дает 400"""
+        response = self.client.get(self.url, {'after': -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
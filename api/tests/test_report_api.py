@@ -0,0 +1,698 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.utils import timezone
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase
+from django.core.management.base import CommandError
+from expenses.models import (
+    Transaction, Category, DailyCategoryRollup, MonthlyBudgetSummary, PlatformStatsSnapshot, SpendingAnomaly, UserDataVersion
+)
+from expenses.periods import month_shift
+from expenses.report_cache import report_cache_stats
+from expenses.rollups import find_rollup_mismatches
+from api.forecasting import forecast_spending
+from api.anomalies import detect_anomalies, group_medians
+from api.distributions import _database_histograms, category_distributions
+from api.platform_stats import compute_platform_stats
+from api.tasks import detect_anomalies_chunk
+from api.report_cache import report_cache_key
+from decimal import Decimal
+from datetime import date, timedelta
+from io import StringIO
+import numpy as np
+from unittest.mock import patch
+
+class ReportAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Food', user=self.user)
+        self.salary = Category.objects.create(name='Salary', user=self.user)
+
+        self._create('expense', '30.00', date(2024, 3, 5))
+        self._create('expense', '20.00', date(2024, 3, 20), category=self.category)
+        self._create('income', '100.00', date(2024, 3, 1), category=self.salary)
+        self._create('expense', '15.00', date(2024, 4, 2))
+
+        self.summary_url = reverse('report-monthly-summary', kwargs={'year': '2024', 'month': '3'})
+
+    def _create(self, transaction_type, amount, day, category=None):
+        return Transaction.objects.create(
+            amount=Decimal(amount),
+            description='Report',
+            date=day,
+            category=category or self.category,
+            user=self.user,
+            transaction_type=transaction_type
+        )
+
+    def test_monthly_summary(self):
+        """Тест: месячная сводка"""
+        response = self.client.get(self.summary_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['income_total'], '100.00')
+        self.assertEqual(response.data['expense_total'], '50.00')
+        self.assertEqual(response.data['balance'], '50.00')
+
+
+class ReportPeriodValidationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='periods', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_invalid_year_or_month(self):
+        """Тест: год вне datetime.MINYEAR..MAXYEAR или месяц вне 1-12 дают 400, а не ошибку сервера"""
+        urls = [
+            reverse('report-monthly-summary', kwargs={'year': '0000', 'month': '3'}),
+            reverse('report-monthly-summary', kwargs={'year': '2024', 'month': '13'}),
+            reverse('report-category-breakdown', kwargs={'year': '9999', 'month': '12'}),
+            reverse('report-yearly-comparison', kwargs={'year': '0000'}),
+            reverse('report-yearly-comparison', kwargs={'year': '9999'}),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST, url)
+
+
+class ReportETagTests(ReportAPITests):
+    def test_not_modified_skips_aggregation(self):
+        """Тест: совпадающий If-None-Match дает 304 одним запросом версии"""
+        response = self.client.get(self.summary_url)
+        etag = response['ETag']
+        self.assertTrue(etag)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.summary_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """Тест: запись транзакции меняет версию данных и ETag"""
+        etag = self.client.get(self.summary_url)['ETag']
+
+        self._create('expense', '5.00', date(2024, 3, 7))
+
+        response = self.client.get(self.summary_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bulk_write_changes_etag(self):
+        """Тест: пакетная запись тоже меняет ETag"""
+        url = reverse('transaction-stats')
+        etag = self.client.get(url, {'year': 2024, 'month': 3})['ETag']
+
+        self.client.post(reverse('transaction-bulk'), {'create': [{
+            'amount': '1.00', 'description': 'Bulk', 'date': '2024-03-10',
+            'category': self.category.id, 'transaction_type': 'expense'
+        }]}, format='json')
+
+        response = self.client.get(url, {'year': 2024, 'month': 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_differs_per_period(self):
+        """Тест: ETag зависит от параметров запроса"""
+        url = reverse('budget-status')
+        march = self.client.get(url, {'year': 2024, 'month': 3})['ETag']
+        april = self.client.get(url, {'year': 2024, 'month': 4})['ETag']
+        self.assertNotEqual(march, april)
+
+
+class RollupConsistencyTests(ReportAPITests):
+    def assertRollupsConsistent(self):
+        self.assertEqual(find_rollup_mismatches([self.user.id]), [])
+
+    def test_create_update_delete(self):
+        """Тест: агрегаты следуют за созданием, изменением и удалением транзакций"""
+        self.assertRollupsConsistent()
+
+        transaction = self._create('expense', '12.50', date(2024, 3, 5))
+        transaction.amount = Decimal('40.00')
+        transaction.date = date(2024, 3, 6)
+        transaction.category = self.salary
+        transaction.save()
+        self.assertRollupsConsistent()
+
+        transaction.delete()
+        self.assertRollupsConsistent()
+        self.assertFalse(DailyCategoryRollup.objects.filter(day=date(2024, 3, 6)).exists())
+
+    def test_bulk_endpoint(self):
+        """Тест: пакетный эндпоинт поддерживает агрегаты"""
+        existing = Transaction.objects.filter(user=self.user, date=date(2024, 4, 2)).get()
+        deleted = Transaction.objects.filter(user=self.user, date=date(2024, 3, 1)).get()
+
+        response = self.client.post(reverse('transaction-bulk'), {
+            'create': [{
+                'amount': '7.00', 'description': 'Bulk', 'date': '2024-03-05',
+                'category': self.category.id, 'transaction_type': 'expense'
+            }],
+            'update': [{'id': existing.id, 'amount': '18.00', 'date': '2024-04-03'}],
+            'delete': [deleted.id]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRollupsConsistent()
+
+    def test_category_cascade(self):
+        """Тест: удаление категории каскадом убирает ее агрегаты"""
+        self.salary.delete()
+        self.assertRollupsConsistent()
+
+        response = self.client.get(self.summary_url)
+        self.assertEqual(response.data['income_total'], '0.00')
+
+    def test_rebuild_command(self):
+        """Тест: команда пересчета восстанавливает рассинхронизированные агрегаты"""
+        DailyCategoryRollup.objects.filter(user=self.user).update(total=Decimal('1.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', '--check', '--user', self.user.id, stdout=StringIO())
+
+        call_command('rebuild_rollups', '--user', self.user.id, stdout=StringIO())
+        self.assertRollupsConsistent()
+        call_command('rebuild_rollups', '--check', '--user', self.user.id, stdout=StringIO())
+
+    def test_monthly_summary_follows_writes(self):
+        """Тест: итоги месяца обновляются при записи и удаляются вместе с последней транзакцией"""
+        april = Transaction.objects.get(user=self.user, date=date(2024, 4, 2))
+        april.date = date(2024, 5, 2)
+        april.save()
+        self.assertRollupsConsistent()
+
+        summaries = MonthlyBudgetSummary.objects.filter(user=self.user).order_by('year', 'month')
+        self.assertEqual([(row.month, row.transaction_count) for row in summaries], [(3, 3), (5, 1)])
+
+        april.delete()
+        self.assertFalse(MonthlyBudgetSummary.objects.filter(user=self.user, month=5).exists())
+
+    def test_yearly_comparison_from_summaries(self):
+        """Тест: сравнение по году читается из итогов месяцев"""
+        url = reverse('report-yearly-comparison', kwargs={'year': '2024'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), [
+            {'month': 3, 'income': 100.0, 'expenses': 50.0},
+            {'month': 4, 'income': 0.0, 'expenses': 15.0},
+        ])
+
+
+class SeriesReportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='historyuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', user=self.user)
+
+        for amount, day, transaction_type in [
+            ('100.00', date(2024, 3, 1), 'income'),
+            ('30.00', date(2024, 3, 5), 'expense'),
+            ('20.00', date(2024, 3, 20), 'expense'),
+            ('15.00', date(2024, 4, 2), 'expense'),
+        ]:
+            Transaction.objects.create(
+                amount=Decimal(amount), description='History', date=day,
+                category=self.category, user=self.user, transaction_type=transaction_type
+            )
+
+
+class BalanceHistoryTests(SeriesReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('report-balance-history')
+
+    def balances(self, response):
+        return [(point['date'], point['balance']) for point in response.data['points']]
+
+    def test_daily_from_checkpoint(self):
+        """Тест: дневная история начинается с баланса на конец предыдущего месяца"""
+        response = self.client.get(self.url, {'start': '2024-04-01', 'end': '2024-04-03'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.balances(response), [
+            (date(2024, 4, 1), Decimal('50.00')),
+            (date(2024, 4, 2), Decimal('35.00')),
+            (date(2024, 4, 3), Decimal('35.00')),
+        ])
+
+    def test_monthly_and_backdated_write(self):
+        """Тест: запись задним числом сдвигает балансы всех последующих месяцев"""
+        Transaction.objects.create(
+            amount=Decimal('10.00'), description='Backdated', date=date(2024, 1, 15),
+            category=self.category, user=self.user, transaction_type='income'
+        )
+        self.assertEqual(find_rollup_mismatches([self.user.id]), [])
+
+        response = self.client.get(self.url, {'start': '2024-02-01', 'end': '2024-04-30', 'granularity': 'month'})
+        self.assertEqual(self.balances(response), [
+            (date(2024, 2, 1), Decimal('10.00')),
+            (date(2024, 3, 1), Decimal('60.00')),
+            (date(2024, 4, 1), Decimal('45.00')),
+        ])
+
+    def test_long_range_query_count(self):
+        """Тест: пятилетний дневной график строится постоянным числом запросов"""
+        self.client.get(self.url)  # создает строку версии данных для ETag
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'start': '2020-01-01', 'end': '2024-12-31'})
+        self.assertEqual(len(response.data['points']), 1827)
+        self.assertEqual(response.data['points'][-1]['balance'], Decimal('35.00'))
+
+    def test_invalid_params(self):
+        """Тест: неверные параметры дают 400"""
+        self.assertEqual(self.client.get(self.url, {'granularity': 'hour'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'start': '2024-13-01'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_edges(self):
+        """Тест: месяц контрольной точки до 0001-01-01 или конец периода в 9999 году дают 400"""
+        for params in ({'start': '0001-01-01', 'end': '0001-01-31'}, {'start': '9999-12-01', 'end': '9999-12-15'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+        response = self.client.get(self.url, {'start': '0001-02-01', 'end': '0001-02-02'})
+        self.assertEqual(self.balances(response), [(date(1, 2, 1), Decimal('0')), (date(1, 2, 2), Decimal('0'))])
+
+
+class ReportCacheTests(ReportAPITests):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_repeat_served_from_cache(self):
+        """Тест: повторный отчет отдается из кэша без агрегирующих запросов"""
+        first = self.client.get(self.summary_url)
+        with self.assertNumQueries(1):  # только версия данных для ETag
+            second = self.client.get(self.summary_url)
+        self.assertEqual(second.data, first.data)
+
+        stats = report_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_write_invalidates_only_affected_month(self):
+        """Тест: запись в марте сбрасывает мартовский отчет, но не апрельский"""
+        april_url = reverse('report-monthly-summary', kwargs={'year': '2024', 'month': '4'})
+        self.client.get(self.summary_url)
+        self.client.get(april_url)
+
+        self._create('expense', '5.00', date(2024, 3, 7))
+
+        response = self.client.get(self.summary_url)
+        self.assertEqual(response.data['expense_total'], '55.00')
+        with self.assertNumQueries(1):
+            response = self.client.get(april_url)
+        self.assertEqual(response.data['expense_total'], '15.00')
+
+    def test_category_rename_invalidates(self):
+        """Тест: переименование категории сбрасывает кэш отчетов"""
+        url = reverse('report-category-breakdown', kwargs={'year': '2024', 'month': '3'})
+        self.client.get(url)
+
+        self.category.name = 'Groceries'
+        self.category.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['category_name'], 'Groceries')
+
+    def test_stale_while_revalidate(self):
+        """Тест: устаревший результат отдается, пока его пересчитывает другой запрос"""
+        self.client.get(self.summary_url)
+
+        request = RequestFactory().get(self.summary_url)
+        request.user = self.user
+        lock_key = report_cache_key(request, 'monthly_summary') + ':lock'
+
+        with patch('api.report_cache.REPORT_CACHE_FRESH_SECONDS', 0):
+            cache.add(lock_key, 1)
+            with self.assertNumQueries(1):
+                response = self.client.get(self.summary_url)
+            self.assertEqual(response.data['expense_total'], '50.00')
+            self.assertEqual(report_cache_stats()['stale_hits'], 1)
+
+            cache.delete(lock_key)
+            self.client.get(self.summary_url)
+            self.assertEqual(report_cache_stats()['misses'], 2)
+
+    def test_cache_stats_staff_only(self):
+        """Тест: счетчики кэша доступны только персоналу"""
+        url = reverse('report-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
+
+
+class TimeseriesTests(SeriesReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('report-timeseries')
+
+    def test_monthly_dense_columns(self):
+        """Тест: месячная серия без пропусков в колоночном формате"""
+        response = self.client.get(self.url, {
+            'start': '2024-02-01', 'end': '2024-05-31', 'granularity': 'month',
+            'metrics': 'income,expenses,savings_rate'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['periods'], [
+            date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1), date(2024, 5, 1)
+        ])
+        self.assertEqual(response.data['income'], [0.0, 100.0, 0.0, 0.0])
+        self.assertEqual(response.data['expenses'], [0.0, 50.0, 15.0, 0.0])
+        self.assertEqual(response.data['savings_rate'], [0.0, 50.0, 0.0, 0.0])
+        self.assertNotIn('savings', response.data)
+        # Пустые интервалы не отличаются типом от заполненных
+        for name in ('income', 'expenses', 'savings_rate'):
+            self.assertTrue(all(type(value) is float for value in response.data[name]), name)
+
+    def test_quarter_single_query(self):
+        """Тест: серия строится одним сгруппированным запросом"""
+        self.client.get(self.url)  # создает строку версии данных для ETag
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'start': '2024-01-01', 'end': '2024-12-31', 'granularity': 'quarter'})
+        self.assertEqual(response.data['savings'], [50.0, -15.0, 0.0, 0.0])
+
+    def test_invalid_metrics(self):
+        """Тест: неизвестная метрика дает 400"""
+        response = self.client.get(self.url, {'metrics': 'income,profit'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_edges(self):
+        """Тест: период у границ календаря (последний год или окно до 0001-01-01) дает 400"""
+        for params in (
+            {'start': '9999-12-30', 'end': '9999-12-31'},
+            {'start': '9998-01-01', 'end': '9999-01-01', 'granularity': 'year'},
+            {'end': '0001-02-01'},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+        response = self.client.get(self.url, {'start': '0001-01-01', 'end': '0001-01-03'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, {'start': '9998-12-01', 'end': '9998-12-31', 'granularity': 'year'})
+        self.assertEqual(response.data['periods'], [date(9998, 1, 1)])
+
+
+class CategoryMatrixTests(SeriesReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('report-category-matrix')
+        self.transport = Category.objects.create(name='Transport', user=self.user)
+        Transaction.objects.create(
+            amount=Decimal('80.50'), description='Taxi', date=date(2024, 4, 15),
+            category=self.transport, user=self.user, transaction_type='expense'
+        )
+
+    def test_dense_matrix_with_totals(self):
+        """Тест: плотная матрица категорий и месяцев с итогами строк и столбцов"""
+        self.client.get(self.url)  # создает строку версии данных для ETag
+        with self.assertNumQueries(3):  # версия данных, ячейки матрицы, названия категорий
+            response = self.client.get(self.url, {'start': '2024-02-01', 'end': '2024-05-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data['periods'], [
+            date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1), date(2024, 5, 1)
+        ])
+        self.assertEqual([category['name'] for category in response.data['categories']], ['Transport', 'Food'])
+        self.assertEqual(response.data['values'], [[0, 0, 80.5, 0], [0, 50.0, 15.0, 0]])
+        self.assertEqual(response.data['row_totals'], [80.5, 65.0])
+        self.assertEqual(response.data['column_totals'], [0, 50.0, 95.5, 0])
+        self.assertEqual(response.data['total'], 145.5)
+
+    def test_empty_range_and_invalid_type(self):
+        """Тест: пустой период дает пустую матрицу, неизвестный type или период в 9999 году - 400"""
+        response = self.client.get(self.url, {'start': '2023-01-01', 'end': '2023-02-28'})
+        self.assertEqual(response.data['categories'], [])
+        self.assertEqual(response.data['column_totals'], [0, 0])
+
+        response = self.client.get(self.url, {'type': 'transfer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'start': '9999-11-01', 'end': '9999-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CategoryStatsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='statsuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', user=self.user)
+        self.rent = Category.objects.create(name='Rent', user=self.user)
+        self.url = reverse('report-category-stats')
+        self.params = {'start': '2024-01-01', 'end': '2024-12-31'}
+
+        self.amounts = [Decimal(value) for value in ('3.50', '7.25', '10.00', '12.40', '18.00', '25.10', '99.99')]
+        for index, amount in enumerate(self.amounts):
+            self.expense(self.food, amount, date(2024, 2, 1 + index))
+        self.expense(self.rent, Decimal('500.00'), date(2024, 2, 1))
+        # Вне периода и доход в статистику не входят
+        self.expense(self.food, Decimal('1000.00'), date(2023, 12, 31))
+        Transaction.objects.create(
+            amount=Decimal('1000.00'), description='Salary', date=date(2024, 2, 1),
+            category=self.food, user=self.user, transaction_type='income'
+        )
+
+    def expense(self, category, amount, day):
+        Transaction.objects.create(
+            amount=amount, description='Stats', date=day,
+            category=category, user=self.user, transaction_type='expense'
+        )
+
+    def test_distribution_matches_numpy(self):
+        """Тест: медиана, p90 и гистограмма совпадают с расчетом numpy"""
+        response = self.client.get(self.url, {**self.params, 'bins': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rent, food = response.data['categories']
+        self.assertEqual((rent['category_name'], rent['count'], rent['median'], rent['p90']), ('Rent', 1, 500.0, 500.0))
+
+        values = np.array([float(amount) for amount in self.amounts])
+        counts, edges = np.histogram(values, bins=4)
+        self.assertEqual(food['count'], 7)
+        self.assertEqual(food['total'], float(sum(self.amounts)))
+        self.assertEqual(food['median'], round(float(np.median(values)), 2))
+        self.assertEqual(food['p90'], round(float(np.percentile(values, 90)), 2))
+        self.assertEqual((food['min'], food['max']), (3.5, 99.99))
+        self.assertEqual(food['histogram']['counts'], counts.tolist())
+        self.assertEqual(food['histogram']['edges'], np.round(edges, 2).tolist())
+
+    def test_streaming_matches_database_histograms(self):
+        """Тест: потоковый расчет малыми порциями совпадает с гистограммами БД"""
+        transactions = Transaction.objects.filter(user=self.user, transaction_type='expense')
+        stats = category_distributions(transactions, 5)
+
+        with patch('api.distributions.STREAM_CHUNK_SIZE', 2):
+            streamed = category_distributions(transactions, 5)
+        database = {category_id: {**row, 'histogram': np.zeros(5, dtype=np.int64)} for category_id, row in stats.items()}
+        _database_histograms(transactions, database, 5)
+
+        for category_id, row in stats.items():
+            self.assertEqual(streamed[category_id]['median'], row['median'])
+            self.assertEqual(streamed[category_id]['histogram'].tolist(), row['histogram'].tolist())
+            self.assertEqual(database[category_id]['histogram'].tolist(), row['histogram'].tolist())
+
+    def test_invalid_bins(self):
+        """Тест: количество интервалов вне пределов или период в 9999 году дают 400"""
+        response = self.client.get(self.url, {**self.params, 'bins': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'start': '9999-12-01', 'end': '9999-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ForecastTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='forecastuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', user=self.user)
+        self.rent = Category.objects.create(name='Rent', user=self.user)
+        self.url = reverse('report-forecast')
+
+        current = timezone.now().date().replace(day=1)
+        for shift, food, rent in ((-3, '30.00', '500.00'), (-2, '60.00', '500.00'), (-1, '90.00', '500.00')):
+            day = month_shift(current, shift)
+            for category, amount in ((self.food, food), (self.rent, rent)):
+                Transaction.objects.create(
+                    amount=Decimal(amount), description='Forecast', date=day,
+                    category=category, user=self.user, transaction_type='expense'
+                )
+        # Текущий неполный месяц в историю не входит
+        Transaction.objects.create(
+            amount=Decimal('1000.00'), description='Current', date=current,
+            category=self.food, user=self.user, transaction_type='expense'
+        )
+        self.current = current
+
+    def test_moving_average_forecast(self):
+        """Тест: при короткой истории прогноз равен скользящему среднему"""
+        response = self.client.get(self.url, {'months': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['months'], [self.current, month_shift(self.current, 1)])
+        self.assertEqual(response.data['history']['months'], 3)
+        self.assertFalse(response.data['history']['seasonal'])
+
+        values = dict(zip([category['name'] for category in response.data['categories']], response.data['values']))
+        self.assertEqual(values, {'Food': [60.0, 60.0], 'Rent': [500.0, 500.0]})
+        self.assertEqual(response.data['total'], [560.0, 560.0])
+
+    def test_invalid_params(self):
+        """Тест: горизонт вне допустимых пределов дает 400"""
+        response = self.client.get(self.url, {'months': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ForecastEngineTests(SimpleTestCase):
+    def test_seasonal_baseline(self):
+        """Тест: при истории от года прогноз смешивает скользящее среднее и сезонную базу"""
+        # Два года: декабрь в 4 раза дороже остальных месяцев
+        history = np.array([[400 if month == 11 else 100 for month in range(12)] * 2])
+        projected = forecast_spending(history, date(2022, 1, 1), horizon=2, window=3)
+        # Январь: (среднее окт-дек 200 + январская база 100) / 2
+        self.assertEqual(projected.tolist(), [[150.0, 150.0]])
+
+        projected = forecast_spending(history[:, :11], date(2022, 1, 1), horizon=1, window=3)
+        self.assertEqual(projected.tolist(), [[100.0]])
+
+
+class AnomalyTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='anomalyuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', user=self.user)
+        self.rent = Category.objects.create(name='Rent', user=self.user)
+        self.url = reverse('report-anomalies')
+        self.today = timezone.now().date()
+
+        # Обычные покупки еды и одна покупка в 10 раз дороже на этой неделе
+        for index in range(10):
+            self.expense(self.food, Decimal('20.00') + index, self.today - timedelta(days=11 + index))
+        self.outlier = self.expense(self.food, Decimal('250.00'), self.today - timedelta(days=1))
+        self.expense(self.food, Decimal('24.00'), self.today - timedelta(days=2))
+
+        # Аренда стабильна полгода, в прошлом месяце - вчетверо выше
+        current = self.today.replace(day=1)
+        for shift in range(-7, -1):
+            self.expense(self.rent, Decimal('500.00'), month_shift(current, shift))
+        self.expense(self.rent, Decimal('2000.00'), month_shift(current, -1))
+        self.last_month = month_shift(current, -1)
+
+    def expense(self, category, amount, day):
+        return Transaction.objects.create(
+            amount=amount, description='Anomaly', date=day,
+            category=category, user=self.user, transaction_type='expense'
+        )
+
+    def test_detects_transaction_and_month_outliers(self):
+        """Тест: флагуются дорогая транзакция и месяц выше скользящей медианы"""
+        self.assertEqual(detect_anomalies([self.user.id]), 2)
+
+        flagged = SpendingAnomaly.objects.get(kind='transaction')
+        self.assertEqual(flagged.transaction, self.outlier)
+        self.assertEqual(flagged.amount, Decimal('250.00'))
+        self.assertEqual(flagged.baseline, Decimal('24.50'))
+
+        month = SpendingAnomaly.objects.get(kind='category_month')
+        self.assertEqual((month.category, month.period), (self.rent, self.last_month))
+        self.assertEqual((month.amount, month.baseline, month.score), (Decimal('2000.00'), Decimal('500.00'), 4.0))
+
+    def test_rerun_is_idempotent(self):
+        """Тест: повторная проверка не дублирует флаги и не меняет версию данных"""
+        self.client.get(self.url)
+        detect_anomalies([self.user.id])
+        version = UserDataVersion.current(self.user.id)
+
+        result = detect_anomalies_chunk([self.user.id], self.today.isoformat())
+        self.assertEqual((result['users'], result['anomalies']), (1, 2))
+        self.assertEqual(SpendingAnomaly.objects.count(), 2)
+        self.assertEqual(UserDataVersion.current(self.user.id), version)
+
+        # Новый флаг меняет версию данных, а значит и ETag списка
+        self.expense(self.food, Decimal('300.00'), self.today)
+        version = UserDataVersion.current(self.user.id)
+        self.assertEqual(detect_anomalies([self.user.id]), 3)
+        self.assertGreater(UserDataVersion.current(self.user.id), version)
+
+    def test_endpoint_lists_own_anomalies(self):
+        """Тест: эндпоинт отдает флаги пользователя с фильтром по виду"""
+        other = User.objects.create_user(username='otheranomaly', password='testpassword123')
+        detect_anomalies([self.user.id, other.id])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get(self.url, {'kind': 'category_month'})
+        self.assertEqual([item['category_name'] for item in response.data], ['Rent'])
+
+        response = self.client.get(self.url, {'kind': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnomalyEngineTests(SimpleTestCase):
+    def test_group_medians(self):
+        """Тест: медианы по группам совпадают с np.median для каждой группы"""
+        rng = np.random.default_rng(0)
+        codes = rng.integers(0, 7, 200)
+        values = rng.integers(1, 1000, 200)
+
+        medians, counts = group_medians(codes, values, 7)
+        for group in range(7):
+            self.assertEqual(medians[group], np.median(values[codes == group]))
+            self.assertEqual(counts[group], (codes == group).sum())
+
+
+class PlatformStatsTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staffuser', password='testpassword123', is_staff=True)
+        self.url = reverse('report-platform-stats')
+
+        for index in range(3):
+            user = User.objects.create_user(username=f'platform{index}', password='testpassword123')
+            food = Category.objects.create(name='Groceries', user=user)
+            salary = Category.objects.create(name='Wages', user=user)
+            # Все трое тратят в феврале, в марте - только двое, но вдвое больше
+            days = [date(2024, 2, 10)] + ([date(2024, 3, 10)] * 2 if index < 2 else [])
+            for day in days:
+                Transaction.objects.create(
+                    amount=Decimal('10.00'), description='Platform', date=day,
+                    category=food, user=user, transaction_type='expense'
+                )
+            Transaction.objects.create(
+                amount=Decimal('100.00'), description='Platform', date=date(2024, 2, 1),
+                category=salary, user=user, transaction_type='income'
+            )
+
+    def test_snapshot_totals_and_growth(self):
+        """Тест: снимки по месяцам одинаковы при любой порции пользователей"""
+        snapshots = compute_platform_stats(months=2, chunk_size=2, today=date(2024, 3, 15))
+        february, march = snapshots
+
+        self.assertEqual((february.period, february.active_users, february.transaction_count), (date(2024, 2, 1), 3, 6))
+        self.assertEqual((february.total_income, february.total_expenses), (Decimal('300.00'), Decimal('30.00')))
+        self.assertEqual(february.categories, [
+            {'name': 'Wages', 'type': 'income', 'total': 300.0, 'count': 3},
+            {'name': 'Groceries', 'type': 'expense', 'total': 30.0, 'count': 3},
+        ])
+        self.assertEqual(march.growth, {'active_users': -33.33, 'total_income': -100.0, 'total_expenses': 33.33})
+
+        compute_platform_stats(months=2, chunk_size=1000, today=date(2024, 3, 15))
+        self.assertEqual(PlatformStatsSnapshot.objects.count(), 2)
+        self.assertEqual(PlatformStatsSnapshot.objects.get(period=date(2024, 3, 1)).growth, march.growth)
+
+    def test_endpoint_staff_only(self):
+        """Тест: итоги платформы доступны только персоналу и читаются из снимков"""
+        compute_platform_stats(months=2, today=date(2024, 3, 15))
+
+        self.client.force_authenticate(user=User.objects.get(username='platform0'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'months': 2})
+        self.assertEqual([row['period'] for row in response.data], ['2024-02-01', '2024-03-01'])
+        self.assertEqual(response.data[1]['active_users'], 2)
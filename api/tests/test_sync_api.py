@@ -0,0 +1,105 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from expenses.models import Transaction, Category, Budget, Goal, DeletedRecord
+from decimal import Decimal
+from datetime import date, timedelta
+
+class SyncAPITests(APITestCase):
+    def setUp(self):
+        # Создаем тестового пользователя
+
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+
+        # Авторизуемся
+
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Sync Category', user=self.user)
+        self.transactions = [
+            Transaction.objects.create(
+                amount=Decimal('10.00'), description=f'Row {index}', date=date(2024, 1, 1),
+                category=self.category, user=self.user, transaction_type='expense'
+            )
+            for index in range(3)
+        ]
+        self.goal = Goal.objects.create(name='Goal', target_amount=Decimal('100.00'), user=self.user)
+
+        # Делаем все существующие объекты "старыми"
+        long_ago = timezone.now() - timedelta(hours=1)
+        for model in (Transaction, Category, Budget, Goal):
+            model.objects.filter(user=self.user).update(updated_at=long_ago)
+
+        self.since = (timezone.now() - timedelta(minutes=30)).isoformat()
+        self.url = reverse('sync')
+
+    def test_full_sync_without_cursor(self):
+        """Тест: без курсора возвращается полный снимок"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['transactions']), 3)
+        self.assertEqual(len(response.data['goals']), 1)
+        self.assertIn('cursor', response.data)
+
+    def test_delta_sync_returns_only_changes(self):
+        """Тест: дельта содержит только измененные и удаленные объекты"""
+        changed = self.transactions[0]
+        changed.amount = Decimal('20.00')
+        changed.save()
+
+        removed_id = self.transactions[1].id
+        self.transactions[1].delete()
+
+        response = self.client.get(self.url, {'since': self.since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['full'])
+        self.assertEqual([row['id'] for row in response.data['transactions']], [changed.id])
+        self.assertEqual(response.data['categories'], [])
+        self.assertEqual(response.data['goals'], [])
+        self.assertEqual(response.data['deleted']['transactions'], [removed_id])
+
+    def test_cascade_delete_records_tombstones(self):
+        """Тест: каскадное удаление категории оставляет надгробия транзакций"""
+        category_id = self.category.id
+        transaction_ids = sorted(transaction.id for transaction in self.transactions)
+        self.category.delete()
+
+        response = self.client.get(self.url, {'since': self.since})
+        self.assertEqual(response.data['deleted']['categories'], [category_id])
+        self.assertEqual(sorted(response.data['deleted']['transactions']), transaction_ids)
+
+    def test_bulk_update_marks_rows_changed(self):
+        """Тест: пакетное обновление попадает в дельту"""
+        response = self.client.post(reverse('transaction-bulk'), {
+            'update': [{'id': self.transactions[2].id, 'description': 'Bulk'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, {'since': self.since})
+        self.assertEqual([row['id'] for row in response.data['transactions']], [self.transactions[2].id])
+
+    def test_user_deletion_with_tombstones(self):
+        """Тест: удаление пользователя не ломается из-за надгробий"""
+        self.transactions[0].delete()
+        self.user.delete()
+        self.assertFalse(Transaction.objects.exists())
+        # Прежние надгробия удаляются каскадом, новые для строк пользователя не пишутся
+        self.assertFalse(DeletedRecord.objects.exists())
+
+    def test_invalid_cursor(self):
+        """Тест: недопустимый курсор"""
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_cursor(self):
+        """Тест: несуществующая дата или курсор у начала календаря дают 400"""
+        for since in ('2024-13-45T00:00:00', '0001-01-01T00:00:00', '0001-01-01T03:00:00+05:00'):
+            response = self.client.get(self.url, {'since': since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, since)
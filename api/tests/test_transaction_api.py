@@ -1,8 +1,20 @@
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import base64
+import json
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
 from rest_framework import status
 from rest_framework.test import APITestCase
-from expenses.models import Transaction, Category
+from expenses.models import Category, DailyCategoryRollup, DeletedRecord, MonthlyBudgetSummary, Transaction, UserDataVersion
+from expenses.periods import month_bounds, period_filter
+from expenses.rollups import find_rollup_mismatches
+from api.serializers.transaction_serializers import (
+    TransactionSerializer, TransactionBulkSerializer, TransactionValuesSerializer
+)
 from decimal import Decimal
 from datetime import date
 
@@ -146,3 +158,384 @@ class TransactionAPITests(APITestCase):
 
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+
+class TransactionPeriodIndexTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='planuser',
+            email='plan@example.com',
+            password='testpassword123'
+        )
+        self.category = Category.objects.create(name='Plan Category', user=self.user)
+        self.queryset = Transaction.objects.filter(user=self.user)
+
+    def test_month_bounds_are_half_open(self):
+        """Тест: границы месяца - полуоткрытый интервал, включая декабрь"""
+        self.assertEqual(month_bounds(2024, 2), (date(2024, 2, 1), date(2024, 3, 1)))
+        self.assertEqual(month_bounds(2024, 12), (date(2024, 12, 1), date(2025, 1, 1)))
+
+    def test_invalid_month_is_rejected(self):
+        """Тест: месяц вне 1-12 дает 400, а не ошибку сервера или итоги за год"""
+        self.client.force_authenticate(user=self.user)
+        for url in (reverse('transaction-by-month'), reverse('transaction-stats'),
+                    reverse('budget-status'), reverse('budget-overview')):
+            for month in ('0', '13'):
+                response = self.client.get(url, {'year': 2024, 'month': month})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (url, month))
+
+    def test_period_filter_matches_month_lookup(self):
+        """Тест: фильтр по интервалу возвращает те же строки, что и date__year/date__month"""
+        for day in (date(2024, 2, 29), date(2024, 3, 1), date(2024, 3, 31), date(2024, 4, 1)):
+            Transaction.objects.create(
+                amount=Decimal('10.00'), description='t', date=day,
+                category=self.category, user=self.user, transaction_type='expense'
+            )
+
+        legacy = self.queryset.filter(date__year=2024, date__month=3)
+        ranged = self.queryset.filter(**period_filter(2024, 3))
+        self.assertEqual(
+            sorted(legacy.values_list('id', flat=True)),
+            sorted(ranged.values_list('id', flat=True))
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'Формат плана запроса зависит от СУБД')
+    def test_explain_uses_date_range_index(self):
+        """Тест: EXPLAIN до/после - фильтр по месяцу превращается в поиск по индексу"""
+        before = self.queryset.filter(date__month=3).explain()
+        after = self.queryset.filter(**period_filter(2024, 3)).explain()
+
+        # До: месяц вычисляется функцией, по индексу ищется только user_id
+        self.assertNotIn('date>', before)
+        # После: диапазон дат входит в условие поиска по составному индексу
+        self.assertIn('txn_user_date_idx', after)
+        self.assertIn('date>', after)
+        self.assertIn('date<', after)
+
+        typed = self.queryset.filter(transaction_type='expense', **period_filter(2024, 3)).explain()
+        self.assertIn('txn_user_type_date_idx', typed)
+
+        by_category = self.queryset.filter(
+            category=self.category, transaction_type='expense', **period_filter(2024, 3)
+        ).explain()
+        self.assertIn('txn_user_category_date_idx', by_category)
+
+
+class TransactionPaginationModeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pageuser',
+            email='page@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Page Category', user=self.user)
+
+        # Несколько транзакций на одну дату, чтобы проверить порядок по id
+        for index in range(7):
+            Transaction.objects.create(
+                amount=Decimal('1.00') + index,
+                description=f'Transaction {index}',
+                date=date(2024, 3, 1 + index // 3),
+                category=self.category,
+                user=self.user,
+                transaction_type='expense'
+            )
+
+        self.list_url = reverse('transaction-list')
+
+    def _walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pagination_walks_all_rows_in_order(self):
+        """Тест: курсорная пагинация обходит все строки по (date, id) без повторов"""
+        ids, _ = self._walk(self.list_url, {'pagination': 'cursor', 'page_size': 2})
+
+        expected = list(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pagination_previous_link(self):
+        """Тест: ссылка previous возвращает предыдущую страницу"""
+        first = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 3})
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(first.data['previous'])
+
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']]
+        )
+
+    def test_invalid_cursor(self):
+        """Тест: поврежденный курсор дает 404"""
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'cursor': 'broken'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        """Тест: курсор с подмененными значениями позиции дает 404"""
+        for position in (['garbage', '1'], ['2024-03-01', 'x'], [None, None], [{'a': 1}, 2]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position}).encode('utf-8')).decode('ascii')
+            response = self.client.get(self.list_url, {'pagination': 'cursor', 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    def test_cursor_rejects_other_ordering(self):
+        """Тест: в режиме cursor порядок, отличный от keyset, дает 400"""
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'ordering': 'amount'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'ordering': '-date,-id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_estimated_count_pagination_skips_count(self):
+        """Тест: режим estimated не выполняет COUNT(*) и отдает ссылку next"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, {'pagination': 'estimated', 'page_size': 5})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertTrue(response.data['count_is_estimate'])
+        self.assertIsNotNone(response.data['next'])
+
+        ids, last = self._walk(self.list_url, {'pagination': 'estimated', 'page_size': 5})
+        self.assertEqual(len(ids), 7)
+        self.assertIsNotNone(last.data['previous'])
+
+
+class TransactionBulkAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bulkuser',
+            email='bulk@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Bulk Category', user=self.user)
+
+        self.other_user = User.objects.create_user(username='other', password='testpassword123')
+        self.foreign_category = Category.objects.create(name='Foreign', user=self.other_user)
+
+        self.existing = [
+            Transaction.objects.create(
+                amount=Decimal('10.00'), description=f'Existing {index}', date=date(2024, 1, 1),
+                category=self.category, user=self.user, transaction_type='expense'
+            )
+            for index in range(2)
+        ]
+        self.bulk_url = reverse('transaction-bulk')
+
+    def _item(self, **overrides):
+        item = {
+            'amount': '5.00',
+            'description': 'Offline',
+            'date': '2024-02-01',
+            'category': self.category.id,
+            'transaction_type': 'expense'
+        }
+        item.update(overrides)
+        return item
+
+    def test_bulk_create_update_delete(self):
+        """Тест: пакет операций применяется целиком и возвращает результат по каждому элементу"""
+        payload = {
+            'create': [self._item(client_id=f'c{index}') for index in range(3)],
+            'update': [{'id': self.existing[0].id, 'amount': '99.00'}],
+            'delete': [self.existing[1].id]
+        }
+
+        response = self.client.post(self.bulk_url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([row['client_id'] for row in response.data['created']], ['c0', 'c1', 'c2'])
+        self.assertTrue(all(row['id'] for row in response.data['created']))
+        self.assertEqual(response.data['updated'][0]['amount'], '99.00')
+        self.assertEqual(response.data['deleted'], [self.existing[1].id])
+
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+        self.existing[0].refresh_from_db()
+        self.assertEqual(self.existing[0].amount, Decimal('99.00'))
+        self.assertFalse(Transaction.objects.filter(id=self.existing[1].id).exists())
+
+    def test_bulk_update_applies_to_locked_rows(self):
+        """Тест: запись, попавшая между проверкой пакета и блокировкой, не теряется и не расходится с агрегатами"""
+        first, second = self.existing
+        validate = TransactionBulkSerializer.validate
+
+        def validate_then_concurrent_write(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            Transaction.objects.filter(id=first.id).update(description='Concurrent')
+            second.amount = Decimal('40.00')
+            second.save()
+            return attrs
+
+        payload = {'update': [{'id': first.id, 'amount': '25.00'}, {'id': second.id, 'description': 'Renamed'}]}
+        with patch.object(TransactionBulkSerializer, 'validate', validate_then_concurrent_write):
+            response = self.client.post(self.bulk_url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.description, first.amount), ('Concurrent', Decimal('25.00')))
+        self.assertEqual((second.description, second.amount), ('Renamed', Decimal('40.00')))
+        self.assertEqual(find_rollup_mismatches([self.user.id]), [])
+
+    def test_bulk_delete_query_count_does_not_grow(self):
+        """Тест: пакетное удаление обновляет агрегаты, надгробия и версию один раз на пакет"""
+        def delete_batch(size):
+            ids = [
+                Transaction.objects.create(
+                    amount=Decimal('1.00'), description='Batch', date=date(2024, 3, 1),
+                    category=self.category, user=self.user, transaction_type='expense'
+                ).id
+                for _ in range(size)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.bulk_url, {'delete': ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        UserDataVersion.current(self.user.pk)
+        self.assertEqual(delete_batch(3), delete_batch(30))
+
+        self.assertEqual(DeletedRecord.objects.filter(user=self.user, model_name='transaction').count(), 33)
+        self.assertFalse(DailyCategoryRollup.objects.filter(user=self.user, day=date(2024, 3, 1)).exists())
+        summary = MonthlyBudgetSummary.objects.filter(user=self.user, year=2024, month=1).get()
+        self.assertEqual(summary.total_expenses, Decimal('20.00'))
+
+    def test_bulk_rejects_foreign_category_atomically(self):
+        """Тест: чужая категория отклоняет весь пакет с ошибкой по элементу"""
+        payload = {
+            'create': [self._item(), self._item(category=self.foreign_category.id)],
+            'delete': [self.existing[0].id]
+        }
+
+        response = self.client.post(self.bulk_url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['create'][0], {})
+        self.assertIn('category', response.data['create'][1])
+
+        # Ничего не изменилось
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_rejects_foreign_transaction(self):
+        """Тест: нельзя изменить или удалить чужую транзакцию"""
+        foreign = Transaction.objects.create(
+            amount=Decimal('1.00'), description='Foreign', date=date(2024, 1, 1),
+            category=self.foreign_category, user=self.other_user, transaction_type='expense'
+        )
+
+        response = self.client.post(self.bulk_url, {'delete': [foreign.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Transaction.objects.filter(id=foreign.id).exists())
+
+    def test_bulk_validation_query_count(self):
+        """Тест: проверка пакета не зависит от числа элементов по количеству запросов"""
+        payload = {'create': [self._item() for _ in range(50)]}
+        serializer = TransactionBulkSerializer(data=payload, context={'request': SimpleNamespace(user=self.user)})
+
+        # Один запрос на проверку всех категорий пакета
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+
+class TransactionValuesSerializerTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='fastuser',
+            email='fast@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Fast Category', user=self.user)
+
+        for amount in ('100', '0.5', '12.34'):
+            Transaction.objects.create(
+                amount=Decimal(amount), description=f'Fast {amount}', date=date(2024, 5, 1),
+                category=self.category, user=self.user, transaction_type='expense'
+            )
+
+    def test_same_json_shape_as_model_serializer(self):
+        """Тест: быстрый сериализатор дает тот же JSON, что и TransactionSerializer"""
+        queryset = Transaction.objects.filter(user=self.user).order_by('id')
+        expected = TransactionSerializer(queryset.select_related('category'), many=True).data
+        fast = TransactionValuesSerializer(queryset.values(*TransactionValuesSerializer.values_fields())).data
+
+        self.assertEqual(json.dumps(fast), json.dumps(expected))
+
+    def test_list_uses_values_path(self):
+        """Тест: список строится одним запросом без создания моделей"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('transaction-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['category_name'], 'Fast Category')
+
+
+class TransactionSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='sparseuser',
+            email='sparse@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Sparse Category', user=self.user)
+        self.transaction = Transaction.objects.create(
+            amount=Decimal('42.00'), description='Sparse', date=date(2024, 6, 1),
+            category=self.category, user=self.user, transaction_type='expense'
+        )
+
+    def test_list_returns_requested_fields_only(self):
+        """Тест: ?fields= ограничивает поля ответа списка"""
+        response = self.client.get(reverse('transaction-list'), {'fields': 'id,amount,date'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['results'],
+            [{'id': self.transaction.id, 'amount': '42.00', 'date': '2024-06-01'}]
+        )
+
+    def test_list_expand_category(self):
+        """Тест: ?expand=category разворачивает категорию"""
+        response = self.client.get(reverse('transaction-list'), {'fields': 'id,category', 'expand': 'category'})
+        self.assertEqual(
+            response.data['results'][0]['category'],
+            {'id': self.category.id, 'name': 'Sparse Category'}
+        )
+
+    def test_retrieve_narrows_selected_columns(self):
+        """Тест: деталь выбирает только нужные столбцы и не присоединяет категорию без надобности"""
+        url = reverse('transaction-detail', args=[self.transaction.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,amount'})
+
+        self.assertEqual(response.data, {'id': self.transaction.id, 'amount': '42.00'})
+        sql = queries[-1]['sql']
+        self.assertNotIn('description', sql)
+        self.assertNotIn('expenses_category', sql)
+
+    def test_retrieve_expand_uses_join(self):
+        """Тест: раскрытие категории в детали выполняется одним запросом с JOIN"""
+        url = reverse('transaction-detail', args=[self.transaction.id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'expand': 'category'})
+
+        self.assertEqual(response.data['category'], {'id': self.category.id, 'name': 'Sparse Category'})
+        self.assertEqual(response.data['category_name'], 'Sparse Category')
+
+    def test_fields_ignored_for_writes(self):
+        """Тест: ?fields= не влияет на валидацию при записи"""
+        response = self.client.post(reverse('transaction-list') + '?fields=id', {
+            'amount': '1.00', 'description': 'Write', 'date': '2024-06-02',
+            'category': self.category.id, 'transaction_type': 'expense'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -2,6 +2,7 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 from users.models import Profile
 
 class UserProfileAPITests(APITestCase):
@@ -103,4 +104,15 @@ class UserProfileAPITests(APITestCase):
         response = self.client.post(self.register_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         
-        self.assertFalse(User.objects.filter(username='newuser').exists())
\ No newline at end of file
+        self.assertFalse(User.objects.filter(username='newuser').exists())
+    
+    def test_cached_profile_not_shared_between_users(self):
+        """Тест: кэш профиля различается по токену и не отдает чужой профиль"""
+        other = User.objects.create_user(username='otheruser', password='testpassword123')
+        self.client.force_authenticate(user=None)
+
+        for user in (self.user, other):
+            token = RefreshToken.for_user(user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            response = self.client.get(self.profile_url)
+            self.assertEqual(response.data['username'], user.username)
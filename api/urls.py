@@ -9,8 +9,11 @@ from api.views.user_views import UserProfileView, RegisterView, LogoutView
 from api.views.report_views import ReportViewSet
 from api.views.budget_views import BudgetViewSet
 from api.views.goal_views import GoalViewSet
-from api.views.import_export_views import ImportCSVView, ExportCSVView, TaskStatusView
+from api.views.import_export_views import ImportCSVView, ExportCSVView, ExportXLSXView, ExportStreamView, TaskStatusView
 from api.views.file_views import FileUploadView
+from api.views.sync_views import SyncView
+from api.views.dashboard_views import DashboardView
+from api.views.notification_views import NotificationView
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet, basename='transaction')
@@ -34,8 +37,22 @@ urlpatterns = [
 
     path('import/csv/', ImportCSVView.as_view(), name='import-csv'),
     path('export/csv/', ExportCSVView.as_view(), name='export-csv'),
+    path('export/xlsx/', ExportXLSXView.as_view(), name='export-xlsx'),
+    path('export/stream/', ExportStreamView.as_view(), name='export-stream'),
     path('task-status/<str:task_id>/', TaskStatusView.as_view(), name='task-status'),
     
+    # Дельта-синхронизация для мобильных клиентов
+
+    path('sync/', SyncView.as_view(), name='sync'),
+    
+    # Данные главного экрана одним запросом
+
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    
+    # Исходящие уведомления (курсор по id)
+
+    path('notifications/', NotificationView.as_view(), name='notifications'),
+    
     # Загрузка файлов (для проверки AWS S3)
 
     path('upload/', FileUploadView.as_view(), name='file-upload'),
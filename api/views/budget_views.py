@@ -1,12 +1,28 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from expenses.models import Budget, Category, Transaction
+from rest_framework.exceptions import ValidationError
+from expenses.models import Budget, Category, DailyCategoryRollup
+from expenses.periods import MonthIndex, is_valid_period, iter_buckets, month_index, month_shift, period_filter
+from expenses.rollups import months_after, months_before
 from api.serializers.budget_serializers import BudgetSerializer
+from api.serializers.mixins import parse_fieldset
+from api.budget_rollover import ROLLOVER_MODES, rollover_budgets
 from api.throttling import UserRateThrottle
+from api.aggregates import cents
+from api.conditional import etag_by_data_version
+from api.views.report_views import parse_date_range
 from django.utils import timezone
 from django.db.models import Sum, F, FloatField, ExpressionWrapper, DecimalField, OuterRef, Subquery, Q
+from itertools import islice
 import datetime
+import numpy as np
+
+# Поля сериализатора, которые читают потраченную сумму
+SPENT_FIELDS = {'spent', 'remaining', 'progress'}
+
+# Предел количества месяцев в истории бюджетов
+MAX_HISTORY_MONTHS = 120
 
 
 class BudgetViewSet(viewsets.ModelViewSet):
@@ -18,66 +34,118 @@ class BudgetViewSet(viewsets.ModelViewSet):
     throttle_classes = [UserRateThrottle]
 
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user)
+        queryset = Budget.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = BudgetSerializer.shape_queryset(queryset, self.request)
+
+            # Потраченные суммы всех бюджетов страницы считаются в том же запросе,
+            # свойства spent, remaining и progress читают аннотацию
+            fields, _ = parse_fieldset(self.request)
+            if fields is None or fields & SPENT_FIELDS:
+                queryset = queryset.annotate(spent_amount=Budget.spent_subquery())
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def _get_year_month(self, request):
+        """Год и месяц из параметров запроса (по умолчанию текущие)"""
+        now = timezone.now()
+        try:
+            year = int(request.query_params.get('year', now.year))
+            month = int(request.query_params.get('month', now.month))
+            if not is_valid_period(year, month):
+                raise ValueError
+        except (ValueError, TypeError):
+            raise ValidationError({"error": "Недопустимый год или месяц"})
+        return year, month
+
     @action(detail=False, methods=['get'])
+    @etag_by_data_version
     def status(self, request):
         """Получить статус выполнения всех бюджетов"""
-        now = timezone.now()
-        year = int(request.query_params.get('year', now.year))
-        month = int(request.query_params.get('month', now.month))
+        year, month = self._get_year_month(request)
 
-        # Оптимизация: делаем предварительную выборку связанных категорий
-        # и аннотируем каждый бюджет суммой расходов одним запросом
-        expenses = Transaction.objects.filter(
-            user=self.request.user,
-            transaction_type='expense',
-            date__year=year,
-            date__month=month,
-            category=OuterRef('category')
-        ).values('category').annotate(
-            total=Sum('amount')
-        ).values('total')
-
-        budgets = self.get_queryset().filter(
-            year=year,
-            month=month
-        ).select_related('category').annotate(
-            spent_amount=Subquery(expenses, output_field=DecimalField())
-        )
+        return Response(budget_status_rows(request.user, year, month))
 
-        results = []
+    @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    def history(self, request):
+        """
+        История выполнения бюджетов по месяцам (?start=&end=, по умолчанию последний год):
+        матрицы категорий x месяцев запланированных сумм, расходов и перерасхода.
+        """
+        start_date, end_date = parse_date_range(request)
+        # Месяцы перебираются не дальше предела: длинный период не строится целиком
+        months = list(islice(iter_buckets(start_date, end_date, 'month'), MAX_HISTORY_MONTHS + 1))
+        if len(months) > MAX_HISTORY_MONTHS:
+            return Response(
+                {"error": f"Период не может быть длиннее {MAX_HISTORY_MONTHS} месяцев"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        categories, names, budgeted, spent = budget_history_matrix(request.user, months)
+        has_budget = budgeted >= 0
+        budgeted = np.where(has_budget, budgeted, 0)
+        overspent = np.where(has_budget, np.maximum(spent - budgeted, 0), 0)
 
-        for budget in budgets:
-            # Используем аннотированное поле вместо дополнительного запроса
-            spent = budget.spent_amount or 0
+        def cells(matrix):
+            # Месяцы без бюджета категории - null
+            return np.where(has_budget, matrix / 100, None).tolist()
 
-            # Вычисляем прогресс и оставшуюся сумму
-            progress = (spent / budget.amount) * 100 if budget.amount > 0 else 0
-            remaining = budget.amount - spent
+        return Response({
+            'start': start_date,
+            'end': end_date,
+            'periods': months,
+            'categories': [
+                {'id': category_id, 'name': names[category_id]} for category_id in categories
+            ],
+            'budgeted': cells(budgeted),
+            'spent': (spent / 100).tolist(),
+            'overspent': cells(overspent),
+            # Итоги месяцев по категориям, у которых в этом месяце есть бюджет
+            'totals': {
+                'budgeted': (budgeted.sum(axis=0) / 100).tolist(),
+                'spent': (np.where(has_budget, spent, 0).sum(axis=0) / 100).tolist(),
+                'overspent': (overspent.sum(axis=0) / 100).tolist()
+            }
+        })
+
+    @action(detail=False, methods=['post'])
+    def rollover(self, request):
+        """
+        Перенести бюджеты прошлого месяца в месяц {year, month} (по умолчанию текущий).
+        mode=copy копирует суммы, mode=carry_over добавляет неизрасходованный остаток.
+        Уже существующие бюджеты месяца не изменяются.
+        """
+        now = timezone.now()
+        mode = request.data.get('mode', 'copy')
+        try:
+            year = int(request.data.get('year', now.year))
+            month = int(request.data.get('month', now.month))
+            # Бюджеты переносятся из предыдущего месяца: он тоже должен существовать
+            if (not is_valid_period(year, month) or (year, month) == (datetime.MINYEAR, 1)
+                    or mode not in ROLLOVER_MODES):
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": f"Недопустимый год или месяц; mode - один из: {', '.join(ROLLOVER_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            results.append({
-                'id': budget.id,
-                'name': budget.name,
-                'category': budget.category.name,
-                'amount': budget.amount,
-                'spent': spent,
-                'remaining': remaining,
-                'progress': progress,
-                'overspent': spent > budget.amount
-            })
+        created = rollover_budgets([request.user.id], year, month, mode)
 
-        return Response(results)
+        return Response({
+            'year': year,
+            'month': month,
+            'mode': mode,
+            'created': created
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def overview(self, request):
         """Получить общий обзор бюджета за месяц"""
-        now = timezone.now()
-        year = int(request.query_params.get('year', now.year))
-        month = int(request.query_params.get('month', now.month))
+        year, month = self._get_year_month(request)
 
         # Общая сумма запланированного бюджета
         total_budget = self.get_queryset().filter(
@@ -86,12 +154,11 @@ class BudgetViewSet(viewsets.ModelViewSet):
         ).aggregate(Sum('amount'))['amount__sum'] or 0
 
         # Общая сумма расходов за месяц - оптимизировано
-        total_expenses = Transaction.objects.filter(
+        total_expenses = DailyCategoryRollup.objects.filter(
             user=self.request.user,
             transaction_type='expense',
-            date__year=year,
-            date__month=month
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
+            **period_filter(year, month, field='day')
+        ).aggregate(Sum('total'))['total__sum'] or 0
 
         # Прогресс расходования бюджета
         progress = (total_expenses / total_budget) * 100 if total_budget > 0 else 0
@@ -104,4 +171,93 @@ class BudgetViewSet(viewsets.ModelViewSet):
             'remaining': total_budget - total_expenses,
             'progress': progress,
             'overspent': total_expenses > total_budget
-        })
\ No newline at end of file
+        })
+
+
+def budget_history_matrix(user, months):
+    """
+    Запланированные суммы и расходы по категориям с бюджетами за месяцы months.
+
+    Вместо подзапроса на каждый бюджет каждого месяца - два запроса на весь период:
+    бюджеты периода и один GROUP BY (категория, месяц) по дневным агрегатам расходов
+    этих категорий. Ячейки сопоставляются по номеру месяца в numpy.
+    Возвращает (id категорий, {id: название}, бюджеты, расходы); матрицы в копейках,
+    месяц без бюджета отмечен -1.
+    """
+    first, last = months[0], months[-1]
+    budgets = list(Budget.objects.filter(user=user).exclude(
+        months_before(first.year, first.month) | months_after(last.year, last.month)
+    ).values_list('category_id', 'category__name', 'year', 'month', cents(F('amount'))).order_by('category__name', 'category_id'))
+
+    names = {}
+    for category_id, name, *_ in budgets:
+        names.setdefault(category_id, name)
+    categories = list(names)
+    rows = {category_id: index for index, category_id in enumerate(categories)}
+
+    budgeted = np.full((len(categories), len(months)), -1, dtype=np.int64)
+    spent = np.zeros((len(categories), len(months)), dtype=np.int64)
+    if not categories:
+        return categories, names, budgeted, spent
+
+    for category_id, _, year, month, amount in budgets:
+        budgeted[rows[category_id], year * 12 + month - 1 - month_index(first)] = amount
+
+    cells = np.array(list(DailyCategoryRollup.objects.filter(
+        user=user,
+        transaction_type='expense',
+        category_id__in=categories,
+        day__gte=first,
+        day__lt=month_shift(last, 1)
+    ).values_list('category_id', MonthIndex('day')).annotate(cents=cents(Sum('total'))).order_by()),
+        dtype=np.int64).reshape(-1, 3)
+    category_ids, periods, totals = cells.T
+    codes = np.array([rows[category_id] for category_id in category_ids.tolist()], dtype=np.int64)
+    np.add.at(spent, (codes, periods - month_index(first)), totals)
+
+    return categories, names, budgeted, spent
+
+
+def budget_status_rows(user, year, month):
+    """Статус бюджетов пользователя за месяц одним запросом (для status и дашборда)"""
+    # Оптимизация: делаем предварительную выборку связанных категорий
+    # и аннотируем каждый бюджет суммой расходов одним запросом
+    expenses = DailyCategoryRollup.objects.filter(
+        user=user,
+        transaction_type='expense',
+        category=OuterRef('category'),
+        **period_filter(year, month, field='day')
+    ).values('category').annotate(
+        total=Sum('total')
+    ).values('total')
+
+    budgets = Budget.objects.filter(
+        user=user,
+        year=year,
+        month=month
+    ).select_related('category').annotate(
+        spent_amount=Subquery(expenses, output_field=DecimalField())
+    )
+
+    results = []
+
+    for budget in budgets:
+        # Используем аннотированное поле вместо дополнительного запроса
+        spent = budget.spent_amount or 0
+
+        # Вычисляем прогресс и оставшуюся сумму
+        progress = (spent / budget.amount) * 100 if budget.amount > 0 else 0
+        remaining = budget.amount - spent
+
+        results.append({
+            'id': budget.id,
+            'name': budget.name,
+            'category': budget.category.name,
+            'amount': budget.amount,
+            'spent': spent,
+            'remaining': remaining,
+            'progress': progress,
+            'overspent': spent > budget.amount
+        })
+
+    return results
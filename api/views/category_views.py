@@ -5,9 +5,10 @@ from django.db.models import Q, Prefetch
 from expenses.models import Category, Transaction
 from api.serializers.transaction_serializers import CategorySerializer
 from api.throttling import UserRateThrottle
+from api.pagination import PaginationModeMixin
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     """
     API для управления категориями транзакций пользователя.
     """
@@ -18,6 +19,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
     ordering_fields = ['name']
     ordering = ['name']
+    keyset_actions = ('expense', 'income')
+    keyset_ordering = ('name', 'id')
 
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user)
@@ -31,7 +34,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
         # Оптимизация: используем подзапрос вместо фильтрации через related
         expense_categories = self.get_queryset().filter(
             transaction__transaction_type='expense'
-        ).distinct().select_related('user')
+        ).distinct().order_by('name', 'id')
+
+        page = self.paginate_queryset(expense_categories)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
         serializer = self.get_serializer(expense_categories, many=True)
         return Response(serializer.data)
@@ -42,7 +50,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
         # Оптимизация: используем подзапрос вместо фильтрации через related
         income_categories = self.get_queryset().filter(
             transaction__transaction_type='income'
-        ).distinct().select_related('user')
+        ).distinct().order_by('name', 'id')
+
+        page = self.paginate_queryset(income_categories)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
         serializer = self.get_serializer(income_categories, many=True)
         return Response(serializer.data)
\ No newline at end of file
@@ -0,0 +1,62 @@
+from rest_framework import views, permissions, status
+from rest_framework.response import Response
+from expenses.models import Transaction
+from expenses.periods import is_valid_period, period_filter
+from api.serializers.transaction_serializers import TransactionValuesSerializer
+from api.throttling import UserRateThrottle
+from api.conditional import etag_by_data_version
+from api.views.report_views import monthly_summary_data, category_breakdown_data
+from api.views.budget_views import budget_status_rows
+from api.views.goal_views import goal_progress_rows
+from django.utils import timezone
+
+
+class DashboardView(views.APIView):
+    """
+    API главного экрана: все данные месяца одним ответом.
+
+    GET /dashboard/?year=&month= возвращает месячную сводку, распределение
+    расходов по категориям, статус бюджетов, прогресс целей и последние
+    транзакции месяца - те же данные, что отдельные эндпоинты, но за одну
+    аутентификацию, одну проверку частоты и фиксированное число запросов.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+
+    transactions_limit = 20
+    max_transactions_limit = 100
+
+    @etag_by_data_version
+    def get(self, request):
+        now = timezone.now()
+        try:
+            year = int(request.query_params.get('year', now.year))
+            month = int(request.query_params.get('month', now.month))
+            limit = int(request.query_params.get('transactions_limit', self.transactions_limit))
+            if not is_valid_period(year, month) or limit < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Недопустимый год, месяц или transactions_limit"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(limit, self.max_transactions_limit)
+
+        # Последние транзакции месяца: на одну строку больше, чтобы узнать о продолжении
+        rows = list(Transaction.objects.filter(
+            user=request.user,
+            **period_filter(year, month)
+        ).order_by('-date', '-id').values(*TransactionValuesSerializer.values_fields())[:limit + 1])
+
+        return Response({
+            'year': year,
+            'month': month,
+            'summary': monthly_summary_data(request.user, year, month),
+            'category_breakdown': category_breakdown_data(request.user, year, month),
+            'budgets': budget_status_rows(request.user, year, month),
+            'goals': goal_progress_rows(request.user),
+            'transactions': {
+                'results': TransactionValuesSerializer(rows[:limit]).data,
+                'has_more': len(rows) > limit
+            }
+        })
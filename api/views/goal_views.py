@@ -2,24 +2,35 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from expenses.models import Goal, GoalContribution
-from api.serializers.goal_serializers import GoalSerializer
+from expenses.goals import apply_contribution_deltas
+from api.serializers.goal_serializers import GoalSerializer, GoalContributionBatchSerializer
 from api.throttling import UserRateThrottle
+from api.pagination import PaginationModeMixin
 from django.utils import timezone
 from django.db.models import Sum, F, ExpressionWrapper, FloatField, Case, When, Value, DateField
 from django.db.models.functions import Coalesce
+from django.db import connection, transaction
+from django.shortcuts import get_object_or_404
+from collections import defaultdict
+from decimal import Decimal
 import datetime
 
 
-class GoalViewSet(viewsets.ModelViewSet):
+class GoalViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     """
     API для управления финансовыми целями пользователя.
     """
     serializer_class = GoalSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [UserRateThrottle]
+    keyset_actions = ('contributions',)
+    keyset_ordering = ('-date', '-id')
 
     def get_queryset(self):
-        return Goal.objects.filter(user=self.request.user)
+        queryset = Goal.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = GoalSerializer.shape_queryset(queryset, self.request)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -27,43 +38,11 @@ class GoalViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def progress(self, request):
         """Получить прогресс по всем целям"""
-        today = timezone.now().date()
-
-        # Оптимизация: предварительно вычисляем все необходимые поля с помощью аннотаций
-        goals = self.get_queryset().annotate(
-            remaining_amount=F('target_amount') - F('current_amount'),
-            days_remaining=Case(
-                When(deadline__gt=today,
-                     then=ExpressionWrapper(F('deadline') - today, output_field=FloatField())),
-                When(deadline__lte=today, then=Value(0)),
-                default=None,
-                output_field=FloatField()
-            )
-        )
-
-        results = []
-
-        for goal in goals:
-            results.append({
-                'id': goal.id,
-                'name': goal.name,
-                'description': goal.description,
-                'target_amount': goal.target_amount,
-                'current_amount': goal.current_amount,
-                'remaining': goal.remaining_amount,
-                'progress': goal.progress,
-                'deadline': goal.deadline,
-                'days_left': int(goal.days_remaining) if goal.days_remaining is not None else None,
-                'is_completed': goal.is_completed
-            })
-
-        return Response(results)
+        return Response(goal_progress_rows(request.user))
 
     @action(detail=True, methods=['post'])
     def add_contribution(self, request, pk=None):
         """Добавить взнос к цели"""
-        goal = self.get_object()
-
         # Извлекаем и валидируем данные
         try:
             amount = float(request.data.get('amount', 0))
@@ -93,16 +72,16 @@ class GoalViewSet(viewsets.ModelViewSet):
         else:
             date = timezone.now().date()
 
-        # Создаем взнос в одной транзакции
-        contribution = GoalContribution.objects.create(
-            goal=goal,
-            amount=amount,
-            date=date,
-            description=description
-        )
-
-        # Обновляем данные цели
-        goal.refresh_from_db()
+        with transaction.atomic():
+            # Строка цели блокируется до конца транзакции: сумма цели в ответе
+            # совпадает с записанной, повторное чтение цели не нужно
+            goal = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            contribution = GoalContribution.objects.create(
+                goal=goal,
+                amount=amount,
+                date=date,
+                description=description
+            )
 
         return Response({
             'id': contribution.id,
@@ -115,15 +94,129 @@ class GoalViewSet(viewsets.ModelViewSet):
             'goal_is_completed': goal.is_completed
         })
 
+    @action(detail=False, methods=['post'], url_path='batch-contributions')
+    def batch_contributions(self, request):
+        """
+        Добавить пакет взносов в несколько целей за один запрос.
+        Все взносы записываются в одной транзакции БД: либо все, либо ни одного.
+        """
+        serializer = GoalContributionBatchSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['contributions']
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            # Цели блокируются по возрастанию id, как и в apply_contribution_deltas
+            goals = {
+                goal.id: goal for goal in Goal.objects.select_for_update().filter(
+                    user=request.user, id__in={item['goal'] for item in items}
+                ).order_by('id')
+            }
+            contributions = [
+                GoalContribution(
+                    goal=goals[item['goal']],
+                    amount=item['amount'],
+                    date=item.get('date', today),
+                    description=item['description']
+                )
+                for item in items
+            ]
+            _insert_contributions(contributions)
+
+        return Response({
+            'contributions': [
+                {
+                    'id': contribution.id,
+                    'goal_id': contribution.goal_id,
+                    'amount': contribution.amount,
+                    'date': contribution.date,
+                    'description': contribution.description
+                }
+                for contribution in contributions
+            ],
+            'goals': [
+                {
+                    'id': goal.id,
+                    'current_amount': goal.current_amount,
+                    'progress': goal.progress,
+                    'is_completed': goal.is_completed
+                }
+                for goal in goals.values()
+            ]
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def contributions(self, request, pk=None):
         """Получить все взносы для цели"""
         goal = self.get_object()
 
-        # Оптимизация: добавляем select_related если есть связи, которые нужны
+        # Используем values для прямого преобразования в словари
         contributions = GoalContribution.objects.filter(
             goal=goal
-        ).order_by('-date').values('id', 'amount', 'date', 'description')
+        ).order_by('-date', '-id').values('id', 'amount', 'date', 'description')
 
-        # Используем values для прямого преобразования в словари
-        return Response(list(contributions))
\ No newline at end of file
+        page = self.paginate_queryset(contributions)
+        if page is not None:
+            return self.get_paginated_response(page)
+
+        return Response(list(contributions))
+
+
+def _insert_contributions(contributions):
+    """
+    Вставка взносов одним bulk_create и одно изменение суммы каждой цели.
+    Если СУБД не возвращает первичные ключи из bulk INSERT (SQLite в Django 3.2),
+    взносы сохраняются по одному, чтобы клиент получил id каждого взноса.
+    Объекты целей взносов приводятся к записанным суммам.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for contribution in contributions:
+            contribution.save(force_insert=True)
+        return contributions
+
+    GoalContribution.objects.bulk_create(contributions)
+    # bulk_create не вызывает GoalContribution.save, суммы целей обновляем явно
+    deltas = defaultdict(Decimal)
+    goals = {}
+    for contribution in contributions:
+        deltas[contribution.goal_id] += contribution.amount
+        goals[contribution.goal_id] = contribution.goal
+    apply_contribution_deltas(deltas)
+    for goal_id, goal in goals.items():
+        goal.current_amount += deltas[goal_id]
+    return contributions
+
+
+def goal_progress_rows(user):
+    """Прогресс по всем целям пользователя одним запросом (для progress и дашборда)"""
+    today = timezone.now().date()
+
+    # Оптимизация: предварительно вычисляем все необходимые поля с помощью аннотаций
+    goals = Goal.objects.filter(user=user).annotate(
+        remaining_amount=F('target_amount') - F('current_amount'),
+        days_remaining=Case(
+            When(deadline__gt=today,
+                 then=ExpressionWrapper(F('deadline') - today, output_field=FloatField())),
+            When(deadline__lte=today, then=Value(0)),
+            default=None,
+            output_field=FloatField()
+        )
+    )
+
+    results = []
+
+    for goal in goals:
+        results.append({
+            'id': goal.id,
+            'name': goal.name,
+            'description': goal.description,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'remaining': goal.remaining_amount,
+            'progress': goal.progress,
+            'deadline': goal.deadline,
+            'days_left': int(goal.days_remaining) if goal.days_remaining is not None else None,
+            'is_completed': goal.is_completed
+        })
+
+    return results
@@ -1,10 +1,13 @@
 from rest_framework import views, permissions, status
 from rest_framework.response import Response
 from django.conf import settings
+from django.http import StreamingHttpResponse
 import os
 import tempfile
-from api.tasks import process_csv_import, generate_csv_export
+from api.tasks import process_csv_import, generate_csv_export, generate_xlsx_export
+from api.exports import export_queryset, iter_export_rows, stream_csv, stream_ndjson
 from api.throttling import UserRateThrottle
+from expenses.periods import is_valid_period
 from celery.result import AsyncResult
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -15,6 +18,18 @@ class CSVBaseView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [UserRateThrottle]
 
+    def parse_period(self, request):
+        """Необязательные ?year=&month= экспорта; ValueError, если период недопустим"""
+        year = request.query_params.get('year')
+        month = request.query_params.get('month')
+        year = int(year) if year else None
+        month = int(month) if month else None
+        if month is not None and not 1 <= month <= 12:
+            raise ValueError
+        if year is not None and not is_valid_period(year):
+            raise ValueError
+        return year, month
+
     def handle_error(self, error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
         """Обработка ошибок"""
         return Response({'error': str(error)}, status=status_code)
@@ -67,15 +82,18 @@ class ExportCSVView(CSVBaseView):
     """
     API для экспорта транзакций в CSV файл
     """
+    export_task = generate_csv_export
+    format_name = 'CSV'
 
     def get(self, request):
         try:
-            # Получаем и валидируем параметры
-            year = request.query_params.get('year')
-            month = request.query_params.get('month')
+            year, month = self.parse_period(request)
+        except ValueError:
+            return self.handle_error('Недопустимый год или месяц', status.HTTP_400_BAD_REQUEST)
 
-            # Запускаем задачу Celery для генерации CSV
-            task = generate_csv_export.delay(request.user.id, year, month)
+        try:
+            # Запускаем задачу Celery для генерации файла
+            task = self.export_task.delay(request.user.id, year, month)
 
             # Подготавливаем описательный ответ
             period_description = ""
@@ -87,7 +105,7 @@ class ExportCSVView(CSVBaseView):
                 period_description = "за весь период"
 
             return Response({
-                'message': f'Экспорт транзакций {period_description} в CSV запущен',
+                'message': f'Экспорт транзакций {period_description} в {self.format_name} запущен',
                 'task_id': task.id,
                 'params': {
                     'year': year,
@@ -99,6 +117,48 @@ class ExportCSVView(CSVBaseView):
             return self.handle_error(e)
 
 
+class ExportXLSXView(ExportCSVView):
+    """
+    API для экспорта транзакций в XLSX файл.
+
+    Файл строится задачей Celery с постоянным расходом памяти и сохраняется
+    в хранилище файлов; ссылка возвращается в результате задачи (TaskStatusView).
+    """
+    export_task = generate_xlsx_export
+    format_name = 'XLSX'
+
+
+class ExportStreamView(CSVBaseView):
+    """
+    API для синхронного потокового экспорта всех транзакций в NDJSON или CSV.
+
+    Строки читаются серверным курсором и сразу отправляются клиенту,
+    поэтому память не растет с размером истории пользователя.
+    """
+    output_formats = {
+        'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+        'csv': (stream_csv, 'text/csv; charset=utf-8', 'csv'),
+    }
+
+    def get(self, request):
+        # Параметр format зарезервирован DRF для выбора рендерера
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.output_formats:
+            return self.handle_error('Поддерживаются форматы: ndjson, csv', status.HTTP_400_BAD_REQUEST)
+
+        try:
+            year, month = self.parse_period(request)
+        except ValueError:
+            return self.handle_error('Недопустимый год или месяц', status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type, extension = self.output_formats[output]
+        rows = iter_export_rows(export_queryset(request.user, year, month))
+
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="transactions.{extension}"'
+        return response
+
+
 class TaskStatusView(CSVBaseView):
     """
     API для проверки статуса задачи Celery
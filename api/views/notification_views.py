@@ -0,0 +1,47 @@
+from rest_framework import views, permissions, status
+from rest_framework.response import Response
+from expenses.models import Notification
+from api.serializers.notification_serializers import NotificationSerializer
+from api.throttling import UserRateThrottle
+
+
+class NotificationView(views.APIView):
+    """
+    API исходящих уведомлений (например, о пересечении порогов бюджета).
+
+    GET /notifications/?after=<cursor>&limit= возвращает уведомления новее курсора
+    по возрастанию id и новый cursor. Клиент хранит последний cursor и при опросе
+    получает только новые строки: один поиск по индексу (user, id) вместо
+    пересчета всех бюджетов в /budgets/status/.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+
+    limit = 50
+    max_limit = 200
+
+    def get(self, request):
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = int(request.query_params.get('limit', self.limit))
+            if after < 0 or limit < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "after и limit должны быть неотрицательными целыми числами"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(limit, self.max_limit)
+
+        # На одну строку больше, чтобы узнать о продолжении
+        rows = list(Notification.objects.filter(
+            user=request.user,
+            id__gt=after
+        ).order_by('id')[:limit + 1])
+
+        results = rows[:limit]
+        return Response({
+            'results': NotificationSerializer(results, many=True).data,
+            'cursor': results[-1].id if results else after,
+            'has_more': len(rows) > limit
+        })
@@ -1,14 +1,145 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from expenses.models import Transaction, Category
-from api.serializers.report_serializers import MonthlySummarySerializer, CategoryBreakdownSerializer
+from rest_framework.exceptions import ValidationError
+from expenses.models import Category, DailyCategoryRollup, MonthlyBudgetSummary, PlatformStatsSnapshot, SpendingAnomaly, Transaction
+from expenses.periods import GRANULARITIES, MonthIndex, is_valid_period, iter_buckets, month_index, month_shift, next_bucket, period_filter
+from api.serializers.report_serializers import (
+    MonthlySummarySerializer, CategoryBreakdownSerializer, PlatformStatsSnapshotSerializer, SpendingAnomalySerializer
+)
 from api.throttling import UserRateThrottle
-from django.db.models import Sum, Count, F, FloatField, Q, Value, Case, When
-from django.db.models.functions import ExtractMonth, ExtractYear, TruncMonth
+from api.conditional import etag_by_data_version
+from api.aggregates import cents
+from api.distributions import category_distributions
+from api.forecasting import forecast_spending
+from api.report_cache import cached_report
+from expenses.report_cache import report_cache_stats
+from django.db.models import Sum, Count, F, FloatField, DecimalField, DateField, Q, Value, Case, When
+from django.db.models.functions import Cast, Trunc
 from django.utils import timezone
 import datetime
-from functools import lru_cache
+from decimal import Decimal
+import numpy as np
+
+# Окна отчетов trends и savings_rate в днях
+TRENDS_DAYS = 180
+SAVINGS_RATE_DAYS = 365
+# Глубина списка необычных расходов по умолчанию
+ANOMALY_DAYS = 90
+
+
+def _report_month(view, request, year=None, month=None):
+    """Месяц, от которого зависит месячный отчет"""
+    return [view._parse_year_month(year, month)]
+
+
+def _parse_year(year=None):
+    """Год из параметра (по умолчанию текущий); недопустимый год дает 400"""
+    year = int(year or timezone.now().year)
+    if not is_valid_period(year):
+        raise ValidationError({"error": "Недопустимый год"})
+    return year
+
+
+def _report_year(view, request, year=None):
+    """Месяцы года, от которых зависит годовой отчет"""
+    year = _parse_year(year)
+    return [(year, month) for month in range(1, 13)]
+
+
+# Предел количества точек в сериях (около 10 лет по дням)
+MAX_SERIES_POINTS = 3700
+
+TIMESERIES_METRICS = ('income', 'expenses', 'savings', 'savings_rate')
+
+DATE_RANGE_ERROR = {"error": "Даты start и end вне допустимого диапазона"}
+
+# Количество интервалов гистограмм распределения сумм
+DISTRIBUTION_BINS = 10
+MAX_DISTRIBUTION_BINS = 50
+
+
+def parse_date_range(request, default_days=365):
+    """
+    Разбирает ?start=&end= (по умолчанию default_days дней до сегодня) и возвращает (start, end).
+    Годы дат проверяются как в is_valid_period: интервал любой длины, содержащий end,
+    заканчивается не позже date.max.
+    """
+    try:
+        end_date = request.query_params.get('end')
+        end_date = datetime.date.fromisoformat(end_date) if end_date else timezone.now().date()
+        start_date = request.query_params.get('start')
+        start_date = (
+            datetime.date.fromisoformat(start_date) if start_date
+            else end_date - datetime.timedelta(days=default_days)
+        )
+    except ValueError:
+        raise ValidationError({"error": "Даты start и end должны быть в формате YYYY-MM-DD"})
+    except OverflowError:
+        raise ValidationError(DATE_RANGE_ERROR)
+
+    if not (is_valid_period(start_date.year) and is_valid_period(end_date.year)):
+        raise ValidationError(DATE_RANGE_ERROR)
+
+    if start_date > end_date:
+        raise ValidationError({"error": "start не может быть позже end"})
+
+    return start_date, end_date
+
+
+def parse_series_range(request, default_days=365, default_granularity='day'):
+    """
+    Разбирает ?start=&end=&granularity= и возвращает (start, end, granularity, buckets).
+    buckets - начала всех интервалов периода без пропусков.
+    """
+    granularity = request.query_params.get('granularity', default_granularity)
+    if granularity not in GRANULARITIES:
+        raise ValidationError({"error": f"granularity должен быть одним из: {', '.join(GRANULARITIES)}"})
+
+    start_date, end_date = parse_date_range(request, default_days)
+
+    buckets = []
+    for bucket in iter_buckets(start_date, end_date, granularity):
+        buckets.append(bucket)
+        if len(buckets) > MAX_SERIES_POINTS:
+            raise ValidationError({"error": "Слишком много точек, увеличьте granularity или сократите период"})
+
+    return start_date, end_date, granularity, buckets
+
+
+def _series_months(view, request, **kwargs):
+    """Месяцы, которые пересекает период серии"""
+    start_date, end_date = parse_date_range(request)
+    return [(bucket.year, bucket.month) for bucket in iter_buckets(start_date, end_date, 'month')]
+
+
+def _forecast_params(request):
+    """(горизонт, глубина истории, окно скользящего среднего) из параметров запроса"""
+    horizon = int(request.query_params.get('months', 3))
+    history = int(request.query_params.get('history', 36))
+    window = int(request.query_params.get('window', 3))
+    if not (1 <= horizon <= 24 and 1 <= history <= 120 and 1 <= window <= 12):
+        raise ValueError
+    return horizon, history, window
+
+
+def _forecast_months(view, request, **kwargs):
+    """Месяцы истории, по которой строится прогноз"""
+    try:
+        _, history, _ = _forecast_params(request)
+    except ValueError:
+        return []
+    current = timezone.now().date().replace(day=1)
+    return [(day.year, day.month) for day in (month_shift(current, -shift) for shift in range(history, 0, -1))]
+
+
+def _recent_months(days):
+    """Месяцы скользящего окна в days дней до сегодняшнего дня"""
+    def periods(view, request, **kwargs):
+        end_date = timezone.now().date()
+        start_date = end_date - datetime.timedelta(days=days)
+        return [(bucket.year, bucket.month) for bucket in iter_buckets(start_date, end_date, 'month')]
+    return periods
 
 
 class ReportViewSet(viewsets.ViewSet):
@@ -25,141 +156,104 @@ class ReportViewSet(viewsets.ViewSet):
             year = year or now.year
             month = month or now.month
 
-        return int(year), int(month)
+        year, month = int(year), int(month)
+        if not is_valid_period(year, month):
+            raise ValidationError({"error": "Недопустимый год или месяц"})
+        return year, month
 
-    def get_transactions(self, year=None, month=None, start_date=None, end_date=None):
-        """Вспомогательный метод для получения транзакций"""
-        queryset = Transaction.objects.filter(user=self.request.user)
+    def get_rollups(self, year=None, month=None, start_date=None, end_date=None):
+        """
+        Вспомогательный метод для получения дневных агрегатов транзакций.
+        Отчеты суммируют строки по дням и категориям, а не отдельные транзакции.
+        """
+        queryset = DailyCategoryRollup.objects.filter(user=self.request.user)
 
         if start_date and end_date:
-            queryset = queryset.filter(date__range=[start_date, end_date])
-        else:
-            if year:
-                queryset = queryset.filter(date__year=year)
-
-            if month:
-                queryset = queryset.filter(date__month=month)
+            queryset = queryset.filter(day__range=[start_date, end_date])
+        elif year:
+            # Полуоткрытый интервал дат обслуживается индексом (user, day)
+            queryset = queryset.filter(**period_filter(year, month, field='day'))
+        elif month:
+            queryset = queryset.filter(day__month=month)
 
         return queryset
 
+    def get_summaries(self, start_date=None, end_date=None):
+        """
+        Итоги месяцев пользователя (MonthlyBudgetSummary), поддерживаемые
+        при каждой записи транзакции: одна строка на месяц с транзакциями.
+        Границы включают месяцы start_date и end_date целиком.
+        """
+        queryset = MonthlyBudgetSummary.objects.filter(user=self.request.user)
+
+        if start_date:
+            queryset = queryset.filter(
+                Q(year__gt=start_date.year) | Q(year=start_date.year, month__gte=start_date.month)
+            )
+        if end_date:
+            queryset = queryset.filter(
+                Q(year__lt=end_date.year) | Q(year=end_date.year, month__lte=end_date.month)
+            )
+
+        return queryset.order_by('year', 'month')
+
+    def _monthly_totals(self, start_date, end_date):
+        """Доходы и расходы по месяцам периода в виде чисел с плавающей точкой"""
+        return self.get_summaries(start_date, end_date).values('year', 'month').annotate(
+            income=Cast('total_income', FloatField()),
+            expenses=Cast('total_expenses', FloatField())
+        )
+
     @action(detail=False, methods=['get'], url_path='monthly-summary/(?P<year>[0-9]{4})/(?P<month>[0-9]{1,2})')
+    @etag_by_data_version
+    @cached_report(_report_month)
     def monthly_summary(self, request, year=None, month=None):
         """Получить месячную сводку по доходам и расходам"""
         year, month = self._parse_year_month(year, month)
 
-        # Оптимизированный запрос с одной агрегацией
-        summary = self.get_transactions(year, month).values(
-            'transaction_type'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('transaction_type')
-
-        # Преобразуем результаты
-        income = 0
-        expenses = 0
-
-        for item in summary:
-            if item['transaction_type'] == 'income':
-                income = item['total'] or 0
-            elif item['transaction_type'] == 'expense':
-                expenses = item['total'] or 0
-
-        data = {
-            'month': datetime.date(year, month, 1).strftime('%B'),
-            'year': year,
-            'income_total': income,
-            'expense_total': expenses,
-            'balance': income - expenses
-        }
-
-        serializer = MonthlySummarySerializer(data)
-        return Response(serializer.data)
+        return Response(monthly_summary_data(request.user, year, month))
 
     @action(detail=False, methods=['get'], url_path='category-breakdown/(?P<year>[0-9]{4})/(?P<month>[0-9]{1,2})')
+    @etag_by_data_version
+    @cached_report(_report_month)
     def category_breakdown(self, request, year=None, month=None):
         """Получить распределение расходов по категориям"""
         year, month = self._parse_year_month(year, month)
 
-        # Получаем расходы с группировкой по категориям за один запрос
-        expenses = self.get_transactions(year, month).filter(
-            transaction_type='expense'
-        ).values(
-            'category__id', 'category__name'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-
-        # Вычисляем общую сумму
-        total_expenses = sum(item['total'] for item in expenses) if expenses else 0
-
-        if total_expenses > 0:
-            result = []
-            for cat in expenses:
-                percentage = (cat['total'] / total_expenses) * 100
-                result.append({
-                    'category_id': cat['category__id'],
-                    'category_name': cat['category__name'],
-                    'amount': cat['total'],
-                    'percentage': round(percentage, 2)
-                })
-
-            serializer = CategoryBreakdownSerializer(result, many=True)
-            return Response(serializer.data)
-
-        return Response([])
+        return Response(category_breakdown_data(request.user, year, month))
 
     @action(detail=False, methods=['get'], url_path='yearly-comparison/(?P<year>[0-9]{4})')
+    @etag_by_data_version
+    @cached_report(_report_year)
     def yearly_comparison(self, request, year=None):
         """Получить сравнение доходов и расходов по месяцам за год"""
-        year = int(year or timezone.now().year)
+        year = _parse_year(year)
 
-        # Оптимизированный запрос с группировкой и условными суммами
-        monthly_data = self.get_transactions(year).annotate(
-            month=ExtractMonth('date')
+        # Не более 12 строк итогов месяцев за год
+        monthly_data = self.get_summaries(
+            datetime.date(year, 1, 1), datetime.date(year, 12, 1)
         ).values('month').annotate(
-            income=Sum(Case(
-                When(transaction_type='income', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            )),
-            expenses=Sum(Case(
-                When(transaction_type='expense', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            ))
-        ).order_by('month')
+            income=Cast('total_income', FloatField()),
+            expenses=Cast('total_expenses', FloatField())
+        )
 
-        return Response(monthly_data)
+        return Response(list(monthly_data))
 
     @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    @cached_report(_recent_months(TRENDS_DAYS))
     def trends(self, request):
         """Получить тренды доходов и расходов за последние 6 месяцев"""
-        # Расчет периода: последние 6 месяцев
+        # Расчет периода: последние 6 месяцев (месяцы учитываются целиком)
         end_date = timezone.now().date()
-        start_date = end_date - datetime.timedelta(days=180)
+        start_date = end_date - datetime.timedelta(days=TRENDS_DAYS)
 
-        # Оптимизированный запрос с одной агрегацией
-        monthly_data = self.get_transactions(
-            start_date=start_date, end_date=end_date
-        ).annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            income=Sum(Case(
-                When(transaction_type='income', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            )),
-            expenses=Sum(Case(
-                When(transaction_type='expense', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            ))
-        ).order_by('month')
+        monthly_data = self._monthly_totals(start_date, end_date)
 
         # Преобразуем данные в более читаемый формат
         result = []
         for item in monthly_data:
-            month_str = item['month'].strftime('%b %Y')
+            month_str = datetime.date(item['year'], item['month'], 1).strftime('%b %Y')
             income = item['income'] or 0
             expenses = item['expenses'] or 0
 
@@ -173,29 +267,15 @@ class ReportViewSet(viewsets.ViewSet):
         return Response(result)
 
     @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    @cached_report(_recent_months(SAVINGS_RATE_DAYS))
     def savings_rate(self, request):
         """Получить ставку сбережений (savings rate) по месяцам"""
-        # Последние 12 месяцев
+        # Последние 12 месяцев (месяцы учитываются целиком)
         end_date = timezone.now().date()
-        start_date = end_date - datetime.timedelta(days=365)
+        start_date = end_date - datetime.timedelta(days=SAVINGS_RATE_DAYS)
 
-        # Оптимизированный запрос с одной агрегацией
-        monthly_data = self.get_transactions(
-            start_date=start_date, end_date=end_date
-        ).annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            income=Sum(Case(
-                When(transaction_type='income', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            )),
-            expenses=Sum(Case(
-                When(transaction_type='expense', then=F('amount')),
-                default=Value(0),
-                output_field=FloatField()
-            ))
-        ).order_by('month')
+        monthly_data = self._monthly_totals(start_date, end_date)
 
         # Рассчитываем ставку сбережений
         result = []
@@ -208,7 +288,7 @@ class ReportViewSet(viewsets.ViewSet):
             if income > 0:
                 savings_rate = ((income - expenses) / income) * 100
 
-            month_str = item['month'].strftime('%b %Y')
+            month_str = datetime.date(item['year'], item['month'], 1).strftime('%b %Y')
             result.append({
                 'month': month_str,
                 'income': income,
@@ -216,4 +296,406 @@ class ReportViewSet(viewsets.ViewSet):
                 'savings_rate': round(savings_rate, 2)
             })
 
-        return Response(result)
\ No newline at end of file
+        return Response(result)
+
+    @action(detail=False, methods=['get'], url_path='balance-history')
+    @etag_by_data_version
+    @cached_report()
+    def balance_history(self, request):
+        """
+        История баланса по дням, неделям, месяцам, кварталам или годам.
+
+        Баланс на начало периода берется из closing_balance итогов предыдущего
+        месяца, а дальше накапливаются дневные изменения из агрегатов:
+        один запрос по диапазону вместо суммирования всей истории для каждой точки.
+        """
+        start_date, end_date, granularity, buckets = parse_series_range(request)
+
+        # Контрольная точка: баланс на конец месяца, предшествующего первому интервалу
+        first_day = buckets[0].replace(day=1)
+        if first_day == datetime.date.min:
+            raise ValidationError(DATE_RANGE_ERROR)
+        balance = self.get_summaries(
+            end_date=first_day - datetime.timedelta(days=1)
+        ).order_by('-year', '-month').values_list('closing_balance', flat=True).first() or Decimal('0')
+
+        # Дневные изменения баланса от начала месяца контрольной точки до конца периода
+        daily_changes = self.get_rollups(
+            start_date=first_day, end_date=end_date
+        ).values('day').annotate(
+            change=Sum(Case(
+                When(transaction_type='income', then=F('total')),
+                default=-F('total'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ))
+        ).order_by('day')
+
+        points = []
+        changes = iter(daily_changes)
+        pending = next(changes, None)
+        for bucket in buckets:
+            bucket_end = min(next_bucket(bucket, granularity) - datetime.timedelta(days=1), end_date)
+            while pending is not None and pending['day'] <= bucket_end:
+                balance += pending['change']
+                pending = next(changes, None)
+            points.append({'date': bucket, 'balance': balance})
+
+        return Response({
+            'granularity': granularity,
+            'start': start_date,
+            'end': end_date,
+            'points': points
+        })
+
+    @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    @cached_report(_series_months)
+    def timeseries(self, request):
+        """
+        Доходы, расходы, сбережения и ставка сбережений за произвольный период
+        (?start=&end=&granularity=day|week|month|quarter|year&metrics=...).
+
+        Считается одним сгруппированным запросом по дневным агрегатам; интервалы
+        без транзакций заполняются нулями. Ответ колоночный: массив начал
+        интервалов periods и по массиву значений на каждую метрику.
+        """
+        start_date, end_date, granularity, buckets = parse_series_range(request)
+
+        metrics = request.query_params.get('metrics')
+        metrics = [name.strip() for name in metrics.split(',') if name.strip()] if metrics else list(TIMESERIES_METRICS)
+        unknown = [name for name in metrics if name not in TIMESERIES_METRICS]
+        if unknown:
+            return Response(
+                {"error": f"Неизвестные метрики: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = self.get_rollups(start_date=start_date, end_date=end_date).annotate(
+            period=Trunc('day', granularity, output_field=DateField())
+        ).values('period').annotate(
+            income=Sum(Case(
+                When(transaction_type='income', then=F('total')),
+                default=Value(0),
+                output_field=FloatField()
+            )),
+            expenses=Sum(Case(
+                When(transaction_type='expense', then=F('total')),
+                default=Value(0),
+                output_field=FloatField()
+            ))
+        ).order_by('period')
+        totals = {row['period']: (float(row['income'] or 0), float(row['expenses'] or 0)) for row in rows}
+
+        # Пустые интервалы - те же float, что и заполненные: столбец однотипный
+        columns = {name: [] for name in metrics}
+        for bucket in buckets:
+            income, expenses = totals.get(bucket, (0.0, 0.0))
+            values = {
+                'income': income,
+                'expenses': expenses,
+                'savings': income - expenses,
+                'savings_rate': round((income - expenses) / income * 100, 2) if income > 0 else 0.0,
+            }
+            for name in metrics:
+                columns[name].append(values[name])
+
+        return Response({
+            'granularity': granularity,
+            'start': start_date,
+            'end': end_date,
+            'periods': buckets,
+            **columns
+        })
+
+    @action(detail=False, methods=['get'], url_path='category-matrix')
+    @etag_by_data_version
+    @cached_report(_series_months)
+    def category_matrix(self, request):
+        """
+        Сводная таблица сумм по категориям и интервалам
+        (?start=&end=&granularity=&type=expense|income, по умолчанию расходы по месяцам).
+
+        Один запрос GROUP BY (категория, интервал) по дневным агрегатам; плотная
+        матрица собирается в numpy по индексам непустых ячеек, итоги строк и столбцов
+        считаются векторно. Суммы накапливаются в копейках (int64), без ошибок округления.
+        """
+        start_date, end_date, granularity, buckets = parse_series_range(request, default_granularity='month')
+
+        transaction_type = request.query_params.get('type', 'expense')
+        if transaction_type not in dict(Transaction.TRANSACTION_TYPE):
+            return Response(
+                {"error": "type должен быть income или expense"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = self.get_rollups(start_date=start_date, end_date=end_date).filter(
+            transaction_type=transaction_type
+        )
+        categories, names, matrix = category_period_matrix(rollups, buckets, granularity)
+
+        # Категории по убыванию общей суммы
+        row_totals = matrix.sum(axis=1)
+        order = np.argsort(-row_totals, kind='stable')
+        matrix = matrix[order]
+        row_totals = row_totals[order]
+
+        return Response({
+            'granularity': granularity,
+            'type': transaction_type,
+            'start': start_date,
+            'end': end_date,
+            'periods': buckets,
+            'categories': [
+                {'id': int(category_id), 'name': names[category_id]}
+                for category_id in categories[order].tolist()
+            ],
+            'values': (matrix / 100).tolist(),
+            'row_totals': (row_totals / 100).tolist(),
+            'column_totals': (matrix.sum(axis=0) / 100).tolist(),
+            'total': int(matrix.sum()) / 100
+        })
+
+    @action(detail=False, methods=['get'], url_path='category-stats')
+    @etag_by_data_version
+    @cached_report(_series_months)
+    def category_stats(self, request):
+        """
+        Распределение сумм транзакций по категориям за период
+        (?start=&end=&type=expense|income&bins=, по умолчанию расходы за год):
+        количество, сумма, среднее, медиана, p90, минимум, максимум и гистограмма
+        из bins равных интервалов между минимумом и максимумом категории.
+        """
+        start_date, end_date = parse_date_range(request)
+
+        transaction_type = request.query_params.get('type', 'expense')
+        try:
+            bins = int(request.query_params.get('bins', DISTRIBUTION_BINS))
+            if transaction_type not in dict(Transaction.TRANSACTION_TYPE) or not 1 <= bins <= MAX_DISTRIBUTION_BINS:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": f"type должен быть income или expense, bins - от 1 до {MAX_DISTRIBUTION_BINS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        stats = category_distributions(Transaction.objects.filter(
+            user=request.user,
+            transaction_type=transaction_type,
+            date__range=[start_date, end_date]
+        ), bins)
+        names = dict(Category.objects.filter(id__in=list(stats)).values_list('id', 'name')) if stats else {}
+
+        categories = []
+        for category_id, row in sorted(stats.items(), key=lambda item: -item[1]['total']):
+            step = (row['high'] - row['low']) / bins
+            categories.append({
+                'category_id': category_id,
+                'category_name': names[category_id],
+                'count': row['count'],
+                'total': row['total'] / 100,
+                'mean': round(row['mean']) / 100,
+                'median': round(row['median']) / 100,
+                'p90': round(row['p90']) / 100,
+                'min': row['low'] / 100,
+                'max': row['high'] / 100,
+                'histogram': {
+                    'edges': [round(row['low'] + step * index) / 100 for index in range(bins + 1)],
+                    'counts': row['histogram'].tolist()
+                }
+            })
+
+        return Response({
+            'type': transaction_type,
+            'start': start_date,
+            'end': end_date,
+            'bins': bins,
+            'categories': categories
+        })
+
+    @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    @cached_report(_forecast_months)
+    def forecast(self, request):
+        """
+        Прогноз расходов по категориям и в целом на ?months= месяцев вперед,
+        начиная с текущего, по ?history= полным прошлым месяцам
+        (скользящее среднее за ?window= месяцев и сезонная база).
+        """
+        try:
+            horizon, history, window = _forecast_params(request)
+        except ValueError:
+            return Response(
+                {"error": "months (1-24), history (1-120) и window (1-12) должны быть целыми числами в допустимых пределах"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(forecast_data(request.user, horizon, history, window))
+
+    @action(detail=False, methods=['get'])
+    @etag_by_data_version
+    def anomalies(self, request):
+        """
+        Необычные расходы, найденные ночной проверкой (api.tasks.detect_spending_anomalies),
+        за последние ?days= дней; ?kind=transaction|category_month отбирает один вид.
+        """
+        kind = request.query_params.get('kind')
+        try:
+            days = int(request.query_params.get('days', ANOMALY_DAYS))
+            if not 1 <= days <= 366 or kind not in (None, *dict(SpendingAnomaly.KIND_CHOICES)):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "days должен быть от 1 до 366, kind - transaction или category_month"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = SpendingAnomaly.objects.filter(
+            user=request.user,
+            period__gte=timezone.now().date() - datetime.timedelta(days=days)
+        ).select_related('category')
+        if kind:
+            queryset = queryset.filter(kind=kind)
+
+        return Response(SpendingAnomalySerializer(queryset, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """Счетчики попаданий и промахов кэша отчетов (только для персонала)"""
+        return Response(report_cache_stats())
+
+    @action(detail=False, methods=['get'], url_path='platform-stats', permission_classes=[permissions.IsAdminUser])
+    def platform_stats(self, request):
+        """
+        Итоги по всем пользователям за последние ?months= месяцев (только для персонала).
+        Читает снимки ночной задачи api.tasks.compute_platform_stats, таблицы транзакций не сканирует.
+        """
+        try:
+            months = int(request.query_params.get('months', 12))
+            if not 1 <= months <= 120:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "months должен быть от 1 до 120"}, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshots = PlatformStatsSnapshot.objects.order_by('-period')[:months]
+        return Response(PlatformStatsSnapshotSerializer(list(snapshots)[::-1], many=True).data)
+
+
+def monthly_summary_data(user, year, month):
+    """Месячная сводка из итогов месяца (для monthly_summary и дашборда)"""
+    # Готовые итоги месяца читаются одной строкой по ключу
+    summary = MonthlyBudgetSummary.objects.filter(
+        user=user, year=year, month=month
+    ).values_list('total_income', 'total_expenses', 'balance').first()
+    income, expenses, balance = summary or (0, 0, 0)
+
+    data = {
+        'month': datetime.date(year, month, 1).strftime('%B'),
+        'year': year,
+        'income_total': income,
+        'expense_total': expenses,
+        'balance': balance
+    }
+
+    return MonthlySummarySerializer(data).data
+
+
+def category_breakdown_data(user, year, month):
+    """Распределение расходов месяца по категориям (для category_breakdown и дашборда)"""
+    # Получаем расходы с группировкой по категориям за один запрос
+    expenses = DailyCategoryRollup.objects.filter(
+        user=user,
+        transaction_type='expense',
+        **period_filter(year, month, field='day')
+    ).values(
+        'category__id', 'category__name'
+    ).annotate(
+        total=Sum('total')
+    ).order_by('-total')
+
+    # Вычисляем общую сумму
+    total_expenses = sum(item['total'] for item in expenses) if expenses else 0
+
+    if total_expenses > 0:
+        result = []
+        for cat in expenses:
+            percentage = (cat['total'] / total_expenses) * 100
+            result.append({
+                'category_id': cat['category__id'],
+                'category_name': cat['category__name'],
+                'amount': cat['total'],
+                'percentage': round(percentage, 2)
+            })
+
+        return CategoryBreakdownSerializer(result, many=True).data
+
+    return []
+
+
+def category_period_matrix(rollups, buckets, granularity):
+    """
+    Плотная матрица сумм (категории x интервалы buckets) в копейках по одному
+    запросу GROUP BY (категория, интервал). Возвращает (id категорий, {id: название}, матрица).
+    """
+    if granularity == 'month':
+        # Помесячно ячейки приходят целыми числами (категория, номер месяца, копейки)
+        # и переносятся в numpy целиком, без преобразования строк в Python
+        cells = np.array(list(rollups.values_list(
+            'category_id', MonthIndex('day')
+        ).annotate(cents=cents(Sum('total'))).order_by()), dtype=np.int64).reshape(-1, 3)
+        category_ids, periods, totals = cells.T
+        period_codes = periods - month_index(buckets[0]) if buckets else periods
+    else:
+        rows = list(rollups.annotate(
+            period=Trunc('day', granularity, output_field=DateField())
+        ).values_list('category_id', 'period').annotate(cents=cents(Sum('total'))).order_by())
+        period_index = {bucket: index for index, bucket in enumerate(buckets)}
+        category_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        period_codes = np.fromiter((period_index[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        totals = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+
+    # Матрица собирается по индексам непустых ячеек без обхода всех ячеек
+    categories, category_codes = np.unique(category_ids, return_inverse=True)
+    matrix = np.zeros((len(categories), len(buckets)), dtype=np.int64)
+    np.add.at(matrix, (category_codes, period_codes), totals)
+
+    names = dict(Category.objects.filter(id__in=categories.tolist()).values_list('id', 'name')) if len(categories) else {}
+    return categories, names, matrix
+
+
+def forecast_data(user, horizon, history, window):
+    """Прогноз расходов пользователя (для forecast и замеров производительности)"""
+    current = timezone.now().date().replace(day=1)
+    history_start = month_shift(current, -history)
+    buckets = list(iter_buckets(history_start, current - datetime.timedelta(days=1), 'month'))
+
+    rollups = DailyCategoryRollup.objects.filter(
+        user=user,
+        transaction_type='expense',
+        day__gte=history_start,
+        day__lt=current
+    )
+    categories, names, matrix = category_period_matrix(rollups, buckets, 'month')
+
+    # История начинается с первого месяца, в котором есть расходы
+    active = np.flatnonzero(matrix.any(axis=0))
+    first = int(active[0]) if active.size else len(buckets)
+    matrix = matrix[:, first:]
+
+    projected = forecast_spending(matrix, buckets[first] if active.size else current, horizon, window)
+    projected = np.round(projected) / 100
+
+    return {
+        'months': [month_shift(current, shift) for shift in range(horizon)],
+        'history': {
+            'start': buckets[first] if active.size else None,
+            'months': matrix.shape[1],
+            'seasonal': matrix.shape[1] >= 12
+        },
+        'window': window,
+        'categories': [
+            {'id': category_id, 'name': names[category_id]}
+            for category_id in categories.tolist()
+        ],
+        'values': projected.tolist(),
+        'total': projected.sum(axis=0).round(2).tolist()
+    }
@@ -0,0 +1,85 @@
+from rest_framework import views, permissions, status
+from rest_framework.response import Response
+from expenses.models import Transaction, Category, Budget, Goal, DeletedRecord
+from api.throttling import UserRateThrottle
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import datetime
+
+
+class SyncView(views.APIView):
+    """
+    API для дельта-синхронизации клиентов.
+
+    GET /sync/?since=<cursor> возвращает только объекты, измененные после курсора,
+    и идентификаторы удаленных объектов. Без since возвращается полный снимок.
+    В ответе передается новый cursor для следующего запроса.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+
+    # Перекрытие окна: строки, зафиксированные чуть позже чтения курсора,
+    # попадут в следующий ответ повторно, но не потеряются
+    cursor_overlap = datetime.timedelta(seconds=5)
+
+    entities = {
+        'transactions': (
+            Transaction, 'transaction',
+            ('id', 'amount', 'description', 'date', 'category', 'transaction_type', 'updated_at')
+        ),
+        'categories': (
+            Category, 'category',
+            ('id', 'name', 'updated_at')
+        ),
+        'budgets': (
+            Budget, 'budget',
+            ('id', 'name', 'amount', 'month', 'year', 'category', 'updated_at')
+        ),
+        'goals': (
+            Goal, 'goal',
+            ('id', 'name', 'description', 'target_amount', 'current_amount', 'deadline', 'updated_at')
+        ),
+    }
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_datetime(since)
+                if since is None:
+                    raise ValueError
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since, datetime.timezone.utc)
+                # Курсор у границы календаря не переводится в UTC или не сдвигается на перекрытие
+                since = since.astimezone(datetime.timezone.utc) - self.cursor_overlap
+            except (ValueError, OverflowError):
+                return Response(
+                    {"error": "Недопустимый курсор синхронизации"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Курсор фиксируем до чтения, чтобы не пропустить изменения во время запроса
+        cursor = timezone.now()
+
+        data = {'cursor': cursor.isoformat(), 'full': since is None}
+        deleted = {name: [] for name in self.entities}
+
+        for name, (model, _, fields) in self.entities.items():
+            queryset = model.objects.filter(user=request.user)
+            if since is not None:
+                queryset = queryset.filter(updated_at__gt=since)
+            data[name] = list(queryset.order_by('updated_at', 'id').values(*fields))
+
+        if since is not None:
+            model_names = {model_name: name for name, (_, model_name, _) in self.entities.items()}
+            tombstones = DeletedRecord.objects.filter(
+                user=request.user,
+                deleted_at__gt=since
+            ).values_list('model_name', 'object_id')
+
+            for model_name, object_id in tombstones:
+                if model_name in model_names:
+                    deleted[model_names[model_name]].append(object_id)
+
+        data['deleted'] = deleted
+        return Response(data)
@@ -1,17 +1,27 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from expenses.models import Transaction, Category
-from api.serializers.transaction_serializers import TransactionSerializer
+from expenses.models import Transaction, Category, DailyCategoryRollup, UserDataVersion
+from expenses.periods import is_valid_period, period_filter
+from expenses.rollups import record_transaction_changes
+from expenses.deletions import delete_transactions
+from api.serializers.transaction_serializers import (
+    TransactionSerializer, TransactionBulkSerializer, TransactionValuesSerializer
+)
 from api.throttling import UserRateThrottle, AnonRateThrottle
+from api.pagination import PaginationModeMixin
+from api.conditional import etag_by_data_version
+from api.serializers.mixins import parse_fieldset
 from django.db.models import Sum, F, Q, Value, Case, When, CharField, FloatField
 from django.db.models.functions import ExtractMonth, ExtractYear, Coalesce
+from django.db import connection, transaction
 from django.utils import timezone
 import datetime
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     """
     API для управления транзакциями пользователя.
     """
@@ -23,22 +33,49 @@ class TransactionViewSet(viewsets.ModelViewSet):
     search_fields = ['description']
     ordering_fields = ['date', 'amount', 'category']
     ordering = ['-date']
+    keyset_actions = ('list', 'by_month', 'by_category')
+    keyset_ordering = ('-date', '-id')
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user).select_related('category')
+        queryset = Transaction.objects.filter(user=self.request.user).select_related('category')
+        if self.action == 'retrieve':
+            queryset = TransactionSerializer.shape_queryset(queryset, self.request)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def list_response(self, queryset):
+        """
+        Быстрый путь чтения списков: строки выбираются через .values()
+        и сериализуются TransactionValuesSerializer без создания моделей.
+        """
+        fields, expand = parse_fieldset(self.request)
+        columns = TransactionValuesSerializer.values_fields(fields, expand)
+        # Поля, нужные курсорной пагинации, выбираются всегда
+        rows = queryset.values(*columns, *[name for name in ('id', 'date') if name not in columns])
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            serializer = TransactionValuesSerializer(page, fields=fields, expand=expand)
+            return self.get_paginated_response(serializer.data)
+
+        return Response(TransactionValuesSerializer(rows, fields=fields, expand=expand).data)
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
     def _get_year_month(self, request):
         """Вспомогательный метод для получения года и месяца из параметров запроса"""
         now = timezone.now()
         try:
             year = int(request.query_params.get('year', now.year))
             month = int(request.query_params.get('month', now.month))
-            return year, month
+            if not is_valid_period(year, month):
+                raise ValueError
         except (ValueError, TypeError):
-            return now.year, now.month
+            raise ValidationError({"error": "Недопустимый год или месяц"})
+        return year, month
 
     @action(detail=False, methods=['get'])
     def by_month(self, request):
@@ -46,17 +83,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
         year, month = self._get_year_month(request)
 
         queryset = self.get_queryset().filter(
-            date__year=year,
-            date__month=month
-        ).prefetch_related('category')
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            **period_filter(year, month)
+        )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     @action(detail=False, methods=['get'])
     def by_category(self, request):
@@ -70,38 +100,114 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
         queryset = self.get_queryset().filter(category_id=category_id)
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        return self.list_response(queryset)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Пакетное создание, обновление и удаление транзакций за один запрос.
+        Все операции применяются в одной транзакции БД: либо все, либо ни одной.
+        """
+        serializer = TransactionBulkSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        categories = data['categories']
+
+        created = []
+        for item in data['create']:
+            created.append(Transaction(
+                user=request.user,
+                amount=item['amount'],
+                description=item['description'],
+                date=item['date'],
+                category=categories[item['category']],
+                transaction_type=item['transaction_type']
+            ))
+
+        update_fields = {
+            field for item in data['update'] for field in item if field not in ('id', 'client_id')
+        }
+        updated = []
+
+        with transaction.atomic():
+            _insert_transactions(created)
+            if data['update']:
+                # Строки перечитываются под блокировкой: изменения пакета применяются к актуальным
+                # значениям, и агрегаты пересчитываются по тем же строкам, что будут записаны
+                locked = Transaction.objects.select_for_update(of=('self',)).select_related(
+                    'category'
+                ).filter(user=request.user).in_bulk([item['id'] for item in data['update']])
+                missing = {index: {'id': ['Транзакция не найдена.']}
+                           for index, item in enumerate(data['update']) if item['id'] not in locked}
+                if missing:
+                    raise ValidationError({'update': missing})
+
+                old_states = [instance.rollup_state() for instance in locked.values()]
+                now = timezone.now()
+                for item in data['update']:
+                    instance = locked[item['id']]
+                    for field, value in item.items():
+                        if field in ('id', 'client_id'):
+                            continue
+                        if field == 'category':
+                            value = categories[value]
+                        setattr(instance, field, value)
+                    # bulk_update не вызывает auto_now, отметку изменения ставим явно
+                    instance.updated_at = now
+                    updated.append(instance)
+
+                if update_fields:
+                    Transaction.objects.bulk_update(updated, sorted(update_fields | {'updated_at'}))
+                    record_transaction_changes(
+                        removed=old_states,
+                        added=[instance.rollup_state() for instance in updated]
+                    )
+            if data['delete']:
+                delete_transactions(Transaction.objects.filter(user=request.user, id__in=data['delete']))
+            # bulk_create/bulk_update не отправляют сигналы post_save
+            UserDataVersion.bump(request.user.id)
+
+        created_data = TransactionSerializer(created, many=True).data
+        for item, row in zip(data['create'], created_data):
+            if 'client_id' in item:
+                row['client_id'] = item['client_id']
+
+        updated_data = TransactionSerializer(updated, many=True).data
+        for item, row in zip(data['update'], updated_data):
+            if 'client_id' in item:
+                row['client_id'] = item['client_id']
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response({
+            'created': created_data,
+            'updated': updated_data,
+            'deleted': data['delete']
+        })
 
     @action(detail=False, methods=['get'])
+    @etag_by_data_version
     def stats(self, request):
         """Получить статистику по транзакциям"""
         year, month = self._get_year_month(request)
 
-        # Получаем статистику за один запрос с условными агрегациями
-        stats = self.get_queryset().filter(
-            date__year=year,
-            date__month=month
+        # Получаем статистику за один запрос с условными агрегациями по дневным агрегатам
+        stats = DailyCategoryRollup.objects.filter(
+            user=request.user,
+            **period_filter(year, month, field='day')
         ).aggregate(
             income=Coalesce(Sum(
                 Case(
-                    When(transaction_type='income', then=F('amount')),
+                    When(transaction_type='income', then=F('total')),
                     default=Value(0),
                     output_field=FloatField()
                 )
-            ), 0),
+            ), 0, output_field=FloatField()),
             expenses=Coalesce(Sum(
                 Case(
-                    When(transaction_type='expense', then=F('amount')),
+                    When(transaction_type='expense', then=F('total')),
                     default=Value(0),
                     output_field=FloatField()
                 )
-            ), 0)
+            ), 0, output_field=FloatField())
         )
 
         return Response({
@@ -110,4 +216,22 @@ class TransactionViewSet(viewsets.ModelViewSet):
             'balance': stats['income'] - stats['expenses'],
             'year': year,
             'month': month
-        })
\ No newline at end of file
+        })
+
+
+def _insert_transactions(objs):
+    """
+    Вставка транзакций одним bulk_create.
+    Если СУБД не возвращает первичные ключи из bulk INSERT (SQLite в Django 3.2),
+    строки сохраняются по одной, чтобы клиент получил id каждой созданной транзакции.
+    """
+    if not objs:
+        return objs
+    if connection.features.can_return_rows_from_bulk_insert:
+        Transaction.objects.bulk_create(objs)
+        # bulk_create не вызывает Transaction.save, агрегаты обновляем явно
+        record_transaction_changes(added=[obj.rollup_state() for obj in objs])
+        return objs
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
@@ -9,6 +9,7 @@ from api.throttling import UserRateThrottle, AnonRateThrottle
 from django.db import transaction
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_headers
 
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -22,8 +23,10 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-    # Кэшируем результат на короткое время для частых запросов профиля
+    # Кэшируем результат на короткое время для частых запросов профиля.
+    # Ответ зависит от пользователя, поэтому ключ кэша различается по заголовкам авторизации
     @method_decorator(cache_page(60))  # 1 минута кэширования
+    @method_decorator(vary_on_headers('Authorization', 'Cookie'))
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -219,6 +219,7 @@ REST_FRAMEWORK = {
 }
 
 from datetime import timedelta
+from celery.schedules import crontab
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -249,6 +250,24 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# Общий кэш (отчеты, ограничение частоты запросов) в Redis. Недоступность Redis
+# не роняет запросы: операции кэша превращаются в промахи
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.environ.get("REDIS_CACHE_URL", "redis://localhost:6379/1"),
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "IGNORE_EXCEPTIONS": True,
+        },
+        "KEY_PREFIX": "budget",
+    }
+}
+
+# Кэш результатов отчетов (api/report_cache.py)
+REPORT_CACHE_FRESH_SECONDS = int(os.environ.get("REPORT_CACHE_FRESH_SECONDS", 300))
+REPORT_CACHE_TIMEOUT = int(os.environ.get("REPORT_CACHE_TIMEOUT", 24 * 60 * 60))
+
 CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 CELERY_ACCEPT_CONTENT = ['application/json']
@@ -256,6 +275,36 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Ночные задачи
+CELERY_BEAT_SCHEDULE = {
+    'detect-spending-anomalies': {
+        'task': 'api.tasks.detect_spending_anomalies',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'compute-platform-stats': {
+        'task': 'api.tasks.compute_platform_stats',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'rollover-monthly-budgets': {
+        'task': 'api.tasks.rollover_monthly_budgets',
+        'schedule': crontab(day_of_month=1, hour=0, minute=30),
+    },
+    'cleanup-expired-exports': {
+        'task': 'api.tasks.cleanup_expired_exports',
+        'schedule': crontab(minute=15),
+    },
+}
+
+# Режим ежемесячного переноса бюджетов: copy или carry_over (api/budget_rollover.py)
+BUDGET_ROLLOVER_MODE = os.environ.get("BUDGET_ROLLOVER_MODE", "copy")
+
+# Пользователей в одной задаче проверки необычных расходов (api/anomalies.py)
+ANOMALY_CHUNK_SIZE = int(os.environ.get("ANOMALY_CHUNK_SIZE", 500))
+
+# Срок действия подписанной ссылки на файл экспорта (секунды) и срок хранения файла (часы)
+EXPORT_URL_EXPIRE = int(os.environ.get("EXPORT_URL_EXPIRE", 3600))
+EXPORT_RETENTION_HOURS = int(os.environ.get("EXPORT_RETENTION_HOURS", 24))
+
 # Swagger настройки
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
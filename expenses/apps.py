@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
-    verbose_name = 'Budget Management'
\ No newline at end of file
+    verbose_name = 'Budget Management'
+    
+    def ready(self):
+        import expenses.signals
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Budget, Category, DeletedRecord, Transaction, UserDataVersion
+from .rollups import record_transaction_changes
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_deletion():
+    """
+    Внутри блока построчные обработчики post_delete (expenses.signals) не выполняются:
+    пакетный путь сам обновляет агрегаты, пишет надгробия и увеличивает версии данных.
+    """
+    previous = getattr(_state, 'active', False)
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def in_bulk_deletion():
+    return getattr(_state, 'active', False)
+
+
+def delete_transactions(queryset):
+    """
+    Пакетное удаление транзакций с фиксированным числом запросов на весь пакет:
+    состояния строк читаются под блокировкой до удаления, агрегаты обновляются
+    одним вызовом record_transaction_changes, надгробия вставляются одним
+    bulk_create, версия данных каждого владельца увеличивается один раз.
+    Возвращает id удаленных транзакций.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by().values_list('id', *Transaction.ROLLUP_FIELDS))
+        if not rows:
+            return []
+
+        ids = [row[0] for row in rows]
+        with bulk_deletion():
+            Transaction.objects.filter(id__in=ids).delete()
+
+        record_transaction_changes(removed=[row[1:] for row in rows])
+        DeletedRecord.objects.bulk_create([
+            DeletedRecord(user_id=row[1], model_name='transaction', object_id=row[0]) for row in rows
+        ])
+        UserDataVersion.objects.filter(
+            user_id__in={row[1] for row in rows}
+        ).update(version=F('version') + 1)
+
+    return ids
+
+
+def delete_categories(queryset):
+    """
+    Пакетное удаление категорий вместе с каскадом: транзакции удаляются через
+    delete_transactions, бюджеты и сами категории - одним удалением без построчных
+    обработчиков, с надгробиями одним bulk_create и одной версией данных на владельца.
+    Возвращает id удаленных категорий.
+    """
+    with transaction.atomic():
+        categories = list(queryset.select_for_update().order_by().values_list('id', 'user_id'))
+        if not categories:
+            return []
+
+        ids = [row[0] for row in categories]
+        delete_transactions(Transaction.objects.filter(category_id__in=ids))
+
+        budgets = list(Budget.objects.filter(category_id__in=ids).order_by().values_list('id', 'user_id'))
+        with bulk_deletion():
+            Category.objects.filter(id__in=ids).delete()
+
+        DeletedRecord.objects.bulk_create(
+            [DeletedRecord(user_id=user_id, model_name='budget', object_id=pk) for pk, user_id in budgets]
+            + [DeletedRecord(user_id=user_id, model_name='category', object_id=pk) for pk, user_id in categories]
+        )
+        UserDataVersion.objects.filter(
+            user_id__in={user_id for _, user_id in categories}
+        ).update(version=F('version') + 1)
+
+    return ids
@@ -0,0 +1,32 @@
+from django.db.models import F
+from django.utils import timezone
+
+from expenses.models import Goal, UserDataVersion
+
+
+def apply_contribution_deltas(deltas):
+    """
+    Применяет изменения сумм взносов {goal_id: delta} к Goal.current_amount.
+
+    Вместо пересчета SUM(amount) по всем взносам цели - атомарный
+    UPDATE current_amount = current_amount + delta: строка цели блокируется
+    до конца транзакции, параллельные взносы не теряются. Цели обновляются
+    по возрастанию id, поэтому пакеты взносов в несколько целей не блокируют
+    друг друга взаимно. Вызывается внутри транзакции записи взносов.
+    """
+    deltas = {goal_id: delta for goal_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    now = timezone.now()
+    for goal_id in sorted(deltas):
+        # update() не вызывает auto_now, отметку изменения для синхронизации ставим явно
+        Goal.objects.filter(pk=goal_id).update(
+            current_amount=F('current_amount') + deltas[goal_id],
+            updated_at=now
+        )
+
+    # update() не отправляет сигналы: версии данных владельцев увеличиваются явно
+    UserDataVersion.objects.filter(
+        user_id__in=Goal.objects.filter(id__in=list(deltas)).values('user_id')
+    ).update(version=F('version') + 1)
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.rollups import find_rollup_mismatches, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Полный пересчет дневных агрегатов транзакций (DailyCategoryRollup) '
+        'и итогов месяцев (MonthlyBudgetSummary) '
+        'или проверка их согласованности с таблицей транзакций (--check).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='ID пользователя (можно указать несколько раз)')
+        parser.add_argument('--check', action='store_true',
+                            help='Только проверить согласованность, ничего не изменяя')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Количество пользователей, обрабатываемых за один проход')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['users']:
+            users = users.filter(id__in=options['users'])
+
+        chunk_size = options['chunk_size']
+        user_ids = list(users)
+        mismatches = 0
+        rebuilt = 0
+
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+
+            if options['check']:
+                for key, expected, actual in find_rollup_mismatches(chunk):
+                    mismatches += 1
+                    self.stdout.write(f'Расхождение {key}: ожидалось {expected}, в агрегатах {actual}')
+            else:
+                rebuilt += rebuild_rollups(chunk)
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'Найдено расхождений: {mismatches}')
+            self.stdout.write(self.style.SUCCESS(f'Агрегаты согласованы для {len(user_ids)} пользователей'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчитано {rebuilt} строк агрегатов для {len(user_ids)} пользователей'
+            ))
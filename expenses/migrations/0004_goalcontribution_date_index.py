@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_transaction_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goalcontribution',
+            index=models.Index(fields=['goal', 'date'], name='contribution_goal_date_idx'),
+        ),
+    ]
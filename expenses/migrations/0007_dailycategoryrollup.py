@@ -0,0 +1,73 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    """Заполняет агрегаты по существующим транзакциям одним GROUP BY"""
+    Transaction = apps.get_model('expenses', 'Transaction')
+    DailyCategoryRollup = apps.get_model('expenses', 'DailyCategoryRollup')
+
+    rows = Transaction.objects.values(
+        'user_id', 'category_id', 'transaction_type', 'date'
+    ).annotate(
+        total=models.Sum('amount'),
+        count=models.Count('id')
+    ).order_by()
+
+    batch = []
+    for row in rows.iterator():
+        batch.append(DailyCategoryRollup(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            transaction_type=row['transaction_type'],
+            day=row['date'],
+            total=row['total'],
+            count=row['count']
+        ))
+        if len(batch) >= 1000:
+            DailyCategoryRollup.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        DailyCategoryRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('expenses', '0006_userdataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=7)),
+                ('day', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dailycategoryrollup',
+            index=models.Index(fields=['user', 'day'], name='rollup_user_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailycategoryrollup',
+            index=models.Index(fields=['user', 'transaction_type', 'day'], name='rollup_user_type_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategoryrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'transaction_type', 'day'), name='rollup_user_category_type_day_uniq'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
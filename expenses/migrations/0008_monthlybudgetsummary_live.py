@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_summaries(apps, schema_editor):
+    """Пересчитывает итоги месяцев по всем существующим транзакциям"""
+    Transaction = apps.get_model('expenses', 'Transaction')
+    MonthlyBudgetSummary = apps.get_model('expenses', 'MonthlyBudgetSummary')
+
+    MonthlyBudgetSummary.objects.all().delete()
+
+    rows = Transaction.objects.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values('user_id', 'year', 'month', 'transaction_type').annotate(
+        total=models.Sum('amount'),
+        count=models.Count('id')
+    ).order_by('user_id', 'year', 'month')
+
+    summaries = {}
+    for row in rows.iterator():
+        key = (row['user_id'], row['year'], row['month'])
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = MonthlyBudgetSummary(
+                user_id=row['user_id'],
+                year=row['year'],
+                month=row['month'],
+                total_income=Decimal('0'),
+                total_expenses=Decimal('0')
+            )
+        if row['transaction_type'] == 'income':
+            summary.total_income += row['total']
+        else:
+            summary.total_expenses += row['total']
+        summary.balance = summary.total_income - summary.total_expenses
+        summary.transaction_count += row['count']
+
+    MonthlyBudgetSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_dailycategoryrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlybudgetsummary',
+            name='transaction_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='monthlybudgetsummary',
+            index=models.Index(fields=['user', 'year', 'month'], name='summary_user_year_month_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+def backfill_closing_balances(apps, schema_editor):
+    """Накопительный баланс по уже заполненным итогам месяцев"""
+    MonthlyBudgetSummary = apps.get_model('expenses', 'MonthlyBudgetSummary')
+
+    batch = []
+    user_id = None
+    closing = 0
+    for summary in MonthlyBudgetSummary.objects.order_by('user_id', 'year', 'month').iterator():
+        if summary.user_id != user_id:
+            user_id = summary.user_id
+            closing = 0
+        closing += summary.balance
+        summary.closing_balance = closing
+        batch.append(summary)
+        if len(batch) >= 1000:
+            MonthlyBudgetSummary.objects.bulk_update(batch, ['closing_balance'])
+            batch = []
+    if batch:
+        MonthlyBudgetSummary.objects.bulk_update(batch, ['closing_balance'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_monthlybudgetsummary_live'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlybudgetsummary',
+            name='closing_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(backfill_closing_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('expenses', '0009_monthlybudgetsummary_closing_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('transaction', 'Транзакция'), ('category_month', 'Месяц категории')], max_length=14)),
+                ('period', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('baseline', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('score', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='expenses.category')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='expenses.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-period', '-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='spendinganomaly',
+            index=models.Index(fields=['user', 'period'], name='anomaly_user_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='spendinganomaly',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'transaction')), fields=('transaction',), name='anomaly_transaction_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='spendinganomaly',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'category_month')), fields=('user', 'category', 'period'), name='anomaly_category_month_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_spendinganomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('active_users', models.PositiveIntegerField(default=0)),
+                ('transaction_count', models.PositiveBigIntegerField(default=0)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('categories', models.JSONField(default=list)),
+                ('growth', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-period'],
+            },
+        ),
+    ]
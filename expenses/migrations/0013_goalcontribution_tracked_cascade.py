@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:41
+
+from django.db import migrations, models
+import expenses.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_notification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='goalcontribution',
+            name='goal',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, related_name='contributions', to='expenses.goal'),
+        ),
+    ]
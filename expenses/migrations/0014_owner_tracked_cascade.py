@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:43
+
+from django.conf import settings
+from django.db import migrations, models
+import expenses.models
+
+
+def delete_orphan_tombstones(apps, schema_editor):
+    """Надгробия, оставшиеся после удаления пользователей"""
+    DeletedRecord = apps.get_model('expenses', 'DeletedRecord')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DeletedRecord.objects.exclude(user_id__in=User.objects.values('id')).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('expenses', '0013_goalcontribution_tracked_cascade'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='budget',
+            name='category',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to='expenses.category'),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='user',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='user',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='goal',
+            name='user',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='category',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to='expenses.category'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='user',
+            field=models.ForeignKey(on_delete=expenses.models.tracked_cascade, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(delete_orphan_tombstones, migrations.RunPython.noop),
+    ]
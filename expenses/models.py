@@ -1,16 +1,42 @@
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from expenses.periods import MonthStart, next_month_start, period_filter
+
+def tracked_cascade(collector, field, sub_objs, using):
+    """
+    CASCADE, который запоминает на каскадно удаляемых объектах внешний ключ,
+    по которому они удаляются (cascade_field), и удаляется ли в том же удалении
+    их владелец (owner_deleted). Обработчики post_delete (expenses.signals)
+    получают те же объекты и пропускают построчную работу, которая теряет смысл
+    вместе с родителем: изменение суммы удаляемой цели, надгробия, агрегаты
+    и версию данных удаляемого пользователя.
+    """
+    models.CASCADE(collector, field, sub_objs, using)
+    deleted_users = {user.pk for user in collector.data.get(User, ())}
+    for obj in sub_objs:
+        obj.cascade_field = field.name
+        obj.owner_deleted = getattr(obj, 'user_id', None) in deleted_users
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=tracked_cascade)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
     
+    def delete(self, *args, **kwargs):
+        # Транзакции и бюджеты категории удаляются пакетно, без обработчиков на каждую строку
+        from expenses.deletions import delete_categories
+        return delete_categories(Category.objects.filter(pk=self.pk))
+    
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='category_user_updated_idx'),
+        ]
 
 class Transaction(models.Model):
     TRANSACTION_TYPE = (
@@ -21,15 +47,50 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.CharField(max_length=255)
     date = models.DateField(default=timezone.now)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=tracked_cascade)
+    user = models.ForeignKey(User, on_delete=tracked_cascade)
     transaction_type = models.CharField(max_length=7, choices=TRANSACTION_TYPE)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Поля, от которых зависят агрегаты (DailyCategoryRollup)
+    ROLLUP_FIELDS = ('user_id', 'category_id', 'transaction_type', 'date', 'amount')
     
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} ({self.date})"
     
+    def rollup_state(self):
+        """Кортеж (user_id, category_id, transaction_type, date, amount) в нормализованном виде"""
+        date = self._meta.get_field('date').to_python(self.date)
+        amount = self._meta.get_field('amount').to_python(self.amount)
+        return (self.user_id, self.category_id, self.transaction_type, date, amount.quantize(Decimal('0.01')))
+    
+    def save(self, *args, **kwargs):
+        """Сохранение транзакции и обновление агрегатов в одной транзакции БД"""
+        from expenses.rollups import record_transaction_changes
+        
+        with db_transaction.atomic():
+            old_state = None
+            if not self._state.adding and self.pk:
+                old_state = Transaction.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list(*self.ROLLUP_FIELDS).first()
+            
+            super().save(*args, **kwargs)
+            
+            record_transaction_changes(
+                removed=[old_state] if old_state else [],
+                added=[self.rollup_state()]
+            )
+    
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Составные индексы для выборок пользователя по диапазону дат
+            models.Index(fields=['user', 'date'], name='txn_user_date_idx'),
+            models.Index(fields=['user', 'transaction_type', 'date'], name='txn_user_type_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ]
 
 class Budget(models.Model):
     """
@@ -39,23 +100,49 @@ class Budget(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     month = models.PositiveSmallIntegerField()  # 1-12 для месяца
     year = models.PositiveIntegerField()
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=tracked_cascade)
+    user = models.ForeignKey(User, on_delete=tracked_cascade)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - {self.amount} ({self.month}/{self.year})"
     
+    @staticmethod
+    def spent_subquery():
+        """
+        Сумма расходов по категории и месяцу бюджета для .annotate(spent_amount=...):
+        коррелированный подзапрос к дневным агрегатам, поэтому список бюджетов
+        с потраченными суммами выбирается одним запросом. Месяц задается диапазоном
+        дат от столбцов бюджета: подзапрос читает только дни этого месяца
+        по уникальному индексу (user, category, type, day).
+        """
+        year, month = models.OuterRef('year'), models.OuterRef('month')
+        return models.Subquery(
+            DailyCategoryRollup.objects.filter(
+                user_id=models.OuterRef('user_id'),
+                category_id=models.OuterRef('category_id'),
+                transaction_type='expense',
+                day__gte=MonthStart(year, month),
+                day__lt=next_month_start(year, month)
+            ).values('category_id').annotate(total=models.Sum('total')).values('total'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        )
+    
     @property
     def spent(self):
-        """Расчет потраченной суммы"""
-        total = Transaction.objects.filter(
-            user=self.user,
-            category=self.category,
+        """
+        Расчет потраченной суммы по дневным агрегатам. Если бюджет выбран
+        с аннотацией spent_amount (Budget.spent_subquery), запрос не выполняется.
+        """
+        if 'spent_amount' in self.__dict__:
+            return self.spent_amount or 0
+        total = DailyCategoryRollup.objects.filter(
+            user_id=self.user_id,
+            category_id=self.category_id,
             transaction_type='expense',
-            date__year=self.year,
-            date__month=self.month
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+            **period_filter(self.year, self.month, field='day')
+        ).aggregate(models.Sum('total'))['total__sum'] or 0
         return total
     
     @property
@@ -73,6 +160,9 @@ class Budget(models.Model):
     class Meta:
         ordering = ['-year', '-month']
         unique_together = ['user', 'category', 'month', 'year']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ]
 
 class Goal(models.Model):
     """
@@ -83,8 +173,9 @@ class Goal(models.Model):
     target_amount = models.DecimalField(max_digits=10, decimal_places=2)
     current_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     deadline = models.DateField(null=True, blank=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=tracked_cascade)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - {self.current_amount}/{self.target_amount}"
@@ -103,12 +194,15 @@ class Goal(models.Model):
     
     class Meta:
         ordering = ['deadline', 'created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='goal_user_updated_idx'),
+        ]
 
 class GoalContribution(models.Model):
     """
     Модель для отслеживания взносов в финансовую цель
     """
-    goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='contributions')
+    goal = models.ForeignKey(Goal, on_delete=tracked_cascade, related_name='contributions')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(default=timezone.now)
     description = models.CharField(max_length=255, blank=True)
@@ -117,24 +211,41 @@ class GoalContribution(models.Model):
         return f"Взнос {self.amount} в {self.goal.name} ({self.date})"
     
     def save(self, *args, **kwargs):
-        """Обновление текущей суммы цели при добавлении взноса"""
-        super().save(*args, **kwargs)
+        """Сохранение взноса и изменение текущей суммы цели на разницу в одной транзакции БД"""
+        from expenses.goals import apply_contribution_deltas
         
-        # Обновляем текущую сумму цели
-        goal = self.goal
-        total_contributions = GoalContribution.objects.filter(
-            goal=goal
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        amount = self._meta.get_field('amount').to_python(self.amount).quantize(Decimal('0.01'))
+        deltas = {self.goal_id: amount}
         
-        goal.current_amount = total_contributions
-        goal.save()
+        with db_transaction.atomic():
+            if not self._state.adding and self.pk:
+                # Прежние цель и сумму читаем под блокировкой строки взноса
+                old_state = GoalContribution.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('goal_id', 'amount').first()
+                if old_state:
+                    deltas[old_state[0]] = deltas.get(old_state[0], 0) - old_state[1]
+            
+            super().save(*args, **kwargs)
+            apply_contribution_deltas(deltas)
+        
+        # Загруженный объект цели (например, заблокированный вызывающим кодом)
+        # приводится к записанному значению без повторного чтения
+        if GoalContribution.goal.is_cached(self):
+            self.goal.current_amount = Decimal(self.goal.current_amount) + deltas[self.goal_id]
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['goal', 'date'], name='contribution_goal_date_idx'),
+        ]
 
 class MonthlyBudgetSummary(models.Model):
     """
-    Модель для сохранения итогов бюджета по месяцам
+    Модель для сохранения итогов бюджета по месяцам.
+    Обновляется инкрементально при каждой записи транзакции (expenses.rollups):
+    строка существует, пока в месяце есть хотя бы одна транзакция.
+    closing_balance служит контрольной точкой для истории баланса.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     month = models.PositiveSmallIntegerField()  # 1-12 для месяца
@@ -142,6 +253,9 @@ class MonthlyBudgetSummary(models.Model):
     total_income = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_expenses = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    # Баланс на конец месяца с учетом всех предыдущих месяцев (контрольная точка)
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     last_updated = models.DateTimeField(auto_now=True)
     
     def __str__(self):
@@ -150,6 +264,9 @@ class MonthlyBudgetSummary(models.Model):
     class Meta:
         ordering = ['-year', '-month']
         unique_together = ['user', 'month', 'year']
+        indexes = [
+            models.Index(fields=['user', 'year', 'month'], name='summary_user_year_month_idx'),
+        ]
 
 class RecurringTransaction(models.Model):
     """
@@ -199,4 +316,169 @@ class Attachment(models.Model):
         return extension.lower()
     
     class Meta:
-        ordering = ['-uploaded_at']
\ No newline at end of file
+        ordering = ['-uploaded_at']
+
+class DeletedRecord(models.Model):
+    """
+    Надгробие удаленного объекта для дельта-синхронизации клиентов
+    """
+    # Без ограничения FK. Надгробия удаляемого пользователя удаляются каскадом,
+    # а для его каскадно удаляемых строк новые не пишутся (tracked_cascade)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} удален {self.deleted_at}"
+    
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deleted_user_deleted_at_idx'),
+        ]
+
+class UserDataVersion(models.Model):
+    """
+    Монотонный счетчик версии данных пользователя.
+    Увеличивается при любой записи в Transaction, Budget, Goal или Category
+    и используется для ETag на читающих эндпоинтах.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Версия данных {self.user_id}: {self.version}"
+    
+    @classmethod
+    def current(cls, user_id):
+        """Текущая версия; строка создается при первом чтении"""
+        version, _ = cls.objects.get_or_create(user_id=user_id)
+        return version.version
+    
+    @classmethod
+    def bump(cls, user_id):
+        """
+        Атомарно увеличивает версию. Строку не создает: пока версию никто не читал,
+        выданных ETag нет и инвалидировать нечего.
+        """
+        cls.objects.filter(user_id=user_id).update(version=models.F('version') + 1)
+
+class DailyCategoryRollup(models.Model):
+    """
+    Суммы и количество транзакций пользователя по категории, типу и дню.
+    Поддерживается инкрементально при каждой записи транзакции (expenses.rollups),
+    поэтому отчеты агрегируют дни, а не отдельные транзакции.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    transaction_type = models.CharField(max_length=7, choices=Transaction.TRANSACTION_TYPE)
+    day = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user_id} {self.category_id} {self.transaction_type} {self.day}: {self.total}"
+    
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'transaction_type', 'day'],
+                name='rollup_user_category_type_day_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='rollup_user_day_idx'),
+            models.Index(fields=['user', 'transaction_type', 'day'], name='rollup_user_type_day_idx'),
+        ]
+
+class SpendingAnomaly(models.Model):
+    """
+    Необычный расход, найденный ночной проверкой (api.anomalies):
+    транзакция намного выше типичной суммы категории или месяц категории
+    намного выше скользящей медианы предыдущих месяцев.
+    """
+    KIND_CHOICES = (
+        ('transaction', 'Транзакция'),
+        ('category_month', 'Месяц категории'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=14, choices=KIND_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, null=True, blank=True)
+    # Дата транзакции или первое число месяца категории
+    period = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    # Типичная сумма: медиана транзакций категории или медиана предыдущих месяцев
+    baseline = models.DecimalField(max_digits=14, decimal_places=2)
+    score = models.FloatField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.category_id} {self.period}: {self.amount} (база {self.baseline})"
+    
+    class Meta:
+        ordering = ['-period', '-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['transaction'], condition=models.Q(kind='transaction'),
+                name='anomaly_transaction_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'category', 'period'], condition=models.Q(kind='category_month'),
+                name='anomaly_category_month_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'period'], name='anomaly_user_period_idx'),
+        ]
+
+class PlatformStatsSnapshot(models.Model):
+    """
+    Итоги по всем пользователям за месяц для панели персонала.
+    Пересчитываются ночной задачей (api.platform_stats), панель читает готовые строки.
+    """
+    period = models.DateField(unique=True)  # первое число месяца
+    active_users = models.PositiveIntegerField(default=0)  # пользователи с транзакциями в месяце
+    transaction_count = models.PositiveBigIntegerField(default=0)
+    total_income = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_expenses = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # Крупнейшие категории по названию: [{"name", "type", "total", "count"}]
+    categories = models.JSONField(default=list)
+    # Изменение к предыдущему месяцу в процентах: {"active_users", "total_income", "total_expenses"}
+    growth = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Итоги платформы за {self.period:%m/%Y}"
+    
+    class Meta:
+        ordering = ['-period']
+
+class Notification(models.Model):
+    """
+    Исходящее уведомление пользователя (outbox).
+    Записывается в той же транзакции БД, что и вызвавшее его изменение;
+    клиенты читают новые строки курсором по id (GET /notifications/?after=).
+    """
+    KIND_CHOICES = (
+        ('budget_threshold', 'Порог бюджета'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # Бюджет может быть удален позже; данные события остаются в payload
+    budget = models.ForeignKey(Budget, on_delete=models.SET_NULL, null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} для {self.user_id}: {self.payload}"
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='notification_user_id_idx'),
+        ]
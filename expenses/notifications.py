@@ -0,0 +1,67 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Budget, Notification
+
+# Пороги использования бюджета в процентах, о пересечении которых создается уведомление
+BUDGET_ALERT_THRESHOLDS = getattr(settings, 'BUDGET_ALERT_THRESHOLDS', (80, 100))
+
+
+def check_budget_thresholds(deltas):
+    """
+    Проверяет пороги бюджетов после изменения дневных агрегатов.
+
+    deltas - приращения {(user_id, category_id, type, day): [сумма, количество]}
+    из record_transaction_changes. Проверяются только бюджеты категорий и месяцев,
+    в которых расходы выросли: расход до записи равен текущему минус приращение,
+    и уведомление создается для каждого порога, оказавшегося между ними.
+    """
+    increases = defaultdict(Decimal)
+    for (user_id, category_id, transaction_type, day), (amount, _) in deltas.items():
+        if transaction_type == 'expense':
+            increases[(user_id, category_id, day.year, day.month)] += amount
+    increases = {key: amount for key, amount in increases.items() if amount > 0}
+    if not increases:
+        return []
+
+    condition = Q()
+    for user_id, category_id, year, month in increases:
+        condition |= Q(user_id=user_id, category_id=category_id, year=year, month=month)
+
+    with transaction.atomic():
+        # Блокировка бюджета упорядочивает проверки параллельных записей; сумма
+        # читается следующим запросом, чтобы учесть расходы, завершенные до блокировки
+        budget_ids = list(Budget.objects.filter(condition).select_for_update().values_list('id', flat=True))
+        if not budget_ids:
+            return []
+
+        notifications = []
+        for budget in Budget.objects.filter(id__in=budget_ids).annotate(spent_amount=Budget.spent_subquery()):
+            # SQLite возвращает сумму без дробной части, приводим к копейкам
+            spent = Decimal(budget.spent).quantize(Decimal('0.01'))
+            previous = spent - increases[(budget.user_id, budget.category_id, budget.year, budget.month)]
+
+            for threshold in BUDGET_ALERT_THRESHOLDS:
+                limit = budget.amount * threshold / 100
+                if previous < limit <= spent:
+                    notifications.append(Notification(
+                        user_id=budget.user_id,
+                        kind='budget_threshold',
+                        budget=budget,
+                        payload={
+                            'budget_id': budget.id,
+                            'budget_name': budget.name,
+                            'category_id': budget.category_id,
+                            'year': budget.year,
+                            'month': budget.month,
+                            'threshold': threshold,
+                            'amount': str(budget.amount),
+                            'spent': str(spent)
+                        }
+                    ))
+
+        return Notification.objects.bulk_create(notifications)
@@ -0,0 +1,143 @@
+import datetime
+
+from django.db.models import DateField, Func, IntegerField
+
+
+def month_bounds(year, month):
+    """
+    Возвращает полуоткрытый интервал дат [start, end) для месяца.
+
+    Фильтрация через date__gte/date__lt вместо date__year/date__month
+    позволяет базе данных использовать составные индексы по (user, ..., date).
+    """
+    year, month = int(year), int(month)
+    start = datetime.date(year, month, 1)
+    if month == 12:
+        end = datetime.date(year + 1, 1, 1)
+    else:
+        end = datetime.date(year, month + 1, 1)
+    return start, end
+
+
+def month_shift(day, months):
+    """Первое число месяца, отстоящего от месяца day на months (может быть отрицательным)"""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return day.replace(year=year, month=month + 1, day=1)
+
+
+def year_bounds(year):
+    """Возвращает полуоткрытый интервал дат [start, end) для года"""
+    year = int(year)
+    return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+
+
+def period_bounds(year, month=None):
+    """Интервал для года или для конкретного месяца года"""
+    if month is not None:
+        return month_bounds(year, month)
+    return year_bounds(year)
+
+
+def is_valid_period(year, month=None):
+    """
+    Можно ли построить границы периода (представления проверяют параметры до запросов):
+    конец периода - начало следующего месяца или года, поэтому год меньше MAXYEAR.
+    """
+    return datetime.MINYEAR <= year < datetime.MAXYEAR and (month is None or 1 <= month <= 12)
+
+
+def period_filter(year, month=None, field='date'):
+    """
+    Возвращает именованные аргументы для .filter() по периоду:
+    {'date__gte': start, 'date__lt': end}
+    """
+    start, end = period_bounds(year, month)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def truncate_date(day, granularity):
+    """Начало интервала (дня, недели с понедельника, месяца, квартала или года), содержащего day"""
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(bucket, granularity):
+    """Начало интервала, следующего за bucket"""
+    if granularity == 'week':
+        return bucket + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return month_bounds(bucket.year, bucket.month)[1]
+    if granularity == 'quarter':
+        year, month = divmod(bucket.year * 12 + bucket.month - 1 + 3, 12)
+        return datetime.date(year, month + 1, 1)
+    if granularity == 'year':
+        return year_bounds(bucket.year)[1]
+    return bucket + datetime.timedelta(days=1)
+
+
+def iter_buckets(start, end, granularity):
+    """Начала всех интервалов, пересекающих отрезок [start, end], без пропусков"""
+    bucket = truncate_date(start, granularity)
+    while bucket <= end:
+        yield bucket
+        bucket = next_bucket(bucket, granularity)
+
+
+def month_index(day):
+    """Порядковый номер месяца: year * 12 + (month - 1)"""
+    return day.year * 12 + day.month - 1
+
+
+class MonthIndex(Func):
+    """
+    Порядковый номер месяца даты в SQL, как month_index().
+    Вычисляется встроенными функциями СУБД: на SQLite Extract/Trunc реализованы
+    Python-функциями, которые вызываются для каждой строки.
+    """
+    template = 'CAST(EXTRACT(YEAR FROM %(expressions)s) * 12 + EXTRACT(MONTH FROM %(expressions)s) - 1 AS INTEGER)'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite хранит даты строками YYYY-MM-DD: номер месяца считается по подстрокам
+        return super().as_sql(
+            compiler, connection,
+            template='(CAST(substr(%(expressions)s, 1, 4) AS INTEGER) * 12'
+                     ' + CAST(substr(%(expressions)s, 6, 2) AS INTEGER) - 1)',
+            **extra_context
+        )
+
+
+class MonthStart(Func):
+    """
+    Первый день месяца по выражениям года и месяца, например столбцам бюджета.
+    Дает границы диапазона day >= MonthStart(...) для коррелированных подзапросов:
+    в отличие от MonthIndex от столбца даты, такое условие обслуживается индексом.
+    """
+    template = 'MAKE_DATE(%(expressions)s, 1)'
+    output_field = DateField()
+
+    def __init__(self, year, month, **extra):
+        super().__init__(year, month, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite хранит даты строками YYYY-MM-DD и сравнивает их как строки
+        return super().as_sql(
+            compiler, connection,
+            template="printf('%%%%04d-%%%%02d-01', %(expressions)s)",
+            **extra_context
+        )
+
+
+def next_month_start(year, month):
+    """MonthStart следующего месяца: декабрь переходит в январь следующего года"""
+    return MonthStart(year + month / 12, month % 12 + 1)
@@ -0,0 +1,113 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Поколения (generation) кэша отчетов. Ключ результата отчета включает поколения
+# всех данных, от которых он зависит, поэтому смена поколения делает результат
+# недостижимым без удаления самих записей кэша:
+#   report-gen:<user>             - общее поколение пользователя (категории, пересчет агрегатов)
+#   report-gen:<user>:ledger      - меняется при любой записи транзакций (история баланса)
+#   report-gen:<user>:<year>-<mm> - меняется при записи транзакций этого месяца
+#
+# Поколения - случайные метки, а не счетчики: если метка вытеснена из кэша,
+# новая метка не совпадет ни с одной из сохраненных ранее.
+
+STATS_EVENTS = ('hits', 'stale_hits', 'misses')
+
+
+def user_generation_key(user_id):
+    return f'report-gen:{user_id}'
+
+
+def ledger_generation_key(user_id):
+    return f'report-gen:{user_id}:ledger'
+
+
+def month_generation_key(user_id, year, month):
+    return f'report-gen:{user_id}:{year}-{month:02d}'
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def _bump(keys):
+    cache.set_many({key: _new_token() for key in keys}, timeout=None)
+
+
+def bump_generations(keys):
+    """
+    Меняет поколения сразу и еще раз после фиксации транзакции БД:
+    результат, посчитанный параллельным запросом по еще не зафиксированным
+    данным, не переживет коммит.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_months(user_months):
+    """Инвалидирует отчеты по месяцам {(user_id, year, month)} и историю баланса этих пользователей"""
+    keys = set()
+    for user_id, year, month in user_months:
+        keys.add(month_generation_key(user_id, year, month))
+        keys.add(ledger_generation_key(user_id))
+    bump_generations(keys)
+
+
+def invalidate_users(user_ids):
+    """Инвалидирует все отчеты пользователей"""
+    bump_generations(user_generation_key(user_id) for user_id in user_ids)
+
+
+def report_generation(user_id, months=None):
+    """
+    Сводное поколение для отчета, зависящего от месяцев months
+    (список (year, month)) или, если months is None, от всех транзакций пользователя.
+    """
+    keys = [user_generation_key(user_id)]
+    if months is None:
+        keys.append(ledger_generation_key(user_id))
+    else:
+        keys.extend(month_generation_key(user_id, year, month) for year, month in months)
+
+    tokens = cache.get_many(keys)
+    missing = [key for key in keys if key not in tokens]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_token(), timeout=None)
+        tokens.update(cache.get_many(missing))
+
+    raw = ':'.join(str(tokens.get(key)) for key in keys)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _stats_key(event):
+    return f'report-cache:stats:{event}'
+
+
+def record_event(event):
+    key = _stats_key(event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def report_cache_stats():
+    """Счетчики попаданий и промахов кэша отчетов"""
+    values = cache.get_many([_stats_key(event) for event in STATS_EVENTS])
+    stats = {event: values.get(_stats_key(event), 0) for event in STATS_EVENTS}
+    total = sum(stats.values())
+    served = stats['hits'] + stats['stale_hits']
+    stats['hit_ratio'] = round(served / total, 4) if total else None
+    return stats
+
+
+def reset_report_cache_stats():
+    cache.delete_many([_stats_key(event) for event in STATS_EVENTS])
@@ -0,0 +1,295 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import DailyCategoryRollup, MonthlyBudgetSummary, Transaction
+from .notifications import check_budget_thresholds
+from .report_cache import invalidate_months, invalidate_users
+
+
+def record_transaction_changes(removed=(), added=()):
+    """
+    Единая точка обновления агрегатов после записи транзакций.
+
+    removed и added - кортежи Transaction.ROLLUP_FIELDS: состояние строк до
+    изменения (обновленные и удаленные) и после (созданные и обновленные).
+    Вызывается внутри транзакции БД, в которой изменяются сами строки,
+    включая пакетные пути (bulk_create/bulk_update), не отправляющие сигналы.
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+
+    for user_id, category_id, transaction_type, day, amount in removed:
+        delta = deltas[(user_id, category_id, transaction_type, day)]
+        delta[0] -= Decimal(amount)
+        delta[1] -= 1
+
+    for user_id, category_id, transaction_type, day, amount in added:
+        delta = deltas[(user_id, category_id, transaction_type, day)]
+        delta[0] += Decimal(amount)
+        delta[1] += 1
+
+    apply_rollup_deltas(deltas)
+    check_budget_thresholds(deltas)
+    months = monthly_deltas(deltas)
+    apply_summary_deltas(months)
+    invalidate_months(key for key, delta in months.items() if any(delta))
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Применяет приращения {(user_id, category_id, type, day): [сумма, количество]}
+    атомарными UPDATE ... SET total = total + delta.
+    """
+    emptied = []
+    for (user_id, category_id, transaction_type, day), (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+
+        rows = DailyCategoryRollup.objects.filter(
+            user_id=user_id,
+            category_id=category_id,
+            transaction_type=transaction_type,
+            day=day
+        )
+        if rows.update(total=F('total') + amount, count=F('count') + count):
+            if count < 0:
+                emptied.append((user_id, day))
+            continue
+
+        # Строки нет. Если транзакции только удаляются, агрегат уже удален
+        # каскадом вместе с категорией или пользователем - создавать нечего
+        if count <= 0:
+            continue
+
+        try:
+            with transaction.atomic():
+                DailyCategoryRollup.objects.create(
+                    user_id=user_id,
+                    category_id=category_id,
+                    transaction_type=transaction_type,
+                    day=day,
+                    total=amount,
+                    count=count
+                )
+        except IntegrityError:
+            # Строку параллельно создал другой запрос
+            rows.update(total=F('total') + amount, count=F('count') + count)
+
+    if emptied:
+        # Агрегат существует, только пока в нем есть транзакции. Строки с нулевым
+        # количеством появляются лишь внутри этой транзакции БД, поэтому опустевшие
+        # агрегаты удаляются одним запросом по диапазону дней затронутых пользователей
+        days = [day for _, day in emptied]
+        DailyCategoryRollup.objects.filter(
+            user_id__in={user_id for user_id, _ in emptied},
+            day__gte=min(days),
+            day__lte=max(days),
+            count=0
+        ).delete()
+
+
+def monthly_deltas(deltas):
+    """
+    Сворачивает дневные приращения в месячные:
+    {(user_id, year, month): [доход, расход, количество]}
+    """
+    months = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0])
+    for (user_id, _, transaction_type, day), (amount, count) in deltas.items():
+        delta = months[(user_id, day.year, day.month)]
+        delta[0 if transaction_type == 'income' else 1] += amount
+        delta[2] += count
+    return months
+
+
+def months_after(year, month):
+    return Q(year__gt=year) | Q(year=year, month__gt=month)
+
+
+def months_before(year, month):
+    return Q(year__lt=year) | Q(year=year, month__lt=month)
+
+
+def apply_summary_deltas(months):
+    """
+    Применяет месячные приращения к MonthlyBudgetSummary теми же атомарными UPDATE.
+    Изменение баланса месяца сдвигает closing_balance этого и всех последующих
+    месяцев пользователя одним UPDATE по диапазону.
+    """
+    for (user_id, year, month), (income, expenses, count) in months.items():
+        if not income and not expenses and not count:
+            continue
+
+        net = income - expenses
+        if net:
+            MonthlyBudgetSummary.objects.filter(
+                months_after(year, month), user_id=user_id
+            ).update(closing_balance=F('closing_balance') + net)
+
+        rows = MonthlyBudgetSummary.objects.filter(user_id=user_id, year=year, month=month)
+        changes = {
+            'total_income': F('total_income') + income,
+            'total_expenses': F('total_expenses') + expenses,
+            'balance': F('balance') + net,
+            'transaction_count': F('transaction_count') + count,
+            'closing_balance': F('closing_balance') + net,
+        }
+        if rows.update(**changes):
+            if count < 0:
+                # Итоги месяца хранятся, только пока в нем есть транзакции
+                rows.filter(transaction_count=0).delete()
+            continue
+
+        # Удаление без строки итогов - пользователь удаляется каскадом
+        if count <= 0:
+            continue
+
+        # Новый месяц продолжает баланс ближайшего предыдущего месяца
+        opening = MonthlyBudgetSummary.objects.filter(
+            months_before(year, month), user_id=user_id
+        ).order_by('-year', '-month').values_list('closing_balance', flat=True).first() or 0
+
+        try:
+            with transaction.atomic():
+                MonthlyBudgetSummary.objects.create(
+                    user_id=user_id,
+                    year=year,
+                    month=month,
+                    total_income=income,
+                    total_expenses=expenses,
+                    balance=net,
+                    transaction_count=count,
+                    closing_balance=opening + net
+                )
+        except IntegrityError:
+            rows.update(**changes)
+
+
+def aggregate_transactions(user_ids=None):
+    """Эталонные агрегаты, посчитанные заново по таблице транзакций"""
+    queryset = Transaction.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+
+    return queryset.values(
+        'user_id', 'category_id', 'transaction_type', 'date'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+
+def aggregate_months(user_ids=None):
+    """
+    Эталонные итоги месяцев:
+    {(user_id, year, month): (доход, расход, баланс, количество, баланс на конец месяца)}
+    """
+    queryset = Transaction.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+
+    rows = queryset.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values('user_id', 'year', 'month', 'transaction_type').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+    months = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0])
+    for row in rows.iterator():
+        month = months[(row['user_id'], row['year'], row['month'])]
+        month[0 if row['transaction_type'] == 'income' else 1] += row['total']
+        month[2] += row['count']
+
+    result = {}
+    user_id = None
+    closing = Decimal('0')
+    for key in sorted(months):
+        income, expenses, count = months[key]
+        if key[0] != user_id:
+            user_id = key[0]
+            closing = Decimal('0')
+        closing += income - expenses
+        result[key] = (income, expenses, income - expenses, count, closing)
+    return result
+
+
+def rebuild_rollups(user_ids, batch_size=1000):
+    """Полностью пересчитывает агрегаты и итоги месяцев для указанных пользователей"""
+    invalidate_users(user_ids)
+    with transaction.atomic():
+        DailyCategoryRollup.objects.filter(user_id__in=user_ids).delete()
+        MonthlyBudgetSummary.objects.filter(user_id__in=user_ids).delete()
+        MonthlyBudgetSummary.objects.bulk_create([
+            MonthlyBudgetSummary(
+                user_id=user_id,
+                year=year,
+                month=month,
+                total_income=income,
+                total_expenses=expenses,
+                balance=balance,
+                transaction_count=count,
+                closing_balance=closing
+            )
+            for (user_id, year, month), (income, expenses, balance, count, closing) in aggregate_months(user_ids).items()
+        ], batch_size=batch_size)
+
+        rows = (
+            DailyCategoryRollup(
+                user_id=row['user_id'],
+                category_id=row['category_id'],
+                transaction_type=row['transaction_type'],
+                day=row['date'],
+                total=row['total'],
+                count=row['count']
+            )
+            for row in aggregate_transactions(user_ids).iterator()
+        )
+        created = 0
+        batch = []
+        for rollup in rows:
+            batch.append(rollup)
+            if len(batch) >= batch_size:
+                DailyCategoryRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailyCategoryRollup.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
+
+
+def find_rollup_mismatches(user_ids):
+    """
+    Сравнивает агрегаты и итоги месяцев с пересчетом по транзакциям.
+    Возвращает список (ключ, ожидаемое (сумма, количество), фактическое).
+    """
+    expected = {
+        (row['user_id'], row['category_id'], row['transaction_type'], row['date']): (row['total'], row['count'])
+        for row in aggregate_transactions(user_ids).iterator()
+    }
+    actual = {
+        (row.user_id, row.category_id, row.transaction_type, row.day): (row.total, row.count)
+        for row in DailyCategoryRollup.objects.filter(user_id__in=user_ids).iterator()
+    }
+
+    expected.update(
+        (('month',) + key, value) for key, value in aggregate_months(user_ids).items()
+    )
+    actual.update(
+        (
+            ('month', row.user_id, row.year, row.month),
+            (row.total_income, row.total_expenses, row.balance, row.transaction_count, row.closing_balance)
+        )
+        for row in MonthlyBudgetSummary.objects.filter(user_id__in=user_ids).iterator()
+    )
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        if expected.get(key) != actual.get(key):
+            mismatches.append((key, expected.get(key), actual.get(key)))
+    return mismatches
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_delete, post_save
+from .models import Transaction, Category, Budget, Goal, GoalContribution, DeletedRecord, UserDataVersion
+from .deletions import in_bulk_deletion
+from .goals import apply_contribution_deltas
+from .rollups import record_transaction_changes
+from .report_cache import invalidate_users
+
+# Модели, изменения которых отдаются клиентам через дельта-синхронизацию
+SYNC_MODELS = {
+    Transaction: 'transaction',
+    Category: 'category',
+    Budget: 'budget',
+    Goal: 'goal',
+}
+
+def skip_row_handlers(instance):
+    """
+    Построчная работа при удалении не нужна: пакетный путь выполняет ее сам
+    (expenses.deletions), либо владелец удаляется в том же удалении
+    и его надгробия, агрегаты и версия данных удаляются каскадом.
+    """
+    return in_bulk_deletion() or getattr(instance, 'owner_deleted', False)
+
+def record_deletion(sender, instance, **kwargs):
+    """Сохраняет надгробие удаленного объекта (в том числе при каскадном удалении)"""
+    if skip_row_handlers(instance):
+        return
+    DeletedRecord.objects.create(
+        user_id=instance.user_id,
+        model_name=SYNC_MODELS[sender],
+        object_id=instance.pk
+    )
+
+def remove_from_rollups(sender, instance, **kwargs):
+    """Вычитает удаленную транзакцию из агрегатов (сигнал приходит и при удалении queryset)"""
+    if skip_row_handlers(instance):
+        return
+    record_transaction_changes(removed=[instance.rollup_state()])
+
+def remove_goal_contribution(sender, instance, **kwargs):
+    """Вычитает удаленный взнос из текущей суммы цели (в том числе при удалении queryset)"""
+    if getattr(instance, 'cascade_field', None) == 'goal':
+        # Цель удаляется вместе со взносами
+        return
+    apply_contribution_deltas({instance.goal_id: -instance.amount})
+
+def invalidate_category_reports(sender, instance, **kwargs):
+    """Названия категорий входят в отчеты, поэтому их изменение сбрасывает кэш отчетов владельца"""
+    if getattr(instance, 'owner_deleted', False):
+        return
+    invalidate_users([instance.user_id])
+
+def bump_data_version(sender, instance, **kwargs):
+    """Увеличивает версию данных владельца при любой записи"""
+    if skip_row_handlers(instance):
+        return
+    UserDataVersion.bump(instance.user_id)
+
+# Подключаем обработчики только к нужным моделям, чтобы не отключать
+# быстрое удаление (fast delete) для остальных таблиц
+for model in SYNC_MODELS:
+    post_delete.connect(record_deletion, sender=model, dispatch_uid=f'record_deletion_{model.__name__}')
+    post_delete.connect(bump_data_version, sender=model, dispatch_uid=f'bump_version_delete_{model.__name__}')
+    post_save.connect(bump_data_version, sender=model, dispatch_uid=f'bump_version_save_{model.__name__}')
+
+post_delete.connect(remove_from_rollups, sender=Transaction, dispatch_uid='remove_from_rollups')
+post_delete.connect(remove_goal_contribution, sender=GoalContribution, dispatch_uid='remove_goal_contribution')
+post_save.connect(invalidate_category_reports, sender=Category, dispatch_uid='invalidate_category_reports_save')
+post_delete.connect(invalidate_category_reports, sender=Category, dispatch_uid='invalidate_category_reports_delete')
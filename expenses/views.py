@@ -5,7 +5,8 @@ from django.db.models import Sum
 from django.db.models.functions import TruncMonth
 import datetime
 import calendar
-from .models import Transaction, Category
+from .models import Transaction, Category, DailyCategoryRollup
+from .periods import period_filter
 from .forms import TransactionForm, CategoryForm
 
 @login_required
@@ -16,46 +17,32 @@ def dashboard(request):
     # Get current month transactions
     transactions = Transaction.objects.filter(
         user=request.user,
-        date__month=current_month,
-        date__year=current_year
+        **period_filter(current_year, current_month)
     ).order_by('-date')
     
-    # Total amounts
-    income = Transaction.objects.filter(
-        user=request.user, 
-        transaction_type='income',
-        date__month=current_month,
-        date__year=current_year
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    expenses = Transaction.objects.filter(
-        user=request.user, 
-        transaction_type='expense',
-        date__month=current_month,
-        date__year=current_year
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
+    # Totals and chart data come from the daily rollups in one grouped query
+    rollups = DailyCategoryRollup.objects.filter(
+        user=request.user,
+        **period_filter(current_year, current_month, field='day')
+    )
+    totals = dict(
+        rollups.values('transaction_type').annotate(total=Sum('total')).values_list('transaction_type', 'total')
+    )
+    income = totals.get('income') or 0
+    expenses = totals.get('expense') or 0
     
     balance = income - expenses
     
-    # Chart data
-    expense_categories = Category.objects.filter(user=request.user)
-    category_data = []
-    
     # Get expense amounts by category
-    for category in expense_categories:
-        category_sum = Transaction.objects.filter(
-            user=request.user,
-            category=category,
-            transaction_type='expense',
-            date__month=current_month,
-            date__year=current_year
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        if category_sum > 0:
-            category_data.append({
-                'name': category.name,
-                'amount': float(category_sum)  # Convert to float for JSON
-            })
+    category_data = [
+        {
+            'name': row['category__name'],
+            'amount': float(row['amount'])  # Convert to float for JSON
+        }
+        for row in rollups.filter(transaction_type='expense').values('category__name').annotate(
+            amount=Sum('total')
+        ).filter(amount__gt=0).order_by('category__name')
+    ]
     
     # Debug print
     print(f"Category data: {category_data}")